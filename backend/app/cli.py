@@ -0,0 +1,271 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from app.ml.analysis import analyze_recording
+from app.ml.engine import DEMO_WEIGHTS, ENGINES, engine_version, export_weights
+from app.ml.pipeline import configure_engine
+from app.uncertainty.estimate import MAX_MC_PASSES, MC_DROPOUT_MODES
+from app.utils.audio import decode_audio_stream, is_audio_filename, resample_audio
+
+OUTPUT_FORMATS = {".csv": "csv", ".parquet": "parquet", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+TIMING_STAGES = ("decode", "mel", "model", "windows", "quality", "mc_dropout")
+COLUMNS = (
+    "path",
+    "size_bytes",
+    "mtime_ns",
+    "status",
+    "error",
+    "duration_s",
+    "sample_rate",
+    "murmur_label",
+    "raw_probability",
+    "calibrated_probability",
+    "uncertainty_score",
+    "timing_label",
+    "systolic_probability",
+    "diastolic_probability",
+    "quality_score",
+    "snr_db",
+    "clipping_pct",
+    "silence_pct",
+    "retake_recommended",
+    "concern_level",
+    "n_segments",
+    "max_segment_prob",
+    *(f"{stage}_ms" for stage in TIMING_STAGES),
+    "total_ms",
+)
+
+
+def find_recordings(root: str) -> list[str]:
+    paths = []
+    for directory, subdirs, filenames in os.walk(root):
+        subdirs.sort()
+        paths.extend(os.path.join(directory, name) for name in sorted(filenames) if is_audio_filename(name))
+    return paths
+
+
+def _file_identity(root: str, path: str) -> dict:
+    stat = os.stat(path)
+    return {"path": os.path.relpath(path, root), "size_bytes": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _init_worker(engine: str = "numpy", weights: str | None = None) -> None:
+    configure_engine(engine, weights)
+    if engine == "torch":
+        # Each process scores one file at a time; intra-op threads would only oversubscribe the cores.
+        import torch
+
+        torch.set_num_threads(1)
+
+
+def score_file(task: tuple[str, str, dict, int]) -> dict:
+    root, path, options, sample_rate = task
+    row = dict.fromkeys(COLUMNS)
+    row.update(_file_identity(root, path))
+    started = time.perf_counter()
+    try:
+        with open(path, "rb") as stream:
+            audio = resample_audio(decode_audio_stream(stream), sample_rate)
+        decode_s = time.perf_counter() - started
+        analysis = analyze_recording(audio.samples, audio.sample_rate, artifacts="none", **options)
+    except Exception as exc:
+        row.update(status="error", error=str(exc) or type(exc).__name__)
+        row["total_ms"] = (time.perf_counter() - started) * 1000.0
+        return row
+
+    segment_probs = [segment["murmur_prob"] for segment in analysis["segments"]]
+    row.update(
+        status="ok",
+        duration_s=audio.duration_s,
+        sample_rate=audio.sample_rate,
+        murmur_label=analysis["murmur"]["label"],
+        raw_probability=analysis["murmur"]["raw_probability"],
+        calibrated_probability=analysis["murmur"]["calibrated_probability"],
+        uncertainty_score=analysis["murmur"]["uncertainty_score"],
+        timing_label=analysis["timing"]["label"],
+        systolic_probability=analysis["timing"]["systolic_probability"],
+        diastolic_probability=analysis["timing"]["diastolic_probability"],
+        quality_score=analysis["quality"]["quality_score_0_100"],
+        snr_db=analysis["quality"]["snr_db"],
+        clipping_pct=analysis["quality"]["clipping_pct"],
+        silence_pct=analysis["quality"]["silence_pct"],
+        retake_recommended=analysis["quality"]["retake_recommended"],
+        concern_level=analysis["risk"]["screening_concern_level"],
+        n_segments=len(segment_probs),
+        max_segment_prob=max(segment_probs) if segment_probs else None,
+    )
+    timings = {"decode": decode_s, **analysis["timings"]}
+    for stage in TIMING_STAGES:
+        row[f"{stage}_ms"] = timings.get(stage, 0.0) * 1000.0
+    row["total_ms"] = (time.perf_counter() - started) * 1000.0
+    return row
+
+
+def load_checkpoint(path: str) -> dict[str, dict]:
+    rows = {}
+    if not os.path.exists(path):
+        return rows
+    with open(path) as handle:
+        for line in handle:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write leaves at most one partial trailing line.
+                continue
+            rows[row["path"]] = row
+    return rows
+
+
+def _is_done(row: dict | None, identity: dict, scoring: dict, retry_failed: bool) -> bool:
+    if row is None or row["size_bytes"] != identity["size_bytes"] or row["mtime_ns"] != identity["mtime_ns"]:
+        return False
+    # Rows scored with other options or another model (and rows from before this was recorded) are rescored.
+    if row.get("scoring") != scoring:
+        return False
+    return row["status"] == "ok" or not retry_failed
+
+
+def write_results(rows: list[dict], output: str, output_format: str) -> None:
+    tmp_path = f"{output}.tmp"
+    rows = [{column: row[column] for column in COLUMNS} for row in rows]
+    if output_format == "csv":
+        with open(tmp_path, "w", newline="") as handle:
+            writer = csv.DictWriter(handle, fieldnames=COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+    elif output_format == "ndjson":
+        with open(tmp_path, "w") as handle:
+            for row in rows:
+                handle.write(json.dumps(row) + "\n")
+    else:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow).") from exc
+        table = pa.Table.from_pydict({column: [row[column] for row in rows] for column in COLUMNS})
+        pq.write_table(table, tmp_path)
+    os.replace(tmp_path, output)
+
+
+def score_directory(args: argparse.Namespace) -> int:
+    root = os.path.abspath(args.directory)
+    if not os.path.isdir(root):
+        print(f"error: {args.directory} is not a directory", file=sys.stderr)
+        return 2
+    output_format = args.format or OUTPUT_FORMATS.get(os.path.splitext(args.output)[1].lower())
+    if output_format is None:
+        print("error: cannot infer the output format; pass --format", file=sys.stderr)
+        return 2
+    checkpoint = args.checkpoint or f"{args.output}.checkpoint.ndjson"
+    if args.fresh and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    options = {"mc_dropout_passes": args.mc_dropout_passes, "mc_dropout_mode": args.mc_dropout_mode}
+    scoring = {**options, "sample_rate": args.sample_rate, "model_version": engine_version(args.engine, args.weights)}
+    done = load_checkpoint(checkpoint)
+    paths = find_recordings(root)
+    todo = []
+    for path in paths:
+        identity = _file_identity(root, path)
+        if not _is_done(done.get(identity["path"]), identity, scoring, args.retry_failed):
+            todo.append(path)
+    tasks = [(root, path, options, args.sample_rate) for path in todo]
+    print(f"{len(paths)} recordings, {len(paths) - len(todo)} already scored, {len(todo)} to go", file=sys.stderr)
+
+    started = time.perf_counter()
+    failed = 0
+    pool = None
+    engine = (args.engine, args.weights)
+    if args.workers > 1 and len(tasks) > 1:
+        pool = multiprocessing.get_context(args.mp_context).Pool(
+            args.workers, initializer=_init_worker, initargs=engine
+        )
+        results = pool.imap_unordered(score_file, tasks, chunksize=args.chunksize)
+    else:
+        configure_engine(*engine)
+        results = map(score_file, tasks)
+    try:
+        with open(checkpoint, "ab+") as handle:
+            if handle.tell():
+                handle.seek(-1, os.SEEK_END)
+                if handle.read(1) != b"\n":
+                    handle.write(b"\n")
+            for count, row in enumerate(results, start=1):
+                handle.write(json.dumps({**row, "scoring": scoring}).encode() + b"\n")
+                handle.flush()
+                done[row["path"]] = row
+                failed += row["status"] != "ok"
+                if count % args.progress_every == 0 or count == len(tasks):
+                    rate = count / max(time.perf_counter() - started, 1e-9)
+                    print(f"scored {count}/{len(tasks)} ({failed} failed, {rate:.1f} files/s)", file=sys.stderr)
+    except KeyboardInterrupt:
+        print(f"interrupted; rerun the same command to resume from {checkpoint}", file=sys.stderr)
+        return 130
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    relpaths = [os.path.relpath(path, root) for path in paths]
+    write_results([done[path] for path in relpaths if path in done], args.output, output_format)
+    print(f"wrote {args.output}", file=sys.stderr)
+    return 0
+
+
+def export_command(args: argparse.Namespace) -> int:
+    from app.ml.model import build_demo_model, load_checkpoint
+
+    model = load_checkpoint(args.checkpoint) if args.checkpoint else build_demo_model()
+    export_weights(model, args.output)
+    print(f"wrote {args.output}", file=sys.stderr)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Offline murmur screening tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    score = commands.add_parser("score", help="Score every WAV under a directory tree.")
+    score.add_argument("directory")
+    score.add_argument("-o", "--output", default="scores.csv", help="Output file (.csv, .parquet or .ndjson).")
+    score.add_argument("--format", choices=sorted(set(OUTPUT_FORMATS.values())))
+    score.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    score.add_argument("--chunksize", type=int, default=4, help="Files handed to a worker at a time.")
+    score.add_argument("--mp-context", default="spawn")
+    score.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint.ndjson).")
+    score.add_argument("--fresh", action="store_true", help="Ignore an existing checkpoint and rescore everything.")
+    score.add_argument("--retry-failed", action="store_true", help="Rescore files that failed in an earlier run.")
+    score.add_argument("--mc-dropout-passes", type=int, default=20, choices=range(1, MAX_MC_PASSES + 1), metavar="N")
+    score.add_argument("--mc-dropout-mode", default="batched", choices=sorted(MC_DROPOUT_MODES))
+    score.add_argument("--progress-every", type=int, default=100)
+    score.add_argument(
+        "--sample-rate",
+        type=int,
+        default=4000,
+        help="Decimate recordings above this rate before scoring, as the API does (0 keeps the capture rate).",
+    )
+    score.add_argument("--engine", default="numpy", choices=sorted(ENGINES))
+    score.add_argument("--weights", help="Weights for the engine (.npz for numpy, state_dict checkpoint for torch).")
+    score.set_defaults(handler=score_directory)
+
+    export = commands.add_parser("export-weights", help="Export MurmurNet weights to .npz for the numpy engine.")
+    export.add_argument("--checkpoint", help="torch state_dict to export (default: the seeded demo model).")
+    export.add_argument("-o", "--output", default=DEMO_WEIGHTS)
+    export.set_defaults(handler=export_command)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import os
+from dataclasses import dataclass, field
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_bool(name: str, default: bool | None) -> bool | None:
+    value = os.getenv(name)
+    return value.lower() in {"1", "true", "yes", "on"} if value else default
+
+
+@dataclass
+class Settings:
+    executor: str = field(default_factory=lambda: os.getenv("ANALYSIS_EXECUTOR", "process"))
+    workers: int = field(default_factory=lambda: _env_int("ANALYSIS_WORKERS", os.cpu_count() or 1))
+    queue_size: int = field(default_factory=lambda: _env_int("ANALYSIS_QUEUE_SIZE", 8))
+    retry_after_s: int = field(default_factory=lambda: _env_int("ANALYSIS_RETRY_AFTER_S", 5))
+    mp_context: str = field(default_factory=lambda: os.getenv("ANALYSIS_MP_CONTEXT", "spawn"))
+    inference_engine: str = field(default_factory=lambda: os.getenv("INFERENCE_ENGINE", "numpy"))
+    model_weights: str | None = field(default_factory=lambda: os.getenv("MODEL_WEIGHTS") or None)
+    preload_model: bool | None = field(default_factory=lambda: _env_bool("PRELOAD_MODEL", None))
+    warmup: bool = field(default_factory=lambda: _env_bool("WARMUP", True))
+    inference_batching: bool = field(default_factory=lambda: _env_bool("INFERENCE_BATCHING", False))
+    inference_max_batch: int = field(default_factory=lambda: _env_int("INFERENCE_MAX_BATCH", 256))
+    inference_max_wait_ms: float = field(default_factory=lambda: _env_float("INFERENCE_MAX_WAIT_MS", 5.0))
+    artifacts_mode: str = field(default_factory=lambda: os.getenv("ARTIFACTS_MODE", "inline"))
+    blob_dir: str = field(default_factory=lambda: os.getenv("BLOB_STORE_DIR", "./blobs"))
+    blob_gc_grace_s: float = field(default_factory=lambda: _env_float("BLOB_GC_GRACE_S", 3600.0))
+    canonical_sample_rate: int = field(default_factory=lambda: _env_int("CANONICAL_SAMPLE_RATE", 4000))
+    max_upload_mb: int = field(default_factory=lambda: _env_int("MAX_UPLOAD_MB", 100))
+    db_pool_size: int = field(default_factory=lambda: _env_int("DB_POOL_SIZE", 10))
+    db_max_overflow: int = field(default_factory=lambda: _env_int("DB_MAX_OVERFLOW", 20))
+    db_pool_timeout_s: float = field(default_factory=lambda: _env_float("DB_POOL_TIMEOUT_S", 30.0))
+    db_pool_recycle_s: int = field(default_factory=lambda: _env_int("DB_POOL_RECYCLE_S", 1800))
+    sqlite_journal_mode: str = field(default_factory=lambda: os.getenv("SQLITE_JOURNAL_MODE", "WAL"))
+    sqlite_synchronous: str = field(default_factory=lambda: os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"))
+    sqlite_busy_timeout_ms: int = field(default_factory=lambda: _env_int("SQLITE_BUSY_TIMEOUT_MS", 15000))
+    sqlite_mmap_mb: int = field(default_factory=lambda: _env_int("SQLITE_MMAP_MB", 256))
+    sqlite_cache_mb: int = field(default_factory=lambda: _env_int("SQLITE_CACHE_MB", 64))
+    result_cache: bool = field(default_factory=lambda: _env_bool("RESULT_CACHE", True))
+    result_cache_size: int = field(default_factory=lambda: _env_int("RESULT_CACHE_SIZE", 1024))
+    batch_max_files: int = field(default_factory=lambda: _env_int("BATCH_MAX_FILES", 500))
+    batch_queue_wait_s: float = field(default_factory=lambda: _env_float("BATCH_QUEUE_WAIT_S", 30.0))
+    stream_max_sessions: int = field(default_factory=lambda: _env_int("STREAM_MAX_SESSIONS", 8))
+    job_workers: int = field(default_factory=lambda: _env_int("JOB_WORKERS", 1))
+    job_lease_s: float = field(default_factory=lambda: _env_float("JOB_LEASE_S", 60.0))
+    job_max_attempts: int = field(default_factory=lambda: _env_int("JOB_MAX_ATTEMPTS", 3))
+    job_poll_interval_s: float = field(default_factory=lambda: _env_float("JOB_POLL_INTERVAL_S", 1.0))
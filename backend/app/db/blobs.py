@@ -0,0 +1,188 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import BinaryIO
+
+import numpy as np
+
+
+def array_to_bytes(array: np.ndarray) -> bytes:
+    buf = io.BytesIO()
+    np.save(buf, np.ascontiguousarray(array), allow_pickle=False)
+    return buf.getvalue()
+
+
+class BlobStore:
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def path(self, key: str) -> Path:
+        if len(key) != 64 or not all(c in "0123456789abcdef" for c in key):
+            raise ValueError("Invalid blob key.")
+        return self.root / key[:2] / key[2:4] / key
+
+    def put(self, data: bytes) -> str:
+        key = hashlib.sha256(data).hexdigest()
+        path = self.path(key)
+        if self._renew(path):
+            return key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+        return key
+
+    def put_stream(self, stream: BinaryIO, chunk_bytes: int = 1 << 20) -> tuple[str, int]:
+        self.root.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                while chunk := stream.read(chunk_bytes):
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+            key = digest.hexdigest()
+            path = self.path(key)
+            if self._renew(path):
+                os.unlink(tmp_path)
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return key, size
+
+    def _renew(self, path: Path) -> bool:
+        # Storing content that already exists refreshes its modification time, which collect() treats as a
+        # reference that is about to be committed.
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def open(self, key: str) -> BinaryIO:
+        return self.path(key).open("rb")
+
+    def get(self, key: str) -> bytes | None:
+        try:
+            return self.path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put_array(self, array: np.ndarray) -> str:
+        return self.put(array_to_bytes(array))
+
+    def get_array(self, key: str) -> np.ndarray | None:
+        path = self.path(key)
+        if not path.exists():
+            return None
+        return np.load(path, mmap_mode="r", allow_pickle=False)
+
+    def keys(self) -> list[str]:
+        keys = set()
+        for path in self.root.glob("*/*/*"):
+            key = path.name.removesuffix(".collect")
+            try:
+                if self.path(key).parent != path.parent:
+                    continue
+            except ValueError:
+                continue
+            if path.name != key:
+                # Moved aside by a collection that never finished; put it back so it is judged again.
+                os.replace(path, self.path(key))
+            keys.add(key)
+        return sorted(keys)
+
+    def delete(self, key: str) -> None:
+        try:
+            self.path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def collect(self, keys: list[str], unreferenced: Callable[[list[str]], list[str]], grace_s: float) -> list[str]:
+        # Moves each candidate aside before reading the references again, so a put() racing with the
+        # collection either renewed the blob first (and it is restored) or no longer finds it and writes a
+        # new copy. Returns the unreferenced keys kept only because they were stored again within grace_s.
+        moved = {}
+        for key in unreferenced(list(keys)):
+            path = self.path(key)
+            aside = path.with_name(f"{key}.collect")
+            try:
+                os.rename(path, aside)
+            except FileNotFoundError:
+                continue
+            moved[key] = aside
+        if not moved:
+            return []
+        still_unreferenced = set(unreferenced(list(moved)))
+        cutoff = time.time() - grace_s
+        kept = []
+        for key, aside in moved.items():
+            if key in still_unreferenced and aside.stat().st_mtime <= cutoff:
+                aside.unlink()
+                continue
+            os.replace(aside, self.path(key))
+            if key in still_unreferenced:
+                kept.append(key)
+        return kept
+
+
+class BlobCollector:
+    # Deletes blobs once they have stayed unreferenced for grace_s instead of as soon as their last row goes:
+    # a request that picked up the same content before the delete (a cache hit, or a put() of identical
+    # bytes) has that long to commit its own reference, and the sweep reads the references again.
+    def __init__(self, store: BlobStore, unreferenced: Callable[[list[str]], list[str]], grace_s: float = 3600.0):
+        self.store = store
+        self.unreferenced = unreferenced
+        self.grace_s = max(0.0, grace_s)
+        self._due: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def schedule(self, keys: list[str]) -> None:
+        due = time.monotonic() + self.grace_s
+        with self._lock:
+            for key in keys:
+                self._due[key] = due
+
+    def scan(self, batch_size: int = 500) -> int:
+        # Candidates are kept in memory only, so blobs whose rows were deleted before a restart are found again
+        # by checking every stored blob. They are due at once; collect() still spares any stored again within
+        # grace_s.
+        keys = self.store.keys()
+        found = []
+        for start in range(0, len(keys), batch_size):
+            found += self.unreferenced(keys[start:start + batch_size])
+        now = time.monotonic()
+        with self._lock:
+            for key in found:
+                self._due.setdefault(key, now)
+        return len(found)
+
+    def sweep(self, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            keys = [key for key, due in self._due.items() if due <= now]
+            for key in keys:
+                del self._due[key]
+        if not keys:
+            return
+        try:
+            kept = self.store.collect(keys, self.unreferenced, self.grace_s)
+        except Exception:
+            self.schedule(keys)
+            raise
+        self.schedule(kept)
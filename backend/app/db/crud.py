@@ -1,30 +1,201 @@
+import base64
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, or_
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 
-from app.db.models import Analysis
+from app.db.models import Analysis, AnalysisBlob, AnalysisJob
+
+ACTIVE_JOB_STATUSES = ("queued", "running")
+HISTORY_COLUMNS = (
+    Analysis.request_id,
+    Analysis.created_at,
+    Analysis.patient_id,
+    Analysis.visit_label,
+    Analysis.auscultation_site,
+    Analysis.summary,
+)
 
 
-def create_analysis(db: Session, analysis: Analysis) -> Analysis:
+def create_analysis(db: Session, analysis: Analysis, blobs: list[AnalysisBlob] | None = None) -> Analysis:
     db.add(analysis)
+    db.flush()
+    if blobs:
+        db.add_all(blobs)
     db.commit()
     db.refresh(analysis)
     return analysis
 
 
-def list_history(db: Session, patient_id: str | None, limit: int = 50) -> list[Analysis]:
-    query = db.query(Analysis)
+def create_analyses(db: Session, records: list[tuple[Analysis, list[AnalysisBlob]]]) -> int:
+    if not records:
+        return 0
+    db.add_all([analysis for analysis, _ in records])
+    db.flush()
+    db.add_all([blob for _, blobs in records for blob in blobs])
+    db.commit()
+    return len(records)
+
+
+def encode_history_cursor(created_at: datetime, request_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{request_id}".encode()).decode()
+
+
+def decode_history_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        created_at, request_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), request_id
+    except ValueError as exc:
+        raise ValueError("Invalid history cursor.") from exc
+
+
+def list_history(
+    db: Session, patient_id: str | None, limit: int = 50, after: tuple[datetime, str] | None = None
+) -> list[Row]:
+    # Keyset pagination, newest first: each page continues strictly after the (created_at, request_id) of
+    # the previous page's last row, so a page costs the same however deep it is. Only the list columns
+    # are selected; response_json is never read.
+    query = db.query(*HISTORY_COLUMNS)
     if patient_id:
         query = query.filter(Analysis.patient_id == patient_id)
-    return query.order_by(Analysis.created_at.desc()).limit(limit).all()
+    if after is not None:
+        created_at, request_id = after
+        query = query.filter(
+            or_(
+                Analysis.created_at < created_at,
+                and_(Analysis.created_at == created_at, Analysis.request_id < request_id),
+            )
+        )
+    return query.order_by(Analysis.created_at.desc(), Analysis.request_id.desc()).limit(limit).all()
 
 
 def get_analysis(db: Session, request_id: str) -> Analysis | None:
     return db.query(Analysis).filter(Analysis.request_id == request_id).first()
 
 
+def find_analysis_by_cache_key(db: Session, cache_key: str) -> Analysis | None:
+    return (
+        db.query(Analysis)
+        .filter(Analysis.cache_key == cache_key)
+        .order_by(Analysis.created_at.desc())
+        .first()
+    )
+
+
+def get_blob_refs(db: Session, request_id: str) -> dict[str, AnalysisBlob]:
+    refs = db.query(AnalysisBlob).filter(AnalysisBlob.request_id == request_id).all()
+    return {ref.name: ref for ref in refs}
+
+
+def add_blob_ref(db: Session, blob: AnalysisBlob) -> AnalysisBlob:
+    blob = db.merge(blob)
+    db.commit()
+    return blob
+
+
+def unreferenced_blob_keys(db: Session, keys: list[str]) -> list[str]:
+    if not keys:
+        return []
+    in_use = {
+        key for (key,) in db.query(AnalysisBlob.blob_key).filter(AnalysisBlob.blob_key.in_(keys)).distinct()
+    }
+    in_use.update(
+        key
+        for (key,) in db.query(AnalysisJob.audio_blob_key)
+        .filter(AnalysisJob.audio_blob_key.in_(keys), AnalysisJob.status.in_(ACTIVE_JOB_STATUSES))
+        .distinct()
+    )
+    return [key for key in set(keys) if key not in in_use]
+
+
 def delete_analysis(db: Session, request_id: str) -> bool:
     analysis = get_analysis(db, request_id)
     if not analysis:
         return False
+    db.query(AnalysisBlob).filter(AnalysisBlob.request_id == request_id).delete(synchronize_session=False)
     db.delete(analysis)
     db.commit()
     return True
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def create_job(db: Session, job: AnalysisJob) -> AnalysisJob:
+    job.created_at = job.updated_at = _utcnow()
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_job(db: Session, job_id: str) -> AnalysisJob | None:
+    return db.get(AnalysisJob, job_id)
+
+
+def _claimable(now: datetime):
+    return or_(
+        AnalysisJob.status == "queued",
+        and_(AnalysisJob.status == "running", AnalysisJob.lease_expires_at < now),
+    )
+
+
+def claim_next_job(db: Session, lease_s: float) -> AnalysisJob | None:
+    # Running jobs whose lease lapsed belonged to a worker that died; they are claimed again.
+    now = _utcnow()
+    candidate = db.query(AnalysisJob.job_id).filter(_claimable(now)).order_by(AnalysisJob.created_at).first()
+    if candidate is None:
+        return None
+    claimed = (
+        db.query(AnalysisJob)
+        .filter(AnalysisJob.job_id == candidate.job_id, _claimable(now))
+        .update(
+            {
+                AnalysisJob.status: "running",
+                AnalysisJob.stage: "claimed",
+                AnalysisJob.attempts: AnalysisJob.attempts + 1,
+                AnalysisJob.lease_expires_at: now + timedelta(seconds=lease_s),
+                AnalysisJob.updated_at: now,
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    if claimed != 1:
+        return None
+    return get_job(db, candidate.job_id)
+
+
+def update_job(db: Session, job_id: str, **fields) -> None:
+    fields["updated_at"] = _utcnow()
+    db.query(AnalysisJob).filter(AnalysisJob.job_id == job_id).update(fields, synchronize_session=False)
+    db.commit()
+
+
+def complete_job(db: Session, job_id: str, analysis: Analysis, blobs: list[AnalysisBlob] | None = None) -> Analysis:
+    # The history row and the job's done state commit together, so a job re-run after its server died
+    # mid-store cannot leave a second copy of the analysis behind.
+    db.add(analysis)
+    db.flush()
+    if blobs:
+        db.add_all(blobs)
+    db.query(AnalysisJob).filter(AnalysisJob.job_id == job_id).update(
+        {
+            AnalysisJob.status: "done",
+            AnalysisJob.stage: None,
+            AnalysisJob.lease_expires_at: None,
+            AnalysisJob.error: None,
+            AnalysisJob.request_id: analysis.request_id,
+            AnalysisJob.updated_at: _utcnow(),
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+    db.refresh(analysis)
+    return analysis
+
+
+def renew_job_lease(db: Session, job_id: str, lease_s: float) -> None:
+    update_job(db, job_id, lease_expires_at=_utcnow() + timedelta(seconds=lease_s))
@@ -1,7 +1,30 @@
+from sqlalchemy import inspect, text
+
 from app.db.models import Base
 from app.db.session import get_engine
 
 
+def _add_missing_columns(engine) -> None:
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+
+
+def _add_missing_indexes(engine) -> None:
+    # create_all only builds indexes together with a new table, so databases from older releases get them here.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
 def init_db(db_url: str | None = None) -> None:
     engine = get_engine(db_url)
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns(engine)
+    _add_missing_indexes(engine)
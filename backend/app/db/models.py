@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, String, Text
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.dialects.sqlite import JSON
 from sqlalchemy.orm import declarative_base
 
@@ -7,11 +7,45 @@ Base = declarative_base()
 
 class Analysis(Base):
     __tablename__ = "analyses"
+    __table_args__ = (Index("ix_analyses_patient_created", "patient_id", "created_at"),)
 
     request_id = Column(String, primary_key=True, index=True)
-    created_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, nullable=False, index=True)
     patient_id = Column(String, nullable=False, index=True)
     visit_label = Column(String, nullable=True)
     auscultation_site = Column(String, nullable=False)
     summary = Column(Text, nullable=False)
     response_json = Column(JSON, nullable=False)
+    artifacts_mode = Column(String, nullable=True)
+    cache_key = Column(String, nullable=True, index=True)
+
+
+class AnalysisBlob(Base):
+    __tablename__ = "analysis_blobs"
+
+    request_id = Column(String, ForeignKey("analyses.request_id", ondelete="CASCADE"), primary_key=True)
+    name = Column(String, primary_key=True)
+    blob_key = Column(String, nullable=False, index=True)
+    content_type = Column(String, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+
+
+class AnalysisJob(Base):
+    __tablename__ = "analysis_jobs"
+
+    job_id = Column(String, primary_key=True)
+    created_at = Column(DateTime, nullable=False, index=True)
+    updated_at = Column(DateTime, nullable=False)
+    status = Column(String, nullable=False, index=True)
+    stage = Column(String, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    lease_expires_at = Column(DateTime, nullable=True)
+    filename = Column(String, nullable=False)
+    patient_id = Column(String, nullable=False)
+    visit_label = Column(String, nullable=True)
+    auscultation_site = Column(String, nullable=False)
+    options = Column(JSON, nullable=False)
+    audio_blob_key = Column(String, nullable=False, index=True)
+    partial = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    request_id = Column(String, ForeignKey("analyses.request_id", ondelete="SET NULL"), nullable=True)
@@ -1,19 +1,115 @@
 import os
+import threading
+import warnings
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker
 
+from app.config import Settings
+
+_engines: dict[str, Engine] = {}
+_engine_options: dict[str, tuple] = {}
+_engines_lock = threading.Lock()
+
 
 def get_database_url() -> str:
     return os.getenv("DATABASE_URL", "sqlite:///./app.db")
 
 
-def get_engine(db_url: str | None = None):
+def sqlite_pragmas(settings: Settings) -> list[str]:
+    # WAL lets readers run alongside the single writer and makes commits an append to the log;
+    # synchronous=NORMAL then only syncs at checkpoints, which is still durable against application crashes.
+    return [
+        f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_mb << 20}",
+        f"PRAGMA cache_size={-(settings.sqlite_cache_mb << 10)}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def _options(settings: Settings) -> tuple:
+    return (
+        settings.db_pool_size,
+        settings.db_max_overflow,
+        settings.db_pool_timeout_s,
+        settings.db_pool_recycle_s,
+        *sqlite_pragmas(settings),
+    )
+
+
+def _create_engine(url: str, settings: Settings) -> Engine:
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return create_engine(
+            url,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout_s,
+            pool_recycle=settings.db_pool_recycle_s,
+            pool_pre_ping=True,
+        )
+
+    connect_args = {"check_same_thread": False, "timeout": settings.sqlite_busy_timeout_ms / 1000.0}
+    if parsed.database in (None, "", ":memory:"):
+        engine = create_engine(url, connect_args=connect_args)
+    else:
+        engine = create_engine(
+            url,
+            connect_args=connect_args,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout_s,
+        )
+    pragmas = sqlite_pragmas(settings)
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    return engine
+
+
+def get_engine(db_url: str | None = None, settings: Settings | None = None) -> Engine:
+    # One engine (and connection pool) per database URL for the whole process. The first caller's
+    # settings configure it; later callers share it, so differing settings are reported rather than dropped.
     url = db_url or get_database_url()
-    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
-    return create_engine(url, connect_args=connect_args)
+    with _engines_lock:
+        engine = _engines.get(url)
+        if engine is None:
+            settings = settings or Settings()
+            engine = _engines[url] = _create_engine(url, settings)
+            _engine_options[url] = _options(settings)
+        elif settings is not None and _options(settings) != _engine_options[url]:
+            warnings.warn(
+                f"The engine for {engine.url!r} was created with other pool or SQLite settings; "
+                "these settings are ignored.",
+                RuntimeWarning,
+                stacklevel=2,
+            )
+    return engine
+
+
+def _dispose_after_fork() -> None:
+    # Connections pooled before a fork (init_db under gunicorn --preload, a fork-context analysis pool) belong to
+    # the parent. The child forgets them without closing the parent's sockets and opens its own on first use.
+    global _engines_lock
+    _engines_lock = threading.Lock()
+    for engine in _engines.values():
+        engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_dispose_after_fork)
 
 
-def get_session_maker(db_url: str | None = None):
-    engine = get_engine(db_url)
+def get_session_maker(db_url: str | None = None, settings: Settings | None = None):
+    engine = get_engine(db_url, settings)
     return sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.calibration.temperature import TemperatureScaler
+from app.ml.analysis import PIPELINE_VERSION
+from app.ml.pipeline import model_version
+
+
+@dataclass
+class CachedAnalysis:
+    analysis: dict
+    blobs: dict[str, tuple[str, str, int]]
+
+
+def analysis_cache_key(samples: np.ndarray, sample_rate: int, options: dict) -> str:
+    digest = hashlib.blake2b(digest_size=32)
+    digest.update(memoryview(np.ascontiguousarray(samples, dtype=np.float32)).cast("B"))
+    digest.update(f"|sr={sample_rate}|model={model_version()}".encode())
+    digest.update(f"|calibration=temperature:{TemperatureScaler().temperature}|pipeline={PIPELINE_VERSION}".encode())
+    for name in sorted(options):
+        digest.update(f"|{name}={options[name]}".encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max(0, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, CachedAnalysis] = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    def get(self, key: str) -> CachedAnalysis | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: CachedAnalysis) -> None:
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: str | None) -> None:
+        if key is None:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_compute(
+        self, key: str, compute: Callable[[], Awaitable[tuple[CachedAnalysis, str]]]
+    ) -> tuple[CachedAnalysis, str]:
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached, "memory"
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending), "shared"
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value, source = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # Waiters re-raise it; mark it retrieved so an unobserved failure is not logged.
+            future.exception()
+            raise
+        else:
+            self.put(key, value)
+            future.set_result(value)
+            return value, source
+        finally:
+            self._inflight.pop(key, None)
+
+    async def get_or_compute_many(
+        self, keys: list[str], compute: Callable[[list[str]], Awaitable[list]]
+    ) -> list[tuple[CachedAnalysis, str] | Exception]:
+        # get_or_compute for a group: the keys neither cached nor being computed elsewhere are computed together
+        # by one compute call, which returns a (value, source) pair or an exception for each key it is given.
+        outcomes: dict[str, tuple[CachedAnalysis, str] | Exception] = {}
+        shared: dict[str, asyncio.Future] = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            cached = self.get(key)
+            if cached is not None:
+                self.hits += 1
+                outcomes[key] = cached, "memory"
+            elif key in self._inflight:
+                self.hits += 1
+                shared[key] = self._inflight[key]
+            else:
+                self.misses += 1
+                missing.append(key)
+
+        loop = asyncio.get_running_loop()
+        futures = {key: loop.create_future() for key in missing}
+        self._inflight.update(futures)
+        try:
+            computed = await compute(missing) if missing else []
+        except asyncio.CancelledError:
+            for future in futures.values():
+                future.cancel()
+            raise
+        except Exception as exc:
+            computed = [exc] * len(missing)
+        finally:
+            for key in missing:
+                self._inflight.pop(key, None)
+        for key, outcome in zip(missing, computed):
+            if isinstance(outcome, Exception):
+                futures[key].set_exception(outcome)
+                futures[key].exception()
+            else:
+                self.put(key, outcome[0])
+                futures[key].set_result(outcome[0])
+            outcomes[key] = outcome
+
+        for key, pending in shared.items():
+            try:
+                outcomes[key] = await asyncio.shield(pending), "shared"
+            except Exception as exc:
+                outcomes[key] = exc
+
+        results = []
+        seen = set()
+        for key in keys:
+            outcome = outcomes[key]
+            if key in seen and not isinstance(outcome, Exception):
+                outcome = outcome[0], "shared"
+            seen.add(key)
+            results.append(outcome)
+        return results
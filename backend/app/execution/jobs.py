@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.db.crud import claim_next_job, renew_job_lease, update_job
+from app.db.models import AnalysisJob
+from app.execution.pool import QueueFullError
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+logger = logging.getLogger(__name__)
+
+
+class JobRunner:
+    def __init__(
+        self,
+        session_maker,
+        handler: Callable[[AnalysisJob], Awaitable[None]],
+        workers: int = 1,
+        lease_s: float = 60.0,
+        poll_interval_s: float = 1.0,
+        max_attempts: int = 3,
+        retry_after_s: float = 5.0,
+        on_failed: Callable[[AnalysisJob], None] | None = None,
+    ):
+        self.session_maker = session_maker
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.lease_s = lease_s
+        self.poll_interval_s = poll_interval_s
+        self.max_attempts = max(1, max_attempts)
+        self.retry_after_s = retry_after_s
+        self.on_failed = on_failed
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+
+    def _with_session(self, fn, *args, **kwargs):
+        with self.session_maker() as db:
+            return fn(db, *args, **kwargs)
+
+    def _update(self, job_id: str, **fields) -> None:
+        self._with_session(update_job, job_id, **fields)
+
+    def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    def notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self) -> None:
+        # A database error (say, a lock held past the busy timeout) skips one round; the worker keeps going and
+        # a job it had claimed is picked up again once its lease lapses.
+        while True:
+            try:
+                job = await run_in_threadpool(self._with_session, claim_next_job, self.lease_s)
+                if job is not None:
+                    await self._run(job)
+                    continue
+            except Exception:
+                logger.exception("Job worker round failed; retrying after %.1f s.", self.poll_interval_s)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval_s)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _heartbeat(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease_s / 3)
+            try:
+                await run_in_threadpool(self._with_session, renew_job_lease, job_id, self.lease_s)
+            except Exception:
+                logger.exception("Could not renew the lease of job %s; retrying.", job_id)
+
+    async def _run(self, job: AnalysisJob) -> None:
+        if job.attempts > self.max_attempts:
+            await run_in_threadpool(self._fail, job, f"Gave up after {self.max_attempts} attempts.")
+            return
+        heartbeat = asyncio.create_task(self._heartbeat(job.job_id))
+        try:
+            await self.handler(job)
+        except QueueFullError:
+            await run_in_threadpool(self._requeue, job)
+            await asyncio.sleep(self.retry_after_s)
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back instead of waiting for its lease to lapse, without blocking the loop.
+            await asyncio.shield(run_in_threadpool(self._requeue, job))
+            raise
+        except Exception as exc:
+            await run_in_threadpool(self._fail, job, str(exc))
+        finally:
+            heartbeat.cancel()
+
+    def _fail(self, job: AnalysisJob, error: str) -> None:
+        self._update(job.job_id, status="failed", stage=None, lease_expires_at=None, error=error)
+        if self.on_failed is not None:
+            self.on_failed(job)
+
+    def _requeue(self, job: AnalysisJob) -> None:
+        self._update(job.job_id, status="queued", stage=None, lease_expires_at=None, attempts=job.attempts - 1)
@@ -0,0 +1,281 @@
+import asyncio
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from app.ml.analysis import analyze_recording, analyze_recordings
+from app.ml.pipeline import configure_engine
+from app.ml.warmup import WARMUP_SAMPLE_RATE, synthetic_recording
+
+EXECUTOR_MODES = {"process", "thread", "inline"}
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+def _attach_shared(name: str) -> SharedMemory:
+    # The parent owns the block and unlinks it. Before 3.13 workers share the parent's
+    # resource tracker, where registering an already-tracked name is a no-op, while
+    # unregistering it would drop the parent's own registration.
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=name, track=False)
+    return SharedMemory(name=name)
+
+
+def _init_worker(engine: str, weights: str | None, warmed=None) -> None:
+    configure_engine(engine, weights)
+    if warmed is not None:
+        # Warming in the initializer, before the worker takes any task, covers every worker the pool
+        # starts; warm-up calls alone may all land on whichever worker is ready first.
+        analyze_recording(synthetic_recording(), WARMUP_SAMPLE_RATE, artifacts="inline")
+        warmed.release()
+
+
+def _analyze_shared(name: str, shape: tuple, dtype: str, sample_rate: int, options: dict) -> dict:
+    shm = _attach_shared(name)
+    try:
+        samples = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        result = analyze_recording(samples, sample_rate, **options)
+        del samples
+        return result
+    finally:
+        shm.close()
+
+
+def _analyze_shared_many(
+    name: str, lengths: list[int], dtype: str, sample_rates: list[int], options: dict
+) -> list[dict]:
+    shm = _attach_shared(name)
+    try:
+        flat = np.ndarray((sum(lengths),), dtype=dtype, buffer=shm.buf)
+        offsets = np.cumsum([0] + lengths)
+        recordings = [(flat[start:end], rate) for start, end, rate in zip(offsets[:-1], offsets[1:], sample_rates)]
+        results = analyze_recordings(recordings, **options)
+        del flat, recordings
+        return results
+    finally:
+        shm.close()
+
+
+class AnalysisExecutor:
+    def __init__(
+        self,
+        mode: str = "process",
+        workers: int = 1,
+        queue_size: int = 8,
+        mp_context: str = "spawn",
+        engine: str = "numpy",
+        weights: str | None = None,
+        warmup: bool = False,
+    ):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown executor mode: {mode}")
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.capacity = self.workers + max(0, queue_size)
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._restart_lock = threading.Lock()
+        self._warmed = None
+        self._cold = 0
+        self._broken = False
+        self.restarts = 0
+        if mode == "process":
+            self._context = multiprocessing.get_context(mp_context)
+            self._engine = (engine, weights)
+            self._warmup = warmup
+            self._pool = self._new_pool()
+        elif mode == "thread":
+            configure_engine(engine, weights)
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="analysis")
+        else:
+            configure_engine(engine, weights)
+            self._pool = None
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # A fresh semaphore per pool, so a signal from a worker of a replaced pool is not counted.
+        with self._lock:
+            self._warmed = self._context.Semaphore(0) if self._warmup else None
+            self._cold = self.workers if self._warmup else 0
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=self._context,
+            initializer=_init_worker,
+            initargs=(*self._engine, self._warmed),
+        )
+
+    def _start_workers(self) -> list[Future]:
+        # The pool starts a worker for each call that finds none idle, so one call per worker starts them all;
+        # each warms up in its initializer and signals once it has.
+        return [self._pool.submit(os.getpid) for _ in range(self.workers)]
+
+    def _restart(self, broken: ProcessPoolExecutor) -> None:
+        # A worker that dies (killed for memory, say) breaks the whole pool: every pending and later call fails
+        # with BrokenProcessPool. Replace it with a new pool, which reruns the initializer and warm-up, and
+        # report not ready until the new workers are warm.
+        with self._restart_lock:
+            if self._pool is not broken:
+                return
+            self._pool = self._new_pool()
+            self._broken = False
+            self.restarts += 1
+            if self._warmup:
+                self._start_workers()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _watch(self, future: Future) -> None:
+        pool = self._pool
+
+        def _check(done: Future) -> None:
+            if not done.cancelled() and isinstance(done.exception(), BrokenProcessPool) and pool is self._pool:
+                self._broken = True
+
+        future.add_done_callback(_check)
+
+    def _submit_process(self, submit, *args) -> Future:
+        if self._broken:
+            self._restart(self._pool)
+        pool = self._pool
+        try:
+            future = submit(*args)
+        except BrokenProcessPool:
+            self._restart(pool)
+            future = submit(*args)
+        self._watch(future)
+        return future
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def ready(self) -> bool:
+        if self._warmed is None:
+            return True
+        with self._lock:
+            while self._cold and self._warmed.acquire(False):
+                self._cold -= 1
+            return self._cold == 0 and not self._broken
+
+    def _acquire(self) -> None:
+        if not self._slots.acquire(blocking=False):
+            raise QueueFullError("Analysis queue is full.")
+        with self._lock:
+            self._in_flight += 1
+
+    def _release(self, _future: Future | None = None) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def submit(self, samples: np.ndarray, sample_rate: int, **options) -> Future:
+        self._acquire()
+        try:
+            if self.mode == "process":
+                future = self._submit_process(self._submit_shared, samples, sample_rate, options)
+            elif self.mode == "thread":
+                future = self._pool.submit(analyze_recording, samples, sample_rate, **options)
+            else:
+                future = Future()
+                try:
+                    future.set_result(analyze_recording(samples, sample_rate, **options))
+                except Exception as exc:
+                    future.set_exception(exc)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def submit_many(self, recordings: list[tuple[np.ndarray, int]], **options) -> Future:
+        # One queue slot and one worker call per group, so the group's model inputs are batched together.
+        self._acquire()
+        try:
+            if self.mode == "process":
+                future = self._submit_process(self._submit_shared_many, recordings, options)
+            elif self.mode == "thread":
+                future = self._pool.submit(analyze_recordings, recordings, **options)
+            else:
+                future = Future()
+                try:
+                    future.set_result(analyze_recordings(recordings, **options))
+                except Exception as exc:
+                    future.set_exception(exc)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _submit_shared(self, samples: np.ndarray, sample_rate: int, options: dict) -> Future:
+        samples = np.ascontiguousarray(samples)
+        shm = SharedMemory(create=True, size=max(samples.nbytes, 1))
+        try:
+            np.ndarray(samples.shape, dtype=samples.dtype, buffer=shm.buf)[...] = samples
+            future = self._pool.submit(
+                _analyze_shared, shm.name, samples.shape, samples.dtype.str, sample_rate, options
+            )
+        except BaseException:
+            shm.close()
+            shm.unlink()
+            raise
+
+        def _cleanup(_future: Future) -> None:
+            shm.close()
+            shm.unlink()
+
+        future.add_done_callback(_cleanup)
+        return future
+
+    def _submit_shared_many(self, recordings: list[tuple[np.ndarray, int]], options: dict) -> Future:
+        lengths = [len(samples) for samples, _ in recordings]
+        shm = SharedMemory(create=True, size=max(sum(lengths) * 4, 1))
+        try:
+            flat = np.ndarray((sum(lengths),), dtype=np.float32, buffer=shm.buf)
+            offset = 0
+            for samples, _ in recordings:
+                flat[offset:offset + len(samples)] = samples
+                offset += len(samples)
+            del flat
+            future = self._pool.submit(
+                _analyze_shared_many, shm.name, lengths, "<f4", [rate for _, rate in recordings], options
+            )
+        except BaseException:
+            shm.close()
+            shm.unlink()
+            raise
+
+        def _cleanup(_future: Future) -> None:
+            shm.close()
+            shm.unlink()
+
+        future.add_done_callback(_cleanup)
+        return future
+
+    async def warm_up(self, samples: np.ndarray, sample_rate: int, **options) -> None:
+        if self._warmed is None:
+            await self.run(samples, sample_rate, **options)
+            return
+        await asyncio.gather(*(asyncio.wrap_future(future) for future in self._start_workers()))
+        while not self.ready:
+            await asyncio.sleep(0.1)
+            # Raises BrokenProcessPool if a worker died while warming up, instead of waiting forever.
+            self._pool.submit(os.getpid)
+
+    async def run(self, samples: np.ndarray, sample_rate: int, **options) -> dict:
+        return await asyncio.wrap_future(self.submit(samples, sample_rate, **options))
+
+    async def run_many(self, recordings: list[tuple[np.ndarray, int]], **options) -> list[dict]:
+        return await asyncio.wrap_future(self.submit_many(recordings, **options))
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
@@ -1,14 +1,35 @@
 import numpy as np
-import torch
-
-
-def saliency_heatmap(model: torch.nn.Module, mel_db: np.ndarray) -> np.ndarray:
-    model.eval()
-    mel_tensor = torch.tensor(mel_db, dtype=torch.float32, requires_grad=True)
-    features = torch.cat([mel_tensor.mean(dim=1), mel_tensor.std(dim=1)], dim=0)
-    logits = model(features)
-    murmur_logit = logits[0]
-    murmur_logit.backward()
-    grads = mel_tensor.grad.detach().abs().numpy()
-    heatmap = grads / (np.max(grads) + 1e-6)
+
+CHUNK_FRAMES = 4096
+
+
+def feature_gradient(model, features: np.ndarray) -> np.ndarray:
+    # d murmur_logit / d features for Linear-ReLU-(Dropout off)-Linear.
+    active = (model.w1 @ features + model.b1) > 0
+    return (model.w2[0] * active) @ model.w1
+
+
+def saliency_heatmap(model, mel_db: np.ndarray, chunk_frames: int = CHUNK_FRAMES) -> np.ndarray:
+    # Features are per-band time mean and (ddof=1) std, so the logit's gradient wrt mel cell (b, t) is
+    # g_mean[b] / T + g_std[b] * (x[b, t] - mean[b]) / ((T - 1) * std[b]); frames are filled in chunks.
+    mel_db = np.asarray(mel_db, dtype=np.float32)
+    n_bands, n_frames = mel_db.shape
+    mean = mel_db.mean(axis=1, dtype=np.float64)
+    std = mel_db.std(axis=1, ddof=1, dtype=np.float64)
+    gradient = feature_gradient(model, np.concatenate([mean, std]).astype(np.float32))
+    offset = (gradient[:n_bands] / n_frames).astype(np.float32)[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = np.where(std > 0, gradient[n_bands:] / ((n_frames - 1) * std), 0.0).astype(np.float32)[:, None]
+    center = mean.astype(np.float32)[:, None]
+
+    heatmap = np.empty_like(mel_db)
+    peak = 0.0
+    for start in range(0, n_frames, chunk_frames):
+        chunk = heatmap[:, start:start + chunk_frames]
+        np.subtract(mel_db[:, start:start + chunk_frames], center, out=chunk)
+        chunk *= scale
+        chunk += offset
+        np.abs(chunk, out=chunk)
+        peak = max(peak, float(chunk.max()))
+    heatmap /= np.float32(peak + 1e-6)
     return heatmap
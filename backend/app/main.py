@@ -1,24 +1,68 @@
+from contextlib import asynccontextmanager
+from dataclasses import asdict
 from datetime import datetime, timezone
+import asyncio
+import base64
 import json
+import logging
+import time
 import uuid
+import warnings
 
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile, Depends
+import numpy as np
+
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile, Depends, Request, Response, WebSocket
+from fastapi import WebSocketDisconnect
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.calibration.temperature import CALIBRATION_EXPLANATION, TemperatureScaler
-from app.db.crud import create_analysis, delete_analysis, get_analysis, list_history
+from app.calibration.temperature import CALIBRATION_EXPLANATION
+from app.config import Settings
+from app.db.blobs import BlobCollector, BlobStore, array_to_bytes
+from app.db.crud import (
+    add_blob_ref,
+    complete_job,
+    create_analyses,
+    create_analysis,
+    create_job,
+    decode_history_cursor,
+    delete_analysis,
+    encode_history_cursor,
+    find_analysis_by_cache_key,
+    get_analysis,
+    get_blob_refs,
+    get_job,
+    list_history,
+    unreferenced_blob_keys,
+    update_job,
+)
 from app.db.init_db import init_db
-from app.db.models import Analysis
-from app.db.session import get_session_maker
-from app.explainability.saliency import saliency_heatmap
-from app.ml.pipeline import run_model, sliding_window_segments
-from app.quality.metrics import compute_quality
-from app.uncertainty.estimate import mc_dropout_uncertainty
-from app.utils.audio import is_wav_filename, load_wav
-from app.utils.plots import plot_explainability, plot_spectrogram, plot_timeline, plot_waveform
-from app.utils.risk import assess_risk
+from app.db.models import Analysis, AnalysisBlob, AnalysisJob
+from app.db.session import get_engine, get_session_maker
+from app.execution.cache import CachedAnalysis, ResultCache, analysis_cache_key
+from app.execution.jobs import JobRunner
+from app.execution.pool import AnalysisExecutor, QueueFullError
+from app.metrics import PredictMetrics, PredictMetricsMiddleware, StageTimer
+from app.ml.analysis import ANALYSIS_FIELDS
+from app.ml.pipeline import configure_batching, configure_engine, disable_batching, get_batcher
+from app.ml.streaming import StreamingAnalyzer
+from app.ml.warmup import WARMUP_SAMPLE_RATE, preload, synthetic_recording, warm_parent
+from app.quality.metrics import QualityAccumulator, compute_quality
+from app.uncertainty.estimate import MAX_MC_PASSES, MC_DROPOUT_MODES
+from app.utils.artifacts import ARTIFACT_MODES, ARTIFACT_NAMES, artifact_links, render_artifact
+from app.utils.audio import (
+    MIN_DURATION_S,
+    AudioData,
+    UploadTooLargeError,
+    decode_audio_stream,
+    resample_audio,
+)
+from app.utils.batch import BatchEntry, entry_fields, expand_uploads, parse_metadata
+from app.utils.plots import plot_renderer
 
 
 class InputInfo(BaseModel):
@@ -28,6 +72,7 @@ class InputInfo(BaseModel):
     auscultation_site: str
     duration_s: float
     sample_rate: int
+    original_sample_rate: int | None = None
 
 
 class MurmurResult(BaseModel):
@@ -70,6 +115,13 @@ class ArtifactsResult(BaseModel):
     explainability_png_base64: str
 
 
+class ArtifactLinks(BaseModel):
+    waveform_png_url: str
+    spectrogram_png_url: str
+    timeline_png_url: str
+    explainability_png_url: str
+
+
 class PredictResponse(BaseModel):
     request_id: str
     created_at: str
@@ -80,7 +132,7 @@ class PredictResponse(BaseModel):
     risk: RiskResult
     safe_advice: list[str]
     segments: list[SegmentResult]
-    artifacts: ArtifactsResult
+    artifacts: ArtifactsResult | ArtifactLinks | None = None
 
 
 SAFE_ADVICE = [
@@ -91,11 +143,122 @@ SAFE_ADVICE = [
 ]
 
 AUSCULTATION_SITES = {"Aortic", "Pulmonic", "Tricuspid", "Mitral", "Unknown"}
+MAX_BATCH_GROUP = 32
+HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 500
+STREAM_ENCODINGS = {"pcm_s16le": np.dtype("<i2"), "f32le": np.dtype("<f4")}
+
+logger = logging.getLogger(__name__)
+
+
+def _form_int(form, name: str, default: int) -> int:
+    value = form.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=f"{name} must be an integer.") from exc
+
+
+def _error_line(entry: BatchEntry, exc: Exception) -> dict:
+    return {"index": entry.index, "filename": entry.filename, "status": "error", "error": str(exc)}
+
+
+def create_app(db_url: str | None = None, settings: Settings | None = None) -> FastAPI:
+    settings = settings or Settings()
+    created = time.perf_counter()
+    # The serving process hashes cache keys with the weights' version and renders saliency itself, so it uses the
+    # configured weights too. Preloading them only pays off when workers are forked from this process (a fork
+    # pool, or gunicorn --preload with PRELOAD_MODEL=1); spawned workers load their own copy regardless.
+    configure_engine(settings.inference_engine, settings.model_weights)
+    preload_model = settings.mp_context == "fork" if settings.preload_model is None else settings.preload_model
+    preload_s = preload() if preload_model else None
+    if settings.inference_batching and settings.executor == "process":
+        # The batcher lives in this process; pool workers run their own unbatched model.
+        warnings.warn(
+            "INFERENCE_BATCHING has no effect on analyses run by the process executor; it only batches model "
+            "calls made in the serving process (thread and inline executors, live streams).",
+            RuntimeWarning,
+            stacklevel=2,
+        )
+    startup = {
+        "ready": not settings.warmup,
+        "preload_s": preload_s,
+        "warmup_s": None,
+        "ready_after_s": None,
+        "error": None,
+    }
+    executor = AnalysisExecutor(
+        mode=settings.executor,
+        workers=settings.workers,
+        queue_size=settings.queue_size,
+        mp_context=settings.mp_context,
+        engine=settings.inference_engine,
+        weights=settings.model_weights,
+        warmup=settings.warmup,
+    )
+
+    background_tasks: set[asyncio.Task] = set()
+
+    def readiness() -> dict:
+        # Not ready while a process pool replaced after a worker died is still warming its new workers.
+        return {**startup, "ready": startup["ready"] and executor.ready, "pool_restarts": executor.restarts}
+
+    @asynccontextmanager
+    async def lifespan(_app: FastAPI):
+        if settings.inference_batching:
+            configure_batching(settings.inference_max_batch, settings.inference_max_wait_ms)
+        job_runner.start()
+        warmup_task = asyncio.create_task(warm_up()) if settings.warmup else None
+        sweep_task = asyncio.create_task(sweep_blobs())
+        try:
+            yield
+        finally:
+            if warmup_task is not None:
+                warmup_task.cancel()
+                await asyncio.gather(warmup_task, return_exceptions=True)
+            sweep_task.cancel()
+            await asyncio.gather(sweep_task, return_exceptions=True)
+            await asyncio.gather(*background_tasks, return_exceptions=True)
+            await job_runner.stop()
+            executor.shutdown()
+            database.dispose()
+            if settings.inference_batching:
+                disable_batching()
+
+    async def warm_up() -> None:
+        # One full analysis per worker on a synthetic recording pays for first-call costs (lazy imports, DSP
+        # and renderer caches) before /api/ready reports ready.
+        started = time.perf_counter()
+        try:
+            await executor.warm_up(synthetic_recording(), WARMUP_SAMPLE_RATE, artifacts="inline")
+            await run_in_threadpool(warm_parent)
+        except Exception as exc:
+            startup["error"] = f"Warm-up failed: {exc}"
+            return
+        finally:
+            startup["warmup_s"] = time.perf_counter() - started
+        startup["ready"] = True
+        startup["ready_after_s"] = time.perf_counter() - created
 
+    async def sweep_blobs() -> None:
+        scanned = False
+        while True:
+            await asyncio.sleep(min(max(settings.blob_gc_grace_s, 1.0), 60.0))
+            try:
+                if not scanned:
+                    await run_in_threadpool(blob_collector.scan)
+                    scanned = True
+                await run_in_threadpool(blob_collector.sweep)
+            except Exception:
+                # The keys stay scheduled; a database briefly locked by a writer is retried next round.
+                continue
 
-def create_app(db_url: str | None = None) -> FastAPI:
-    app = FastAPI(title="Murmur Screening", version="1.0")
+    app = FastAPI(title="Murmur Screening", version="1.0", lifespan=lifespan)
 
+    metrics = PredictMetrics()
+    app.add_middleware(PredictMetricsMiddleware, metrics=metrics, path="/api/predict")
     app.add_middleware(
         CORSMiddleware,
         allow_origins=[
@@ -106,11 +269,25 @@ def create_app(db_url: str | None = None) -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
     )
 
+    blob_store = BlobStore(settings.blob_dir)
+    result_cache = ResultCache(settings.result_cache_size)
+    database = get_engine(db_url, settings)
     SessionLocal = get_session_maker(db_url)
     init_db(db_url)
 
+    def unreferenced_blobs(keys: list[str]) -> list[str]:
+        with SessionLocal() as db:
+            return unreferenced_blob_keys(db, keys)
+
+    blob_collector = BlobCollector(blob_store, unreferenced_blobs, settings.blob_gc_grace_s)
+    app.state.settings = settings
+    app.state.session_maker = SessionLocal
+    app.state.blob_collector = blob_collector
+    app.state.metrics = metrics
+
     # Proper DB dependency
     def get_db():
         db = SessionLocal()
@@ -119,128 +296,683 @@ def create_app(db_url: str | None = None) -> FastAPI:
         finally:
             db.close()
 
+    def put_blobs(items: dict[str, tuple[bytes, str]]) -> dict[str, tuple[str, str, int]]:
+        return {name: (blob_store.put(data), content_type, len(data)) for name, (data, content_type) in items.items()}
+
+    def validate_options(mc_dropout_passes: int, mc_dropout_mode: str, artifacts: str | None) -> str:
+        if not 1 <= mc_dropout_passes <= MAX_MC_PASSES:
+            raise HTTPException(status_code=400, detail=f"mc_dropout_passes must be between 1 and {MAX_MC_PASSES}.")
+        if mc_dropout_mode not in MC_DROPOUT_MODES:
+            raise HTTPException(status_code=400, detail="Invalid MC-dropout mode.")
+        artifacts = artifacts or settings.artifacts_mode
+        if artifacts not in ARTIFACT_MODES:
+            raise HTTPException(status_code=400, detail="artifacts must be one of inline, lazy or none.")
+        return artifacts
+
+    async def decode_upload(file: UploadFile, on_samples=None):
+        max_bytes = settings.max_upload_mb << 20
+        if file.size is not None and file.size > max_bytes:
+            raise HTTPException(
+                status_code=413, detail=f"Recording exceeds the {settings.max_upload_mb} MB upload limit."
+            )
+        try:
+            audio = await run_in_threadpool(decode_audio_stream, file.file, max_bytes, on_samples=on_samples)
+        except UploadTooLargeError as exc:
+            raise HTTPException(status_code=413, detail=str(exc)) from exc
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        return await run_in_threadpool(resample_audio, audio, settings.canonical_sample_rate)
+
+    def store_analysis(analysis: dict, artifacts: str) -> CachedAnalysis:
+        blob_items = {}
+        if artifacts == "inline":
+            blob_items = {f"{name}.png": (analysis["artifact_pngs"][name], "image/png") for name in ARTIFACT_NAMES}
+        elif artifacts == "lazy":
+            blob_items = {
+                "waveform.npy": (array_to_bytes(analysis["waveform"]), "application/x-npy"),
+                "mel_db.npy": (array_to_bytes(analysis["mel_db"]), "application/x-npy"),
+            }
+        return CachedAnalysis({key: analysis[key] for key in ANALYSIS_FIELDS}, put_blobs(blob_items))
+
+    def load_from_history(db: Session, cache_key: str) -> CachedAnalysis | None:
+        previous = find_analysis_by_cache_key(db, cache_key)
+        if previous is None:
+            return None
+        refs = get_blob_refs(db, previous.request_id)
+        return CachedAnalysis(
+            analysis={key: previous.response_json[key] for key in ANALYSIS_FIELDS},
+            blobs={name: (ref.blob_key, ref.content_type, ref.size_bytes) for name, ref in refs.items()},
+        )
+
+    def audio_cache_key(audio, options: dict) -> str:
+        return analysis_cache_key(audio.samples, audio.sample_rate, {**options, "renderer": plot_renderer()})
+
+    async def analyze_cached(
+        db: Session, audio, options: dict, cache_key: str, timer: StageTimer
+    ) -> tuple[CachedAnalysis, str]:
+        async def compute() -> tuple[CachedAnalysis, str]:
+            if settings.result_cache:
+                previous = await run_in_threadpool(load_from_history, db, cache_key)
+                if previous is not None:
+                    return previous, "history"
+            with timer.stage("analysis"):
+                analysis = await executor.run(audio.samples, audio.sample_rate, **options)
+            timer.add(analysis["timings"])
+            with timer.stage("blobs"):
+                stored = await run_in_threadpool(store_analysis, analysis, options["artifacts"])
+            return stored, "computed"
+
+        if settings.result_cache:
+            return await result_cache.get_or_compute(cache_key, compute)
+        return await compute()
+
+    async def build_record(
+        cached: CachedAnalysis, audio, fields: dict, artifacts: str, cache_key: str, timer: StageTimer
+    ) -> tuple[dict, tuple[Analysis, list[AnalysisBlob]]]:
+        analysis = cached.analysis
+        request_id = str(uuid.uuid4())
+        artifacts_payload = None
+        if artifacts == "inline":
+            with timer.stage("artifacts"):
+                pngs = await run_in_threadpool(
+                    lambda: {name: blob_store.get(cached.blobs[f"{name}.png"][0]) or b"" for name in ARTIFACT_NAMES}
+                )
+                artifacts_payload = {
+                    f"{name}_png_base64": base64.b64encode(pngs[name]).decode("utf-8") for name in ARTIFACT_NAMES
+                }
+        elif artifacts == "lazy":
+            artifacts_payload = artifact_links(request_id)
+        blobs = [
+            AnalysisBlob(request_id=request_id, name=name, blob_key=key, content_type=content_type, size_bytes=size)
+            for name, (key, content_type, size) in cached.blobs.items()
+        ]
+
+        response_payload = {
+            "request_id": request_id,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "input": {
+                "filename": fields["filename"],
+                "patient_id": fields["patient_id"],
+                "visit_label": fields["visit_label"],
+                "auscultation_site": fields["auscultation_site"],
+                "duration_s": audio.duration_s,
+                "sample_rate": audio.sample_rate,
+                "original_sample_rate": audio.original_sample_rate or audio.sample_rate,
+            },
+            "murmur": analysis["murmur"],
+            "timing": analysis["timing"],
+            "quality": analysis["quality"],
+            "risk": analysis["risk"],
+            "safe_advice": SAFE_ADVICE + [CALIBRATION_EXPLANATION],
+            "segments": analysis["segments"],
+            "artifacts": artifacts_payload,
+        }
+
+        summary = {
+            "murmur_label": analysis["murmur"]["label"],
+            "concern_level": analysis["risk"]["screening_concern_level"],
+            "quality_score": analysis["quality"]["quality_score_0_100"],
+        }
+
+        stored_payload = dict(response_payload)
+        if artifacts == "inline":
+            stored_payload["artifacts"] = None
+
+        record = Analysis(
+            request_id=request_id,
+            created_at=datetime.fromisoformat(response_payload["created_at"]),
+            patient_id=fields["patient_id"],
+            visit_label=fields["visit_label"],
+            auscultation_site=fields["auscultation_site"],
+            summary=json.dumps(summary),
+            response_json=stored_payload,
+            artifacts_mode=artifacts,
+            cache_key=cache_key,
+        )
+        return response_payload, (record, blobs)
+
     @app.get("/api/health")
     def health():
         return {"ok": True}
 
+    @app.get("/api/ready")
+    def ready(response: Response):
+        status = readiness()
+        if not status["ready"]:
+            response.status_code = 503
+        return status
+
+    @app.get("/api/inference/stats")
+    def inference_stats():
+        batcher = get_batcher()
+        if batcher is None:
+            return {"batching": False}
+        return {"batching": True, **batcher.stats()}
+
+    @app.get("/api/metrics", response_class=PlainTextResponse)
+    def prometheus_metrics():
+        return PlainTextResponse(
+            metrics.render(get_batcher(), executor.in_flight, readiness()),
+            media_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
     @app.post("/api/predict", response_model=PredictResponse)
     async def predict(
+        response: Response,
         file: UploadFile = File(...),
         auscultation_site: str = Form(...),
         patient_id: str = Form(...),
         visit_label: str | None = Form(None),
+        mc_dropout_passes: int = Form(20),
+        mc_dropout_mode: str = Form("batched"),
+        artifacts: str | None = Form(None),
         db: Session = Depends(get_db),
     ):
-        if not is_wav_filename(file.filename):
-            raise HTTPException(status_code=400, detail="Only WAV files are supported.")
         if auscultation_site not in AUSCULTATION_SITES:
             raise HTTPException(status_code=400, detail="Invalid auscultation site.")
+        artifacts = validate_options(mc_dropout_passes, mc_dropout_mode, artifacts)
+
+        timer = StageTimer()
+        with timer.stage("decode"):
+            audio = await decode_upload(file)
+        metrics.audio_seconds.inc(amount=audio.duration_s)
 
-        file_bytes = await file.read()
+        options = {
+            "mc_dropout_passes": mc_dropout_passes,
+            "mc_dropout_mode": mc_dropout_mode,
+            "artifacts": artifacts,
+        }
+
+        with timer.stage("hash"):
+            cache_key = await run_in_threadpool(audio_cache_key, audio, options)
         try:
-            audio = load_wav(file_bytes)
-        except ValueError as exc:
-            raise HTTPException(status_code=400, detail=str(exc)) from exc
+            cached, source = await analyze_cached(db, audio, options, cache_key, timer)
+        except QueueFullError as exc:
+            raise HTTPException(
+                status_code=503,
+                detail="Analysis queue is full; retry shortly.",
+                headers={"Retry-After": str(settings.retry_after_s)},
+            ) from exc
+        response.headers["X-Analysis-Cache"] = source
 
-        model_result = run_model(audio.samples, audio.sample_rate)
-        segments = sliding_window_segments(audio.samples, audio.sample_rate)
-        quality = compute_quality(audio.samples, audio.sample_rate)
+        response_payload, record = await build_record(
+            cached,
+            audio,
+            {
+                "filename": file.filename,
+                "patient_id": patient_id,
+                "visit_label": visit_label,
+                "auscultation_site": auscultation_site,
+            },
+            artifacts,
+            cache_key,
+            timer,
+        )
+        with timer.stage("db"):
+            await run_in_threadpool(create_analysis, db, *record)
 
-        temperature = TemperatureScaler()
-        raw_prob = model_result["murmur_prob"]
-        logit = float(model_result["murmur_logit"])
-        calibrated_prob = temperature.calibrate_probability(logit)
+        metrics.observe_stages(timer.durations)
+        response.headers["Server-Timing"] = timer.server_timing()
+        return response_payload
 
-        from app.ml.pipeline import get_model
+    @app.post("/api/predict/batch")
+    async def predict_batch(request: Request):
+        # The form is parsed here rather than through File()/Form() parameters so the uploads stay
+        # open while the response streams; stream_results closes it.
+        form = await request.form(max_files=settings.batch_max_files)
+        try:
+            mc_dropout_passes = _form_int(form, "mc_dropout_passes", 20)
+            mc_dropout_mode = form.get("mc_dropout_mode") or "batched"
+            artifacts = validate_options(mc_dropout_passes, mc_dropout_mode, form.get("artifacts"))
+            group_size = _form_int(form, "group_size", 4)
+            if not 1 <= group_size <= MAX_BATCH_GROUP:
+                raise HTTPException(status_code=400, detail=f"group_size must be between 1 and {MAX_BATCH_GROUP}.")
+            uploads = [
+                (upload.filename or "", upload.file) for upload in form.getlist("files") if not isinstance(upload, str)
+            ]
+            if not uploads:
+                raise HTTPException(status_code=400, detail="No files were uploaded.")
+            try:
+                entries = expand_uploads(uploads, parse_metadata(form.get("metadata")))
+            except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+            if len(entries) > settings.batch_max_files:
+                raise HTTPException(
+                    status_code=413, detail=f"A batch may contain at most {settings.batch_max_files} recordings."
+                )
+        except BaseException:
+            await form.close()
+            raise
 
-        model = get_model()
-        _, uncertainty_score = mc_dropout_uncertainty(model, model_result["features"], passes=20)
+        max_bytes = settings.max_upload_mb << 20
+        defaults = {name: form.get(name) for name in ("auscultation_site", "patient_id", "visit_label")}
+        options = {
+            "mc_dropout_passes": mc_dropout_passes,
+            "mc_dropout_mode": mc_dropout_mode,
+            "artifacts": artifacts,
+        }
+        slots = asyncio.Semaphore(executor.workers)
+        abandoned = asyncio.Event()
 
-        murmur_label = "murmur" if calibrated_prob >= 0.5 else "normal"
+        def decode_entry(entry: BatchEntry):
+            if entry.size is not None and entry.size > max_bytes:
+                raise UploadTooLargeError(f"Recording exceeds the {settings.max_upload_mb} MB upload limit.")
+            with entry.open() as stream:
+                audio = decode_audio_stream(stream, max_bytes)
+            audio = resample_audio(audio, settings.canonical_sample_rate)
+            return audio, audio_cache_key(audio, options)
 
-        systolic_prob = model_result["systolic_prob"]
-        diastolic_prob = model_result["diastolic_prob"]
-        if max(systolic_prob, diastolic_prob) < 0.55:
-            timing_label = "uncertain"
-        else:
-            timing_label = "systolic" if systolic_prob >= diastolic_prob else "diastolic"
+        async def run_group(group: list[BatchEntry]) -> tuple[list[dict], list[tuple[Analysis, list[AnalysisBlob]]]]:
+            lines: dict[int, dict] = {}
+            ready = []
+            async with slots:
+                if abandoned.is_set():
+                    return [], []
+                prepared = []
+                for entry in group:
+                    try:
+                        prepared.append((entry, entry_fields(entry, defaults, AUSCULTATION_SITES)))
+                    except ValueError as exc:
+                        lines[entry.index] = _error_line(entry, exc)
+                decoded = await asyncio.gather(
+                    *(run_in_threadpool(decode_entry, entry) for entry, _ in prepared), return_exceptions=True
+                )
+                pending = []
+                for (entry, fields), outcome in zip(prepared, decoded):
+                    if isinstance(outcome, Exception):
+                        lines[entry.index] = _error_line(entry, outcome)
+                        continue
+                    audio, cache_key = outcome
+                    metrics.audio_seconds.inc(amount=audio.duration_s)
+                    pending.append((entry, fields, audio, cache_key))
 
-        risk = assess_risk(calibrated_prob, uncertainty_score, quality.quality_score_0_100)
+                # Each recording goes through the result cache like a single upload (memory, an identical
+                # analysis in flight, then history); only the remaining ones are analysed, together.
+                audios = {cache_key: audio for _, _, audio, cache_key in pending}
+                keys = [cache_key for *_, cache_key in pending]
 
-        mel = model_result["mel"]
-        heatmap = saliency_heatmap(get_model(), mel)
+                async def analyze_group(missing: list[str]) -> list:
+                    outcomes = {}
+                    if settings.result_cache:
+                        with SessionLocal() as db:
+                            found = await run_in_threadpool(
+                                lambda: {key: load_from_history(db, key) for key in missing}
+                            )
+                        outcomes = {key: (previous, "history") for key, previous in found.items() if previous}
+                    todo = [key for key in dict.fromkeys(missing) if key not in outcomes]
+                    if todo:
+                        recordings = [(audios[key].samples, audios[key].sample_rate) for key in todo]
+                        deadline = time.monotonic() + settings.batch_queue_wait_s
+                        delay = 0.05
+                        try:
+                            while True:
+                                try:
+                                    analyses = await executor.run_many(recordings, **options)
+                                    break
+                                except QueueFullError:
+                                    if time.monotonic() + delay > deadline:
+                                        raise QueueFullError("Analysis queue is full; retry this recording later.")
+                                    await asyncio.sleep(delay)
+                                    delay = min(delay * 2, 1.0)
+                        except Exception as exc:
+                            outcomes.update((key, exc) for key in todo)
+                        else:
+                            for key, analysis in zip(todo, analyses):
+                                metrics.observe_stages(analysis["timings"])
+                                stored = await run_in_threadpool(store_analysis, analysis, artifacts)
+                                outcomes[key] = stored, "computed"
+                    return [outcomes[key] for key in missing]
 
-        response_payload = {
-            "request_id": str(uuid.uuid4()),
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "input": {
-                "filename": file.filename,
-                "patient_id": patient_id,
-                "visit_label": visit_label,
-                "auscultation_site": auscultation_site,
-                "duration_s": audio.duration_s,
-                "sample_rate": audio.sample_rate,
-            },
-            "murmur": {
-                "label": murmur_label,
-                "raw_probability": float(raw_prob),
-                "calibrated_probability": float(calibrated_prob),
-                "uncertainty_score": float(uncertainty_score),
-            },
-            "timing": {
-                "label": timing_label,
-                "systolic_probability": float(systolic_prob),
-                "diastolic_probability": float(diastolic_prob),
-            },
-            "quality": {
-                "quality_score_0_100": quality.quality_score_0_100,
-                "snr_db": quality.snr_db,
-                "clipping_pct": quality.clipping_pct,
-                "silence_pct": quality.silence_pct,
-                "retake_recommended": quality.retake_recommended,
-                "retake_reasons": quality.retake_reasons,
-            },
-            "risk": {
-                "screening_concern_level": risk.screening_concern_level,
-                "rationale": (
-                    f"{risk.rationale} Explainability note: model focused on "
-                    "mid-frequency bands during high-probability segments."
-                ),
-            },
-            "safe_advice": SAFE_ADVICE + [CALIBRATION_EXPLANATION],
-            "segments": segments,
-            "artifacts": {
-                "waveform_png_base64": plot_waveform(audio.samples, audio.sample_rate),
-                "spectrogram_png_base64": plot_spectrogram(mel),
-                "timeline_png_base64": plot_timeline(segments),
-                "explainability_png_base64": plot_explainability(mel, heatmap),
-            },
+                if not keys:
+                    outcomes = []
+                elif settings.result_cache:
+                    outcomes = await result_cache.get_or_compute_many(keys, analyze_group)
+                else:
+                    outcomes = await analyze_group(keys)
+                for (entry, fields, audio, cache_key), outcome in zip(pending, outcomes):
+                    if isinstance(outcome, Exception):
+                        lines[entry.index] = _error_line(entry, outcome)
+                    else:
+                        ready.append((entry, fields, audio, cache_key, *outcome))
+
+            records = []
+            for entry, fields, audio, cache_key, cached, source in ready:
+                payload, record = await build_record(
+                    cached, audio, {**fields, "filename": entry.filename}, artifacts, cache_key, StageTimer()
+                )
+                records.append(record)
+                lines[entry.index] = {
+                    "index": entry.index,
+                    "filename": entry.filename,
+                    "status": "ok",
+                    "cache": source,
+                    "result": payload,
+                }
+            return [lines[index] for index in sorted(lines)], records
+
+        groups = [entries[start:start + group_size] for start in range(0, len(entries), group_size)]
+
+        async def produce(lines: asyncio.Queue) -> None:
+            # Runs outside the response so a client disconnect cannot cancel it: groups already analysing finish,
+            # and every recording whose line was sent is committed; groups not yet started are skipped.
+            tasks = [asyncio.ensure_future(run_group(group)) for group in groups]
+            records = []
+            summary = {"total": len(entries), "ok": 0, "failed": 0, "stored": 0}
+            try:
+                for finished in asyncio.as_completed(tasks):
+                    group_lines, group_records = await finished
+                    records += group_records
+                    for line in group_lines:
+                        summary["ok" if line["status"] == "ok" else "failed"] += 1
+                        lines.put_nowait(line)
+            finally:
+                try:
+                    abandoned.set()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                    with SessionLocal() as db:
+                        summary["stored"] = await run_in_threadpool(create_analyses, db, records)
+                    lines.put_nowait({"summary": summary})
+                finally:
+                    await form.close()
+                    lines.put_nowait(None)
+
+        async def stream_results():
+            lines: asyncio.Queue = asyncio.Queue()
+            producer = asyncio.ensure_future(produce(lines))
+            background_tasks.add(producer)
+            producer.add_done_callback(background_tasks.discard)
+            try:
+                while (line := await lines.get()) is not None:
+                    yield json.dumps(line) + "\n"
+            finally:
+                abandoned.set()
+
+        return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+    def set_job(job_id: str, **fields) -> None:
+        with SessionLocal() as db:
+            update_job(db, job_id, **fields)
+
+    def release_job_audio(job: AnalysisJob) -> None:
+        blob_collector.schedule([job.audio_blob_key])
+        blob_collector.sweep()
+
+    async def run_job(job: AnalysisJob) -> None:
+        await run_in_threadpool(set_job, job.job_id, stage="decoding")
+
+        def decode():
+            with blob_store.open(job.audio_blob_key) as stream:
+                return resample_audio(decode_audio_stream(stream), settings.canonical_sample_rate)
+
+        audio = await run_in_threadpool(decode)
+        partial = dict(job.partial or {})
+        if "quality" not in partial:
+            await run_in_threadpool(set_job, job.job_id, stage="quality")
+            quality = await run_in_threadpool(compute_quality, audio.samples, audio.sample_rate)
+            partial["quality"] = asdict(quality)
+        await run_in_threadpool(set_job, job.job_id, stage="analysis", partial=partial)
+
+        timer = StageTimer()
+        cache_key = await run_in_threadpool(audio_cache_key, audio, job.options)
+        fields = {
+            "filename": job.filename,
+            "patient_id": job.patient_id,
+            "visit_label": job.visit_label,
+            "auscultation_site": job.auscultation_site,
         }
+        db = SessionLocal()
+        try:
+            cached, _ = await analyze_cached(db, audio, job.options, cache_key, timer)
+            await run_in_threadpool(set_job, job.job_id, stage="storing")
+            _, record = await build_record(cached, audio, fields, job.options["artifacts"], cache_key, timer)
+            await run_in_threadpool(complete_job, db, job.job_id, *record)
+        finally:
+            db.close()
+        metrics.observe_stages(timer.durations)
+        await run_in_threadpool(release_job_audio, job)
 
-        summary = {
-            "murmur_label": murmur_label,
-            "concern_level": risk.screening_concern_level,
-            "quality_score": quality.quality_score_0_100,
+    job_runner = JobRunner(
+        SessionLocal,
+        run_job,
+        workers=settings.job_workers,
+        lease_s=settings.job_lease_s,
+        poll_interval_s=settings.job_poll_interval_s,
+        max_attempts=settings.job_max_attempts,
+        retry_after_s=settings.retry_after_s,
+        on_failed=release_job_audio,
+    )
+    app.state.job_runner = job_runner
+
+    def job_status(job: AnalysisJob) -> dict:
+        return {
+            "job_id": job.job_id,
+            "status": job.status,
+            "stage": job.stage,
+            "attempts": job.attempts,
+            "created_at": job.created_at.isoformat(),
+            "updated_at": job.updated_at.isoformat(),
+            "error": job.error,
+            "partial": job.partial,
+            "request_id": job.request_id,
+            "status_url": f"/api/jobs/{job.job_id}",
         }
 
-        create_analysis(
-            db,
-            Analysis(
-                request_id=response_payload["request_id"],
-                created_at=datetime.fromisoformat(response_payload["created_at"]),
-                patient_id=patient_id,
-                visit_label=visit_label,
-                auscultation_site=auscultation_site,
-                summary=json.dumps(summary),
-                response_json=response_payload,
-            ),
+    @app.post("/api/jobs", status_code=202)
+    async def submit_job(
+        file: UploadFile = File(...),
+        auscultation_site: str = Form(...),
+        patient_id: str = Form(...),
+        visit_label: str | None = Form(None),
+        mc_dropout_passes: int = Form(20),
+        mc_dropout_mode: str = Form("batched"),
+        artifacts: str | None = Form(None),
+        db: Session = Depends(get_db),
+    ):
+        if auscultation_site not in AUSCULTATION_SITES:
+            raise HTTPException(status_code=400, detail="Invalid auscultation site.")
+        artifacts = validate_options(mc_dropout_passes, mc_dropout_mode, artifacts)
+        accumulators: list[QualityAccumulator] = []
+
+        def measure_quality(samples, sample_rate: int) -> None:
+            if settings.canonical_sample_rate and sample_rate > settings.canonical_sample_rate:
+                return
+            if not accumulators:
+                accumulators.append(QualityAccumulator(sample_rate))
+            accumulators[0].update(samples)
+
+        # Quality is measured while the upload decodes, so it is in the job's partial result from the start.
+        # Recordings that get decimated are measured afterwards at the rate the analysis will see.
+        audio = await decode_upload(file, measure_quality)
+        if accumulators:
+            quality = accumulators[0].result()
+        else:
+            quality = await run_in_threadpool(compute_quality, audio.samples, audio.sample_rate)
+        await run_in_threadpool(file.file.seek, 0)
+        audio_key, _ = await run_in_threadpool(blob_store.put_stream, file.file)
+
+        job = AnalysisJob(
+            job_id=str(uuid.uuid4()),
+            status="queued",
+            attempts=0,
+            filename=file.filename,
+            patient_id=patient_id,
+            visit_label=visit_label,
+            auscultation_site=auscultation_site,
+            options={
+                "mc_dropout_passes": mc_dropout_passes,
+                "mc_dropout_mode": mc_dropout_mode,
+                "artifacts": artifacts,
+            },
+            audio_blob_key=audio_key,
+            partial={
+                "input": {
+                    "filename": file.filename,
+                    "patient_id": patient_id,
+                    "visit_label": visit_label,
+                    "auscultation_site": auscultation_site,
+                    "duration_s": audio.duration_s,
+                    "sample_rate": audio.sample_rate,
+                    "original_sample_rate": audio.original_sample_rate or audio.sample_rate,
+                },
+                "quality": asdict(quality),
+            },
         )
+        job = await run_in_threadpool(create_job, db, job)
+        job_runner.notify()
+        return job_status(job)
 
-        return response_payload
+    @app.get("/api/jobs/{job_id}")
+    def job_detail(job_id: str, db: Session = Depends(get_db)):
+        job = get_job(db, job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found.")
+        body = job_status(job)
+        body["result"] = None
+        if job.status == "done" and job.request_id:
+            entry = get_analysis(db, job.request_id)
+            if entry is not None:
+                body["result"] = stored_response(db, entry)
+        return body
+
+    def ingest(
+        analyzer: StreamingAnalyzer, quality: QualityAccumulator, samples: np.ndarray
+    ) -> tuple[list[dict], int | None]:
+        quality.update(samples)
+        segments = analyzer.push(samples)
+        return segments, quality.result(exact=False).quality_score_0_100 if segments else None
+
+    # Live windows are scored in this process rather than the analysis executor, so the number of open
+    # streams is what bounds that work.
+    stream_slots = asyncio.Semaphore(max(1, settings.stream_max_sessions))
+
+    @app.websocket("/api/stream")
+    async def stream(websocket: WebSocket):
+        # Protocol: a JSON "start" message with the recording fields and options, binary PCM chunks
+        # (answered with a "segment" message per completed window) and a JSON "finalize" message,
+        # answered with the full predict payload once the recording is stored in history.
+        await websocket.accept()
+        acquired = False
+
+        async def fail(detail: str, code: int = 1008) -> None:
+            await websocket.send_json({"type": "error", "detail": detail})
+            await websocket.close(code=code)
+
+        try:
+            start = await websocket.receive_json()
+            if not isinstance(start, dict) or start.get("type") != "start":
+                return await fail('The first message must be {"type": "start", ...}.')
+            sample_rate = start.get("sample_rate")
+            if not isinstance(sample_rate, int) or not 1000 <= sample_rate <= 192000:
+                return await fail("sample_rate must be an integer between 1000 and 192000.")
+            dtype = STREAM_ENCODINGS.get(start.get("encoding", "pcm_s16le"))
+            if dtype is None:
+                return await fail("encoding must be pcm_s16le or f32le.")
+            if start.get("auscultation_site") not in AUSCULTATION_SITES:
+                return await fail("Invalid auscultation site.")
+            if not start.get("patient_id"):
+                return await fail("patient_id is required.")
+            options = {
+                "mc_dropout_passes": start.get("mc_dropout_passes", 20),
+                "mc_dropout_mode": start.get("mc_dropout_mode", "batched"),
+            }
+            try:
+                options["artifacts"] = validate_options(
+                    options["mc_dropout_passes"], options["mc_dropout_mode"], start.get("artifacts")
+                )
+            except HTTPException as exc:
+                return await fail(exc.detail)
+
+            if stream_slots.locked():
+                return await fail("Too many live streams; retry shortly.", 1013)
+            await stream_slots.acquire()
+            acquired = True
+            analyzer = StreamingAnalyzer(sample_rate)
+            quality = QualityAccumulator(sample_rate)
+            chunks: list[np.ndarray] = []
+            pending = b""
+            max_samples = (settings.max_upload_mb << 20) // dtype.itemsize
+            await websocket.send_json({"type": "ready"})
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                if message.get("bytes") is not None:
+                    data = pending + message["bytes"]
+                    usable = len(data) - len(data) % dtype.itemsize
+                    pending = data[usable:]
+                    samples = np.frombuffer(data[:usable], dtype=dtype).astype(np.float32)
+                    if dtype.kind == "i":
+                        samples *= np.float32(1.0 / 32768.0)
+                    if analyzer.received + len(samples) > max_samples:
+                        return await fail(f"Recording exceeds the {settings.max_upload_mb} MB upload limit.", 1009)
+                    chunks.append(samples)
+                    segments, running_quality = await run_in_threadpool(ingest, analyzer, quality, samples)
+                    for segment in segments:
+                        lag_s = (analyzer.received / sample_rate) - segment["t1"]
+                        await websocket.send_json(
+                            {"type": "segment", **segment, "lag_s": lag_s, "quality_score_0_100": running_quality}
+                        )
+                    continue
+                control = json.loads(message.get("text") or "null")
+                if not isinstance(control, dict) or control.get("type") != "finalize":
+                    return await fail('Expected binary audio or {"type": "finalize"}.')
+                break
+
+            samples = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+            duration_s = len(samples) / float(sample_rate)
+            if duration_s < MIN_DURATION_S:
+                return await fail("Recording is too short for analysis.")
+            audio = AudioData(samples=samples, sample_rate=sample_rate, duration_s=duration_s)
+            audio = await run_in_threadpool(resample_audio, audio, settings.canonical_sample_rate)
+            metrics.audio_seconds.inc(amount=duration_s)
+            fields = {
+                "filename": start.get("filename") or "stream.wav",
+                "patient_id": start["patient_id"],
+                "visit_label": start.get("visit_label"),
+                "auscultation_site": start["auscultation_site"],
+            }
+            timer = StageTimer()
+            cache_key = await run_in_threadpool(audio_cache_key, audio, options)
+            db = SessionLocal()
+            try:
+                try:
+                    cached, _ = await analyze_cached(db, audio, options, cache_key, timer)
+                except QueueFullError:
+                    return await fail("Analysis queue is full; retry shortly.", 1013)
+                payload, record = await build_record(cached, audio, fields, options["artifacts"], cache_key, timer)
+                with timer.stage("db"):
+                    await run_in_threadpool(create_analysis, db, *record)
+            finally:
+                db.close()
+            metrics.observe_stages(timer.durations)
+            await websocket.send_json({"type": "final", "result": payload})
+            await websocket.close()
+        except WebSocketDisconnect:
+            pass
+        except (json.JSONDecodeError, KeyError, TypeError) as exc:
+            await fail(f"Malformed message: {exc}")
+        finally:
+            if acquired:
+                stream_slots.release()
 
     @app.get("/api/history")
-    def history(patient_id: str | None = None, db: Session = Depends(get_db)):
-        entries = list_history(db, patient_id) or []
+    def history(
+        response: Response,
+        patient_id: str | None = None,
+        limit: int = HISTORY_PAGE_SIZE,
+        cursor: str | None = None,
+        db: Session = Depends(get_db),
+    ):
+        if not 1 <= limit <= MAX_HISTORY_PAGE_SIZE:
+            raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_HISTORY_PAGE_SIZE}.")
+        try:
+            after = decode_history_cursor(cursor) if cursor else None
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        entries = list_history(db, patient_id, limit + 1, after)
+        if len(entries) > limit:
+            entries = entries[:limit]
+            response.headers["X-Next-Cursor"] = encode_history_cursor(entries[-1].created_at, entries[-1].request_id)
         return [
             {
                 "request_id": entry.request_id,
@@ -253,18 +985,89 @@ def create_app(db_url: str | None = None) -> FastAPI:
             for entry in entries
         ]
 
+    def stored_response(db: Session, entry: Analysis) -> dict:
+        payload = entry.response_json
+        if entry.artifacts_mode == "inline":
+            refs = get_blob_refs(db, entry.request_id)
+            # An image that cannot be inlined is null, with a link when the artifact endpoint can render it again
+            # from the stored arrays, rather than an empty image.
+            renderable = "waveform.npy" in refs and "mel_db.npy" in refs
+            links = artifact_links(entry.request_id)
+            artifacts = {}
+            for name in ARTIFACT_NAMES:
+                ref = refs.get(f"{name}.png")
+                png = blob_store.get(ref.blob_key) if ref else None
+                if ref and png is None:
+                    logger.warning("Blob %s (%s.png of %s) is missing.", ref.blob_key, name, entry.request_id)
+                if png is None:
+                    artifacts[f"{name}_png_base64"] = None
+                    artifacts[f"{name}_png_url"] = links[f"{name}_png_url"] if renderable else None
+                else:
+                    artifacts[f"{name}_png_base64"] = base64.b64encode(png).decode("utf-8")
+            payload = {**payload, "artifacts": artifacts}
+        return payload
+
     @app.get("/api/history/{request_id}")
     def history_detail(request_id: str, db: Session = Depends(get_db)):
         entry = get_analysis(db, request_id)
         if not entry:
             raise HTTPException(status_code=404, detail="Entry not found.")
-        return entry.response_json
+        return stored_response(db, entry)
+
+    @app.get("/api/history/{request_id}/artifacts/{name}.png")
+    def history_artifact(request_id: str, name: str, db: Session = Depends(get_db)):
+        if name not in ARTIFACT_NAMES:
+            raise HTTPException(status_code=404, detail="Unknown artifact.")
+        entry = get_analysis(db, request_id)
+        if not entry:
+            raise HTTPException(status_code=404, detail="Entry not found.")
+        headers = {"Cache-Control": "private, max-age=86400"}
+        refs = get_blob_refs(db, request_id)
+        ref = refs.get(f"{name}.png")
+        if ref and blob_store.path(ref.blob_key).exists():
+            return FileResponse(blob_store.path(ref.blob_key), media_type="image/png", headers=headers)
+
+        legacy = (entry.response_json.get("artifacts") or {}).get(f"{name}_png_base64")
+        if legacy:
+            return Response(content=base64.b64decode(legacy), media_type="image/png", headers=headers)
+
+        if "waveform.npy" not in refs or "mel_db.npy" not in refs:
+            raise HTTPException(status_code=404, detail="Artifact not available for this analysis.")
+        png = render_artifact(
+            name,
+            blob_store.get_array(refs["waveform.npy"].blob_key),
+            entry.response_json["input"]["duration_s"],
+            blob_store.get_array(refs["mel_db.npy"].blob_key),
+            entry.response_json["segments"],
+        )
+        try:
+            add_blob_ref(
+                db,
+                AnalysisBlob(
+                    request_id=request_id,
+                    name=f"{name}.png",
+                    blob_key=blob_store.put(png),
+                    content_type="image/png",
+                    size_bytes=len(png),
+                ),
+            )
+        except IntegrityError:
+            # A concurrent first fetch rendered the same image and stored its reference first.
+            db.rollback()
+        return Response(content=png, media_type="image/png", headers=headers)
 
     @app.delete("/api/history/{request_id}")
     def delete_history(request_id: str, db: Session = Depends(get_db)):
+        entry = get_analysis(db, request_id)
+        if not entry:
+            raise HTTPException(status_code=404, detail="Entry not found.")
+        result_cache.discard(entry.cache_key)
+        blob_keys = [ref.blob_key for ref in get_blob_refs(db, request_id).values()]
         deleted = delete_analysis(db, request_id)
         if not deleted:
             raise HTTPException(status_code=404, detail="Entry not found.")
+        blob_collector.schedule(blob_keys)
+        blob_collector.sweep()
         return {"deleted": True}
 
     return app
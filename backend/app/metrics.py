@@ -0,0 +1,221 @@
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Sequence
+from contextlib import contextmanager
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative = []
+        running = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            running += bucket_count
+            cumulative.append(("+Inf" if bound == float("inf") else f"{bound:g}", running))
+        return {"buckets": dict(cumulative), "count": count, "sum": total}
+
+
+STAGE_BUCKETS_S = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS_BYTES = (1 << 10, 16 << 10, 64 << 10, 256 << 10, 1 << 20, 4 << 20, 16 << 20, 64 << 20, 256 << 20)
+
+
+class Counter:
+    def __init__(self):
+        self._values: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label: str = "", amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label] = self._values.get(label, 0.0) + amount
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Gauge:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self) -> None:
+        with self._lock:
+            self.value += 1
+
+    def dec(self) -> None:
+        with self._lock:
+            self.value -= 1
+
+
+class StageTimer:
+    def __init__(self):
+        self.durations: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - started
+
+    def add(self, durations: dict[str, float]) -> None:
+        for name, seconds in durations.items():
+            self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{name};dur={seconds * 1000.0:.2f}" for name, seconds in self.durations.items())
+
+
+def _format(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _histogram_lines(name: str, histogram: Histogram, labels: str = "") -> list[str]:
+    snapshot = histogram.snapshot()
+    prefix = f"{labels}," if labels else ""
+    lines = [f'{name}_bucket{{{prefix}le="{bound}"}} {count}' for bound, count in snapshot["buckets"].items()]
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {_format(snapshot['sum'])}")
+    lines.append(f"{name}_count{suffix} {snapshot['count']}")
+    return lines
+
+
+class PredictMetrics:
+    def __init__(self):
+        self.stage_seconds: dict[str, Histogram] = {}
+        self.requests = Counter()
+        self.in_flight = Gauge()
+        self.audio_seconds = Counter()
+        self.request_bytes = Histogram(SIZE_BUCKETS_BYTES)
+        self.response_bytes = Histogram(SIZE_BUCKETS_BYTES)
+        self._lock = threading.Lock()
+
+    def observe_stages(self, durations: dict[str, float]) -> None:
+        for name, seconds in durations.items():
+            histogram = self.stage_seconds.get(name)
+            if histogram is None:
+                with self._lock:
+                    histogram = self.stage_seconds.setdefault(name, Histogram(STAGE_BUCKETS_S))
+            histogram.observe(seconds)
+
+    def render(self, batcher=None, queue_in_flight: int | None = None, startup: dict | None = None) -> str:
+        lines = [
+            "# HELP murmur_predict_stage_seconds Time spent in each /api/predict stage.",
+            "# TYPE murmur_predict_stage_seconds histogram",
+        ]
+        for name in sorted(self.stage_seconds):
+            lines += _histogram_lines("murmur_predict_stage_seconds", self.stage_seconds[name], f'stage="{name}"')
+
+        lines += [
+            "# HELP murmur_predict_requests_total Finished /api/predict requests by outcome.",
+            "# TYPE murmur_predict_requests_total counter",
+        ]
+        for outcome, count in sorted(self.requests.snapshot().items()):
+            lines.append(f'murmur_predict_requests_total{{outcome="{outcome}"}} {_format(count)}')
+
+        lines += [
+            "# HELP murmur_predict_in_flight /api/predict requests currently being handled.",
+            "# TYPE murmur_predict_in_flight gauge",
+            f"murmur_predict_in_flight {self.in_flight.value}",
+            "# HELP murmur_audio_seconds_total Seconds of decoded audio accepted for analysis.",
+            "# TYPE murmur_audio_seconds_total counter",
+            f"murmur_audio_seconds_total {_format(self.audio_seconds.snapshot().get('', 0.0))}",
+            "# HELP murmur_predict_request_bytes Size of /api/predict request bodies.",
+            "# TYPE murmur_predict_request_bytes histogram",
+            *_histogram_lines("murmur_predict_request_bytes", self.request_bytes),
+            "# HELP murmur_predict_response_bytes Size of /api/predict response bodies.",
+            "# TYPE murmur_predict_response_bytes histogram",
+            *_histogram_lines("murmur_predict_response_bytes", self.response_bytes),
+        ]
+
+        if startup is not None:
+            lines += [
+                "# HELP murmur_ready Whether the startup warm-up finished and the app reports ready.",
+                "# TYPE murmur_ready gauge",
+                f"murmur_ready {int(startup['ready'])}",
+                "# HELP murmur_startup_seconds Time spent in each startup phase.",
+                "# TYPE murmur_startup_seconds gauge",
+            ]
+            for phase in ("preload", "warmup", "ready_after"):
+                if startup.get(f"{phase}_s") is not None:
+                    lines.append(f'murmur_startup_seconds{{phase="{phase}"}} {_format(startup[f"{phase}_s"])}')
+        if queue_in_flight is not None:
+            lines += [
+                "# HELP murmur_analysis_in_flight Analyses running or queued in the execution engine.",
+                "# TYPE murmur_analysis_in_flight gauge",
+                f"murmur_analysis_in_flight {queue_in_flight}",
+            ]
+        if batcher is not None:
+            lines += [
+                "# HELP murmur_inference_batch_size Rows per batched MurmurNet forward pass.",
+                "# TYPE murmur_inference_batch_size histogram",
+                *_histogram_lines("murmur_inference_batch_size", batcher.batch_size),
+                "# HELP murmur_inference_batch_wait_ms Time the first input waited for its batch to fill.",
+                "# TYPE murmur_inference_batch_wait_ms histogram",
+                *_histogram_lines("murmur_inference_batch_wait_ms", batcher.wait_ms),
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def _outcome(status_code: int) -> str:
+    if status_code < 400:
+        return "ok"
+    if status_code == 413:
+        return "too_large"
+    if status_code == 503:
+        return "busy"
+    if status_code < 500:
+        return "invalid"
+    return "error"
+
+
+class PredictMetricsMiddleware:
+    def __init__(self, app, metrics: PredictMetrics, path: str):
+        self.app = app
+        self.metrics = metrics
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                metrics.request_bytes.observe(int(value))
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name == b"content-length":
+                        metrics.response_bytes.observe(int(value))
+            await send(message)
+
+        metrics.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_flight.dec()
+            metrics.requests.inc(_outcome(status))
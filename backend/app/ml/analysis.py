@@ -0,0 +1,152 @@
+import numpy as np
+
+from app.calibration.temperature import TemperatureScaler
+from app.explainability.saliency import saliency_heatmap
+from app.metrics import StageTimer
+from app.ml.features import Spectrogram, compute_spectrogram
+from app.ml.pipeline import get_engine, get_inference_model, run_model_batch, sliding_window_segments_batch
+from app.quality.metrics import compute_quality
+from app.uncertainty.estimate import mc_dropout_uncertainty
+from app.utils.artifacts import waveform_envelope
+from app.utils.plots import explainability_png, spectrogram_png, timeline_png, waveform_png
+from app.utils.risk import assess_risk
+
+PIPELINE_VERSION = "2"
+ANALYSIS_FIELDS = ("murmur", "timing", "quality", "risk", "segments")
+
+
+def analyze_recording(
+    samples: np.ndarray,
+    sample_rate: int,
+    mc_dropout_passes: int = 20,
+    mc_dropout_mode: str = "batched",
+    artifacts: str = "inline",
+) -> dict:
+    return analyze_recordings(
+        [(samples, sample_rate)],
+        mc_dropout_passes=mc_dropout_passes,
+        mc_dropout_mode=mc_dropout_mode,
+        artifacts=artifacts,
+    )[0]
+
+
+def analyze_recordings(
+    recordings: list[tuple[np.ndarray, int]],
+    mc_dropout_passes: int = 20,
+    mc_dropout_mode: str = "batched",
+    artifacts: str = "inline",
+) -> list[dict]:
+    # Whole-recording and window inputs of every recording go through one forward pass each;
+    # the shared stage times are split evenly across the recordings.
+    shared = StageTimer()
+    with shared.stage("mel"):
+        spectrograms = [compute_spectrogram(samples, sample_rate) for samples, sample_rate in recordings]
+    with shared.stage("model"):
+        model_results = run_model_batch(recordings, spectrograms)
+    with shared.stage("windows"):
+        segments = sliding_window_segments_batch(recordings, spectrograms)
+
+    results = []
+    for (samples, sample_rate), spectrogram, model_result, recording_segments in zip(
+        recordings, spectrograms, model_results, segments
+    ):
+        timer = StageTimer()
+        timer.add({name: seconds / len(recordings) for name, seconds in shared.durations.items()})
+        results.append(
+            _finish_analysis(
+                samples,
+                sample_rate,
+                spectrogram,
+                model_result,
+                recording_segments,
+                timer,
+                mc_dropout_passes,
+                mc_dropout_mode,
+                artifacts,
+            )
+        )
+    return results
+
+
+def _finish_analysis(
+    samples: np.ndarray,
+    sample_rate: int,
+    spectrogram: Spectrogram,
+    model_result: dict,
+    segments: list[dict],
+    timer: StageTimer,
+    mc_dropout_passes: int,
+    mc_dropout_mode: str,
+    artifacts: str,
+) -> dict:
+    with timer.stage("quality"):
+        quality = compute_quality(samples, sample_rate)
+
+    temperature = TemperatureScaler()
+    raw_prob = model_result["murmur_prob"]
+    logit = float(model_result["murmur_logit"])
+    calibrated_prob = temperature.calibrate_probability(logit)
+
+    with timer.stage("mc_dropout"):
+        _, uncertainty_score = mc_dropout_uncertainty(
+            get_inference_model(), model_result["features"], passes=mc_dropout_passes, mode=mc_dropout_mode
+        )
+
+    murmur_label = "murmur" if calibrated_prob >= 0.5 else "normal"
+
+    systolic_prob = model_result["systolic_prob"]
+    diastolic_prob = model_result["diastolic_prob"]
+    if max(systolic_prob, diastolic_prob) < 0.55:
+        timing_label = "uncertain"
+    else:
+        timing_label = "systolic" if systolic_prob >= diastolic_prob else "diastolic"
+
+    risk = assess_risk(calibrated_prob, uncertainty_score, quality.quality_score_0_100)
+
+    result = {
+        "murmur": {
+            "label": murmur_label,
+            "raw_probability": float(raw_prob),
+            "calibrated_probability": float(calibrated_prob),
+            "uncertainty_score": float(uncertainty_score),
+        },
+        "timing": {
+            "label": timing_label,
+            "systolic_probability": float(systolic_prob),
+            "diastolic_probability": float(diastolic_prob),
+        },
+        "quality": {
+            "quality_score_0_100": quality.quality_score_0_100,
+            "snr_db": quality.snr_db,
+            "clipping_pct": quality.clipping_pct,
+            "silence_pct": quality.silence_pct,
+            "retake_recommended": quality.retake_recommended,
+            "retake_reasons": quality.retake_reasons,
+        },
+        "risk": {
+            "screening_concern_level": risk.screening_concern_level,
+            "rationale": (
+                f"{risk.rationale} Explainability note: model focused on "
+                "mid-frequency bands during high-probability segments."
+            ),
+        },
+        "segments": segments,
+    }
+
+    mel = spectrogram.mel_db
+    if artifacts == "inline":
+        with timer.stage("saliency"):
+            heatmap = saliency_heatmap(get_engine(), mel)
+        with timer.stage("plots"):
+            result["artifact_pngs"] = {
+                "waveform": waveform_png(samples, sample_rate),
+                "spectrogram": spectrogram_png(mel),
+                "timeline": timeline_png(segments),
+                "explainability": explainability_png(mel, heatmap),
+            }
+    elif artifacts == "lazy":
+        with timer.stage("envelope"):
+            result["waveform"] = waveform_envelope(samples)
+        result["mel_db"] = mel
+    result["timings"] = timer.durations
+    return result
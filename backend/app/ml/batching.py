@@ -0,0 +1,129 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from app.metrics import Histogram
+from app.ml.engine import NumpyMurmurNet, TorchEngine
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+WAIT_MS_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 25, 50, 100)
+
+
+@dataclass
+class _PendingRequest:
+    features: np.ndarray
+    dropout: bool
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class InferenceBatcher:
+    def __init__(self, model: NumpyMurmurNet | TorchEngine, max_batch_size: int = 256, max_wait_ms: float = 5.0):
+        self.model = model
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000.0
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.wait_ms = Histogram(WAIT_MS_BUCKETS)
+        self._queue: queue.Queue[_PendingRequest | None] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, features: np.ndarray, dropout: bool = False) -> Future:
+        self._ensure_started()
+        request = _PendingRequest(np.asarray(features, dtype=np.float32).reshape(-1, features.shape[-1]), dropout)
+        self._queue.put(request)
+        return request.future
+
+    def infer(self, features: np.ndarray, dropout: bool = False) -> np.ndarray:
+        return self.submit(features, dropout).result()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _collect(self, first: _PendingRequest) -> tuple[list[_PendingRequest], bool]:
+        batch = [first]
+        rows = len(first.features)
+        deadline = first.enqueued_at + self.max_wait_s
+        while rows < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+            rows += len(request.features)
+        return batch, False
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stopping = self._collect(first)
+            self._dispatch(batch)
+            if stopping:
+                return
+
+    def _dispatch(self, batch: list[_PendingRequest]) -> None:
+        started = time.perf_counter()
+        for request in batch:
+            self.wait_ms.observe((started - request.enqueued_at) * 1000.0)
+        features = np.concatenate([request.features for request in batch])
+        dropout_rows = np.concatenate([np.full(len(request.features), request.dropout) for request in batch])
+        self.batch_size.observe(len(features))
+        try:
+            logits = self.model.forward(features, dropout_rows)
+        except Exception as exc:
+            for request in batch:
+                request.future.set_exception(exc)
+            return
+        offset = 0
+        for request in batch:
+            size = len(request.features)
+            request.future.set_result(logits[offset:offset + size])
+            offset += size
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_s * 1000.0,
+            "batch_size": self.batch_size.snapshot(),
+            "wait_ms": self.wait_ms.snapshot(),
+        }
+
+
+class BatchedModel:
+    # Per-request stand-in for the inference engine: train()/eval() only flip this handle's dropout
+    # flag, so concurrent requests never race on the shared module's training mode.
+    def __init__(self, batcher: InferenceBatcher):
+        self.batcher = batcher
+        self.training = False
+
+    def train(self, mode: bool = True) -> "BatchedModel":
+        self.training = mode
+        return self
+
+    def eval(self) -> "BatchedModel":
+        return self.train(False)
+
+    def __call__(self, features: np.ndarray) -> np.ndarray:
+        features = np.asarray(features, dtype=np.float32)
+        logits = self.batcher.infer(features, dropout=self.training)
+        return logits.reshape(*features.shape[:-1], logits.shape[-1])
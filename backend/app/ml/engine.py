@@ -0,0 +1,179 @@
+import hashlib
+import os
+
+import numpy as np
+
+MODEL_VERSION = "murmurnet-demo-seed42-v1"
+WEIGHTS_DIR = os.path.join(os.path.dirname(__file__), "weights")
+DEMO_WEIGHTS = os.path.join(WEIGHTS_DIR, f"{MODEL_VERSION}.npz")
+ENGINES = {"numpy", "torch"}
+
+
+def weights_version(path: str) -> str:
+    # Identifies the weights by content, so replacing the file (or pointing MODEL_WEIGHTS elsewhere) changes the
+    # version even when the name stays the same.
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def engine_version(name: str = "numpy", weights: str | None = None) -> str:
+    # The version load_engine(name, weights) reports, without loading the model.
+    if name == "torch" and not weights:
+        return f"torch-{MODEL_VERSION}"
+    return weights_version(weights or DEMO_WEIGHTS)
+
+
+def sigmoid(logits: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-logits))
+
+
+class NumpyMurmurNet:
+    # MurmurNet's Linear-ReLU-Dropout-Linear forward pass on plain arrays. Dropout matches
+    # nn.Dropout in training mode: each hidden unit is zeroed with probability p and the
+    # survivors are scaled by 1 / (1 - p), independently per row.
+    def __init__(
+        self,
+        w1: np.ndarray,
+        b1: np.ndarray,
+        w2: np.ndarray,
+        b2: np.ndarray,
+        dropout_p: float = 0.3,
+        rng: np.random.Generator | None = None,
+        version: str | None = None,
+    ):
+        self.w1 = np.ascontiguousarray(w1, dtype=np.float32)
+        self.b1 = np.ascontiguousarray(b1, dtype=np.float32)
+        self.w2 = np.ascontiguousarray(w2, dtype=np.float32)
+        self.b2 = np.ascontiguousarray(b2, dtype=np.float32)
+        self.dropout_p = float(dropout_p)
+        self.rng = rng
+        self.version = version
+        self.training = False
+
+    @property
+    def input_dim(self) -> int:
+        return self.w1.shape[1]
+
+    def handle(self) -> "NumpyMurmurNet":
+        # Shares the weights but has its own training flag and random stream, so concurrent
+        # requests can switch dropout on without affecting each other.
+        return NumpyMurmurNet(self.w1, self.b1, self.w2, self.b2, self.dropout_p, version=self.version)
+
+    def train(self, mode: bool = True) -> "NumpyMurmurNet":
+        self.training = mode
+        return self
+
+    def eval(self) -> "NumpyMurmurNet":
+        return self.train(False)
+
+    def forward(self, features: np.ndarray, dropout_rows: np.ndarray | None = None) -> np.ndarray:
+        features = np.asarray(features, dtype=np.float32)
+        hidden = features @ self.w1.T
+        hidden += self.b1
+        np.maximum(hidden, 0.0, out=hidden)
+        if dropout_rows is not None and dropout_rows.any() and self.dropout_p > 0.0:
+            if self.rng is None:
+                self.rng = np.random.default_rng()
+            rows = hidden[dropout_rows]
+            keep = self.rng.random(rows.shape, dtype=np.float32) >= self.dropout_p
+            hidden[dropout_rows] = rows * keep / np.float32(1.0 - self.dropout_p)
+        logits = hidden @ self.w2.T
+        logits += self.b2
+        return logits
+
+    def __call__(self, features: np.ndarray) -> np.ndarray:
+        features = np.asarray(features, dtype=np.float32)
+        flat = features.reshape(-1, features.shape[-1])
+        dropout_rows = np.full(len(flat), self.training) if self.training else None
+        return self.forward(flat, dropout_rows).reshape(*features.shape[:-1], -1)
+
+    def save(self, path: str) -> None:
+        np.savez(
+            path,
+            w1=self.w1,
+            b1=self.b1,
+            w2=self.w2,
+            b2=self.b2,
+            dropout_p=np.float32(self.dropout_p),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyMurmurNet":
+        with np.load(path) as weights:
+            engine = cls(weights["w1"], weights["b1"], weights["w2"], weights["b2"], float(weights["dropout_p"]))
+        engine.version = weights_version(path)
+        return engine
+
+
+class TorchEngine:
+    # Runs a torch MurmurNet behind the same array-in, array-out interface as NumpyMurmurNet.
+    def __init__(self, model, version: str | None = None):
+        self.model = model
+        self.version = version
+        self.training = False
+
+    @property
+    def input_dim(self) -> int:
+        return self.model.net[0].in_features
+
+    @property
+    def w1(self) -> np.ndarray:
+        return self.model.net[0].weight.detach().numpy()
+
+    @property
+    def b1(self) -> np.ndarray:
+        return self.model.net[0].bias.detach().numpy()
+
+    @property
+    def w2(self) -> np.ndarray:
+        return self.model.net[3].weight.detach().numpy()
+
+    @property
+    def b2(self) -> np.ndarray:
+        return self.model.net[3].bias.detach().numpy()
+
+    def handle(self) -> "TorchEngine":
+        return TorchEngine(self.model, self.version)
+
+    def train(self, mode: bool = True) -> "TorchEngine":
+        self.training = mode
+        return self
+
+    def eval(self) -> "TorchEngine":
+        return self.train(False)
+
+    def forward(self, features: np.ndarray, dropout_rows: np.ndarray | None = None) -> np.ndarray:
+        import torch
+
+        from app.ml.model import forward_with_dropout_rows
+
+        features = torch.from_numpy(np.ascontiguousarray(features, dtype=np.float32))
+        if dropout_rows is None:
+            dropout_rows = np.zeros(len(features), dtype=bool)
+        with torch.no_grad():
+            return forward_with_dropout_rows(self.model, features, torch.from_numpy(dropout_rows)).numpy()
+
+    def __call__(self, features: np.ndarray) -> np.ndarray:
+        features = np.asarray(features, dtype=np.float32)
+        flat = features.reshape(-1, features.shape[-1])
+        return self.forward(flat, np.full(len(flat), self.training)).reshape(*features.shape[:-1], -1)
+
+
+def export_weights(model, path: str) -> None:
+    engine = TorchEngine(model)
+    NumpyMurmurNet(engine.w1, engine.b1, engine.w2, engine.b2, model.net[2].p).save(path)
+
+
+def load_engine(name: str = "numpy", weights: str | None = None) -> NumpyMurmurNet | TorchEngine:
+    if name not in ENGINES:
+        raise ValueError(f"Unknown inference engine: {name}")
+    if name == "numpy":
+        return NumpyMurmurNet.load(weights or DEMO_WEIGHTS)
+    from app.ml.model import build_demo_model, load_checkpoint
+
+    if weights:
+        return TorchEngine(load_checkpoint(weights), weights_version(weights))
+    return TorchEngine(build_demo_model(), f"torch-{MODEL_VERSION}")
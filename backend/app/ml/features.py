@@ -1,17 +1,151 @@
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+
 import numpy as np
-import librosa
+
+N_FFT = 512
+HOP_LENGTH = 256
+N_MELS = 64
+FMIN = 20
+AMIN = 1e-10
+TOP_DB = 80.0
+
+
+def _to_db(log_power: np.ndarray) -> np.ndarray:
+    # power_to_db(ref=np.max, top_db=80) over the frames given.
+    return np.maximum(log_power - log_power.max(), -TOP_DB)
+
+
+@dataclass
+class Spectrogram:
+    log_power: np.ndarray
+    sample_rate: int
+    hop_length: int = HOP_LENGTH
+
+    @property
+    def n_frames(self) -> int:
+        return self.log_power.shape[1]
+
+    @cached_property
+    def mel_db(self) -> np.ndarray:
+        return _to_db(self.log_power)
+
+    def frames_for(self, n_samples: int) -> int:
+        return 1 + n_samples // self.hop_length
+
+    def windows_db(self, start_samples: np.ndarray, n_samples: int) -> np.ndarray:
+        # Windows reuse the recording's frames, so a start off the hop grid (0.5 s hops at 1, 2 or 4 kHz are not
+        # multiples of 256) is rounded to the nearest frame, up to hop_length / 2 samples away, and the edge
+        # frames see the neighbouring audio instead of zero padding. Such windows approximate a standalone
+        # transform of the same samples: on heart sounds at 1-4 kHz the per-window murmur probability moves by
+        # up to 0.05 (median under 0.01); steady tones and broadband noise can move it by up to 0.1.
+        first = np.rint(np.asarray(start_samples) / self.hop_length).astype(np.int64)
+        count = self.frames_for(n_samples)
+        index = first[:, None] + np.arange(count)
+        log_power = self.log_power
+        overflow = int(index.max()) + 1 - self.n_frames if index.size else 0
+        if overflow > 0:
+            floor = np.full((log_power.shape[0], overflow), 10.0 * np.log10(AMIN), dtype=log_power.dtype)
+            log_power = np.concatenate([log_power, floor], axis=1)
+        windows = log_power[:, index].transpose(1, 0, 2)
+        peaks = windows.max(axis=(1, 2), keepdims=True)
+        return np.maximum(windows - peaks, -TOP_DB)
+
+    def window_db(self, start_sample: int, n_samples: int) -> np.ndarray:
+        return self.windows_db(np.array([start_sample]), n_samples)[0]
+
+
+FRAME_BLOCK = 4096
+
+
+def _hz_to_mel(hz: np.ndarray) -> np.ndarray:
+    # Slaney scale (librosa's default, htk=False): linear below 1 kHz, logarithmic above.
+    hz = np.asarray(hz, dtype=np.float64)
+    mels = hz / (200.0 / 3)
+    log_region = hz >= 1000.0
+    return np.where(log_region, 15.0 + np.log(np.maximum(hz, 1e-10) / 1000.0) / (np.log(6.4) / 27.0), mels)
+
+
+def _mel_to_hz(mels: np.ndarray) -> np.ndarray:
+    mels = np.asarray(mels, dtype=np.float64)
+    hz = mels * (200.0 / 3)
+    return np.where(mels >= 15.0, 1000.0 * np.exp((np.log(6.4) / 27.0) * (mels - 15.0)), hz)
+
+
+@lru_cache(maxsize=32)
+def mel_filterbank(sample_rate: int, n_fft: int, n_mels: int, fmin: float, fmax: float) -> np.ndarray:
+    # Slaney-normalised triangular filters, the same matrix as librosa.filters.mel(..., norm="slaney").
+    fft_freqs = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    mel_freqs = _mel_to_hz(np.linspace(_hz_to_mel(fmin), _hz_to_mel(fmax), n_mels + 2))
+    widths = np.diff(mel_freqs)
+    ramps = mel_freqs[:, None] - fft_freqs[None, :]
+    lower = -ramps[:-2] / widths[:-1, None]
+    upper = ramps[2:] / widths[1:, None]
+    weights = np.maximum(0.0, np.minimum(lower, upper))
+    weights *= (2.0 / (mel_freqs[2:] - mel_freqs[:-2]))[:, None]
+    basis = weights.astype(np.float32)
+    basis.setflags(write=False)
+    return basis
+
+
+@lru_cache(maxsize=8)
+def hann_window(n_fft: int) -> np.ndarray:
+    # Periodic Hann, as scipy.signal.get_window("hann", n_fft, fftbins=True).
+    window = (0.5 - 0.5 * np.cos(2.0 * np.pi * np.arange(n_fft) / n_fft)).astype(np.float32)
+    window.setflags(write=False)
+    return window
+
+
+def mel_basis(sample_rate: int) -> np.ndarray:
+    return mel_filterbank(sample_rate, N_FFT, N_MELS, FMIN, min(1000, sample_rate // 2))
+
+
+@lru_cache(maxsize=32)
+def _active_bins(sample_rate: int) -> tuple[int, int, np.ndarray]:
+    # fmax is at most 1 kHz, so at high sample rates only a handful of FFT bins reach the filterbank.
+    basis = mel_basis(sample_rate)
+    used = np.flatnonzero(basis.any(axis=0))
+    if not used.size:
+        return 0, 1, np.ascontiguousarray(basis[:, :1])
+    lo, hi = int(used[0]), int(used[-1]) + 1
+    return lo, hi, np.ascontiguousarray(basis[:, lo:hi])
+
+
+def frames_log_power(frames: np.ndarray, sample_rate: int) -> np.ndarray:
+    # frames: (n, N_FFT) raw samples, one row per STFT frame; returns (N_MELS, n) like Spectrogram.log_power.
+    import scipy.fft
+
+    lo, hi, basis = _active_bins(sample_rate)
+    spectrum = scipy.fft.rfft(frames * hann_window(N_FFT), axis=1)[:, lo:hi]
+    power = np.square(spectrum.real)
+    power += np.square(spectrum.imag)
+    mel = basis @ power.T
+    np.maximum(mel, AMIN, out=mel)
+    np.log10(mel, out=mel)
+    mel *= 10.0
+    return mel
+
+
+def compute_spectrogram(samples: np.ndarray, sample_rate: int) -> Spectrogram:
+    # Centred float32 STFT (N_FFT // 2 zeros on both sides, as librosa's center=True). Frames are strided
+    # views transformed in blocks; only the blocks touching either end are copied to add the padding.
+    samples = np.asarray(samples, dtype=np.float32)
+    pad = N_FFT // 2
+    n_frames = 1 + len(samples) // HOP_LENGTH
+    log_power = np.empty((N_MELS, n_frames), dtype=np.float32)
+    for start in range(0, n_frames, FRAME_BLOCK):
+        stop = min(start + FRAME_BLOCK, n_frames)
+        lo = start * HOP_LENGTH - pad
+        hi = (stop - 1) * HOP_LENGTH - pad + N_FFT
+        if lo >= 0 and hi <= len(samples):
+            span = samples[lo:hi]
+        else:
+            span = np.zeros(hi - lo, dtype=np.float32)
+            span[max(0, -lo):min(hi, len(samples)) - lo] = samples[max(lo, 0):hi]
+        frames = np.lib.stride_tricks.sliding_window_view(span, N_FFT)[::HOP_LENGTH]
+        log_power[:, start:stop] = frames_log_power(frames, sample_rate)
+    return Spectrogram(log_power=log_power, sample_rate=sample_rate)
 
 
 def compute_mel_spectrogram(samples: np.ndarray, sample_rate: int) -> np.ndarray:
-    mel = librosa.feature.melspectrogram(
-        y=samples,
-        sr=sample_rate,
-        n_fft=512,
-        hop_length=256,
-        n_mels=64,
-        fmin=20,
-        fmax=min(1000, sample_rate // 2),
-        power=2.0,
-    )
-    mel_db = librosa.power_to_db(mel, ref=np.max)
-    return mel_db
+    return compute_spectrogram(samples, sample_rate).mel_db
@@ -20,3 +20,18 @@ def build_demo_model(seed: int = 42) -> MurmurNet:
     torch.manual_seed(seed)
     model = MurmurNet()
     return model
+
+
+def load_checkpoint(path: str) -> MurmurNet:
+    model = MurmurNet()
+    model.load_state_dict(torch.load(path, map_location="cpu", weights_only=True))
+    return model
+
+
+def forward_with_dropout_rows(model: MurmurNet, features: torch.Tensor, dropout_rows: torch.Tensor) -> torch.Tensor:
+    first, activation, dropout, second = model.net
+    hidden = activation(first(features))
+    if bool(dropout_rows.any()):
+        hidden = hidden.clone()
+        hidden[dropout_rows] = nn.functional.dropout(hidden[dropout_rows], p=dropout.p, training=True)
+    return second(hidden)
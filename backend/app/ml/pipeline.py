@@ -1,77 +1,162 @@
 import numpy as np
-import torch
 
-from app.ml.features import compute_mel_spectrogram
-from app.ml.model import build_demo_model
+from app.ml.batching import BatchedModel, InferenceBatcher
+from app.ml.engine import NumpyMurmurNet, TorchEngine, load_engine, sigmoid
+from app.ml.features import Spectrogram, compute_spectrogram
 
+WINDOW_LEN_S = 2.0
+WINDOW_HOP_S = 0.5
 
-_MODEL = None
+_ENGINE_CONFIG = ("numpy", None)
+_ENGINE = None
+_BATCHER = None
 
 
-def get_model() -> torch.nn.Module:
-    global _MODEL
-    if _MODEL is None:
-        _MODEL = build_demo_model()
-    return _MODEL
+def configure_engine(name: str = "numpy", weights: str | None = None) -> None:
+    global _ENGINE_CONFIG, _ENGINE
+    if (name, weights) != _ENGINE_CONFIG:
+        _ENGINE_CONFIG = (name, weights)
+        _ENGINE = None
 
 
-def extract_features(mel_db: np.ndarray) -> torch.Tensor:
-    mel_tensor = torch.tensor(mel_db, dtype=torch.float32)
-    mean = mel_tensor.mean(dim=1)
-    std = mel_tensor.std(dim=1)
-    features = torch.cat([mean, std], dim=0)
-    return features
+def get_engine() -> NumpyMurmurNet | TorchEngine:
+    global _ENGINE
+    if _ENGINE is None:
+        _ENGINE = load_engine(*_ENGINE_CONFIG)
+    return _ENGINE
 
 
-def infer_murmur_and_timing(features: torch.Tensor, model: torch.nn.Module) -> tuple[float, float, float]:
+def model_version() -> str:
+    return get_engine().version
+
+
+def configure_batching(max_batch_size: int = 256, max_wait_ms: float = 5.0) -> InferenceBatcher:
+    global _BATCHER
+    if _BATCHER is not None:
+        _BATCHER.stop()
+    _BATCHER = InferenceBatcher(get_engine(), max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    return _BATCHER
+
+
+def disable_batching() -> None:
+    global _BATCHER
+    if _BATCHER is not None:
+        _BATCHER.stop()
+        _BATCHER = None
+
+
+def get_batcher() -> InferenceBatcher | None:
+    return _BATCHER
+
+
+def get_inference_model() -> NumpyMurmurNet | TorchEngine | BatchedModel:
+    if _BATCHER is not None:
+        return BatchedModel(_BATCHER)
+    return get_engine().handle()
+
+
+def extract_features(mel_db: np.ndarray) -> np.ndarray:
+    mean = mel_db.mean(axis=1)
+    std = mel_db.std(axis=1, ddof=1)
+    return np.concatenate([mean, std]).astype(np.float32, copy=False)
+
+
+def infer_murmur_and_timing(features: np.ndarray, model) -> tuple[float, float, float]:
     logits = model(features)
-    murmur_logit = logits[0].item()
-    timing_logit = logits[1].item()
-    murmur_prob = torch.sigmoid(logits[0]).item()
-    systolic_prob = torch.sigmoid(logits[1]).item()
+    murmur_logit = float(logits[0])
+    murmur_prob = float(sigmoid(logits[0]))
+    systolic_prob = float(sigmoid(logits[1]))
     return murmur_prob, systolic_prob, murmur_logit
 
 
-def sliding_window_segments(samples: np.ndarray, sample_rate: int) -> list[dict]:
-    window_len_s = 2.0
-    hop_s = 0.5
-    window_len = int(window_len_s * sample_rate)
-    hop_len = int(hop_s * sample_rate)
-    segments = []
-    model = get_model()
+def extract_window_features(windows_db: np.ndarray) -> np.ndarray:
+    mean = windows_db.mean(axis=2)
+    std = windows_db.std(axis=2, ddof=1)
+    return np.concatenate([mean, std], axis=1).astype(np.float32, copy=False)
+
+
+def infer_murmur_probs(features: np.ndarray, model) -> np.ndarray:
+    logits = model(features)
+    return sigmoid(logits[:, 0])
+
+
+def _window_bounds(n_samples: int, sample_rate: int) -> tuple[np.ndarray, np.ndarray, int]:
+    window_len = int(WINDOW_LEN_S * sample_rate)
+    hop_len = int(WINDOW_HOP_S * sample_rate)
+    starts = np.arange(0, max(n_samples - window_len + 1, 1), hop_len)
+    ends = np.minimum(starts + window_len, n_samples)
+    return starts, ends, window_len
+
+
+def sliding_window_segments_batch(
+    recordings: list[tuple[np.ndarray, int]], spectrograms: list[Spectrogram] | None = None
+) -> list[list[dict]]:
+    if spectrograms is None:
+        spectrograms = [compute_spectrogram(samples, sample_rate) for samples, sample_rate in recordings]
+    bounds = []
+    features = []
+    for (samples, sample_rate), spectrogram in zip(recordings, spectrograms):
+        starts, ends, window_len = _window_bounds(len(samples), sample_rate)
+        bounds.append((starts, ends, sample_rate))
+        features.append(extract_window_features(spectrogram.windows_db(starts, window_len)))
+
+    model = get_inference_model()
     model.eval()
+    probs = infer_murmur_probs(np.concatenate(features), model)
+
+    results = []
+    offset = 0
+    for starts, ends, sample_rate in bounds:
+        count = len(starts)
+        results.append(
+            [
+                {
+                    "t0": start / sample_rate,
+                    "t1": end / sample_rate,
+                    "murmur_prob": float(prob),
+                }
+                for start, end, prob in zip(starts.tolist(), ends.tolist(), probs[offset:offset + count].tolist())
+            ]
+        )
+        offset += count
+    return results
 
-    for start in range(0, max(len(samples) - window_len + 1, 1), hop_len):
-        end = min(start + window_len, len(samples))
-        window = samples[start:end]
-        if len(window) < window_len:
-            pad = np.zeros(window_len - len(window), dtype=window.dtype)
-            window = np.concatenate([window, pad])
-        mel = compute_mel_spectrogram(window, sample_rate)
-        features = extract_features(mel)
-        with torch.no_grad():
-            murmur_prob, _, _ = infer_murmur_and_timing(features, model)
-        segments.append({
-            "t0": start / sample_rate,
-            "t1": end / sample_rate,
-            "murmur_prob": float(murmur_prob),
-        })
-    return segments
-
-
-def run_model(samples: np.ndarray, sample_rate: int) -> dict:
-    model = get_model()
+
+def sliding_window_segments(
+    samples: np.ndarray, sample_rate: int, spectrogram: Spectrogram | None = None
+) -> list[dict]:
+    spectrograms = None if spectrogram is None else [spectrogram]
+    return sliding_window_segments_batch([(samples, sample_rate)], spectrograms)[0]
+
+
+def run_model_batch(
+    recordings: list[tuple[np.ndarray, int]], spectrograms: list[Spectrogram] | None = None
+) -> list[dict]:
+    model = get_inference_model()
     model.eval()
-    mel = compute_mel_spectrogram(samples, sample_rate)
-    features = extract_features(mel)
-    with torch.no_grad():
-        murmur_prob, systolic_prob, murmur_logit = infer_murmur_and_timing(features, model)
-    diastolic_prob = 1.0 - systolic_prob
-    return {
-        "murmur_prob": murmur_prob,
-        "systolic_prob": systolic_prob,
-        "diastolic_prob": diastolic_prob,
-        "murmur_logit": murmur_logit,
-        "mel": mel,
-        "features": features,
-    }
+    if spectrograms is None:
+        spectrograms = [compute_spectrogram(samples, sample_rate) for samples, sample_rate in recordings]
+    mels = [spectrogram.mel_db for spectrogram in spectrograms]
+    features = np.stack([extract_features(mel) for mel in mels])
+    logits = model(features)
+    murmur_logits = logits[:, 0].tolist()
+    murmur_probs = sigmoid(logits[:, 0]).tolist()
+    systolic_probs = sigmoid(logits[:, 1]).tolist()
+    return [
+        {
+            "murmur_prob": murmur_prob,
+            "systolic_prob": systolic_prob,
+            "diastolic_prob": 1.0 - systolic_prob,
+            "murmur_logit": murmur_logit,
+            "mel": mel,
+            "features": row,
+        }
+        for murmur_prob, systolic_prob, murmur_logit, mel, row in zip(
+            murmur_probs, systolic_probs, murmur_logits, mels, features
+        )
+    ]
+
+
+def run_model(samples: np.ndarray, sample_rate: int, spectrogram: Spectrogram | None = None) -> dict:
+    spectrograms = None if spectrogram is None else [spectrogram]
+    return run_model_batch([(samples, sample_rate)], spectrograms)[0]
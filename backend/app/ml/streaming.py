@@ -0,0 +1,100 @@
+import numpy as np
+
+from app.ml.features import HOP_LENGTH, N_FFT, N_MELS, TOP_DB, frames_log_power
+from app.ml.pipeline import WINDOW_HOP_S, WINDOW_LEN_S, extract_window_features, get_inference_model, infer_murmur_probs
+
+
+class RingBuffer:
+    # Fixed-capacity buffer addressed by absolute position along the last axis.
+    def __init__(self, capacity: int, rows: int | None = None, dtype=np.float32):
+        shape = (capacity,) if rows is None else (rows, capacity)
+        self._data = np.zeros(shape, dtype=dtype)
+        self.capacity = capacity
+        self.end = 0
+
+    @property
+    def start(self) -> int:
+        return max(0, self.end - self.capacity)
+
+    def write(self, values: np.ndarray) -> None:
+        count = values.shape[-1]
+        if count > self.capacity:
+            raise ValueError("Write larger than the ring buffer capacity.")
+        first = self.end % self.capacity
+        head = min(count, self.capacity - first)
+        self._data[..., first:first + head] = values[..., :head]
+        self._data[..., :count - head] = values[..., head:]
+        self.end += count
+
+    def read(self, start: int, stop: int) -> np.ndarray:
+        if start < self.start or stop > self.end:
+            raise IndexError(f"Range [{start}, {stop}) is outside [{self.start}, {self.end}).")
+        index = np.arange(start, stop) % self.capacity
+        return self._data[..., index]
+
+
+class StreamingAnalyzer:
+    # Scores the same 2 s / 0.5 s windows as sliding_window_segments while audio arrives, keeping only
+    # the samples and mel frames the next window still needs. Frames are the centred STFT frames of
+    # compute_spectrogram, so a window is emitted as soon as the frame covering its last hop is complete.
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+        self.window_len = int(WINDOW_LEN_S * sample_rate)
+        self.hop_len = int(WINDOW_HOP_S * sample_rate)
+        self.window_frames = 1 + self.window_len // HOP_LENGTH
+        self.chunk_len = max(HOP_LENGTH, self.hop_len)
+        self._samples = RingBuffer(self.chunk_len + 2 * N_FFT)
+        self._frames = RingBuffer(self.window_frames + 2 * (self.chunk_len // HOP_LENGTH + 2), rows=N_MELS)
+        self.received = 0
+        self.next_start = 0
+
+    def push(self, samples: np.ndarray) -> list[dict]:
+        samples = np.asarray(samples, dtype=np.float32)
+        segments = []
+        for offset in range(0, len(samples), self.chunk_len):
+            chunk = samples[offset:offset + self.chunk_len]
+            self._samples.write(chunk)
+            self.received += len(chunk)
+            self._compute_frames()
+            segments.extend(self._emit_windows())
+        return segments
+
+    def _compute_frames(self) -> None:
+        pad = N_FFT // 2
+        available = (self.received - pad) // HOP_LENGTH + 1 if self.received >= pad else 0
+        first = self._frames.end
+        if available <= first:
+            return
+        lo = first * HOP_LENGTH - pad
+        hi = (available - 1) * HOP_LENGTH + pad
+        span = self._samples.read(max(lo, 0), hi)
+        if lo < 0:
+            span = np.concatenate([np.zeros(-lo, dtype=np.float32), span])
+        frames = np.lib.stride_tricks.sliding_window_view(span, N_FFT)[::HOP_LENGTH]
+        self._frames.write(frames_log_power(frames, self.sample_rate))
+
+    def _emit_windows(self) -> list[dict]:
+        starts = []
+        windows = []
+        while self.next_start + self.window_len <= self.received:
+            first = int(np.rint(self.next_start / HOP_LENGTH))
+            if first + self.window_frames > self._frames.end:
+                break
+            window = self._frames.read(first, first + self.window_frames)
+            windows.append(np.maximum(window - window.max(), -TOP_DB))
+            starts.append(self.next_start)
+            self.next_start += self.hop_len
+        if not windows:
+            return []
+
+        model = get_inference_model()
+        model.eval()
+        probs = infer_murmur_probs(extract_window_features(np.stack(windows)), model)
+        return [
+            {
+                "t0": start / self.sample_rate,
+                "t1": (start + self.window_len) / self.sample_rate,
+                "murmur_prob": float(prob),
+            }
+            for start, prob in zip(starts, probs.tolist())
+        ]
@@ -0,0 +1,47 @@
+import importlib
+import time
+
+import numpy as np
+
+from app.ml.pipeline import get_engine
+
+WARMUP_SAMPLE_RATE = 4000
+WARMUP_DURATION_S = 3.0
+PRELOAD_MODULES = ("scipy.fft", "scipy.signal", "soundfile", "app.ml.analysis", "app.utils.plots")
+
+
+def synthetic_recording(sample_rate: int = WARMUP_SAMPLE_RATE, duration_s: float = WARMUP_DURATION_S) -> np.ndarray:
+    # Two damped 60 Hz thumps per beat at 72 bpm over low noise: enough to exercise every stage.
+    t = np.arange(int(sample_rate * duration_s)) / sample_rate
+    phase = t % (60.0 / 72.0)
+    envelope = np.exp(-phase / 0.02) + np.exp(-np.maximum(phase - 0.3, 0.0) / 0.02) * (phase >= 0.3)
+    noise = np.random.default_rng(0).normal(0.0, 0.01, t.size)
+    return (0.5 * envelope * np.sin(2 * np.pi * 60 * t) + noise).astype(np.float32)
+
+
+def preload() -> float:
+    # Loads the weights and the lazily imported DSP and plotting modules in this process, so workers forked
+    # from it (the fork pool context, gunicorn --preload) share the pages instead of loading their own copy.
+    from app.utils.plots import _pyplot, _use_matplotlib
+
+    started = time.perf_counter()
+    get_engine()
+    for module in PRELOAD_MODULES:
+        importlib.import_module(module)
+    if _use_matplotlib():
+        _pyplot()
+    return time.perf_counter() - started
+
+
+def warm_parent() -> None:
+    # Stages that run in the serving process rather than the analysis workers: hashing and lazy artifact rendering.
+    from app.execution.cache import analysis_cache_key
+    from app.ml.features import compute_spectrogram
+    from app.utils.artifacts import render_artifact, waveform_envelope
+
+    samples = synthetic_recording()
+    analysis_cache_key(samples, WARMUP_SAMPLE_RATE, {})
+    mel_db = compute_spectrogram(samples, WARMUP_SAMPLE_RATE).mel_db
+    segments = [{"t0": 0.0, "t1": WARMUP_DURATION_S, "murmur_prob": 0.5}]
+    for name in ("waveform", "spectrogram", "timeline", "explainability"):
+        render_artifact(name, waveform_envelope(samples), WARMUP_DURATION_S, mel_db, segments)
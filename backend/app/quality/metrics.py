@@ -13,25 +13,118 @@ class QualityResult:
     retake_reasons: list[str]
 
 
+CLIP_LEVEL = 0.99
+FRAME_S = 0.1
+CHUNK_SAMPLES = 1 << 16
+MAX_EXACT_FRAMES = 1 << 18
+HIST_DB_MIN = -240.0
+HIST_DB_MAX = 40.0
+HIST_DB_STEP = 0.01
+
+
+class QualityAccumulator:
+    # Incremental compute_quality: feed chunks in order with update(), read the result at any point.
+    # Frame energies are kept exactly up to MAX_EXACT_FRAMES (about 7 h of audio); past that the
+    # median, noise floor and silence fraction come from a fixed 0.01 dB histogram, so memory stays
+    # bounded on unbounded streams.
+    def __init__(self, sample_rate: int, max_exact_frames: int = MAX_EXACT_FRAMES):
+        self.sample_rate = sample_rate
+        self.frame_len = max(1, int(FRAME_S * sample_rate))
+        self.max_exact_frames = max_exact_frames
+        self.n_samples = 0
+        self.sum_squares = 0.0
+        self.clipped = 0
+        self._partial = np.zeros(self.frame_len, dtype=np.float32)
+        self._partial_len = 0
+        self._energies: list[np.ndarray] | None = []
+        self._n_frames = 0
+        self._histogram = np.zeros(int(round((HIST_DB_MAX - HIST_DB_MIN) / HIST_DB_STEP)), dtype=np.int64)
+
+    def update(self, samples: np.ndarray) -> None:
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        for offset in range(0, len(samples), CHUNK_SAMPLES):
+            self._update_chunk(samples[offset:offset + CHUNK_SAMPLES])
+
+    def _update_chunk(self, chunk: np.ndarray) -> None:
+        self.n_samples += len(chunk)
+        self.clipped += int(np.count_nonzero(chunk > CLIP_LEVEL) + np.count_nonzero(chunk < -CLIP_LEVEL))
+        self.sum_squares += float(np.dot(chunk, chunk))
+
+        if self._partial_len:
+            take = min(len(chunk), self.frame_len - self._partial_len)
+            self._partial[self._partial_len:self._partial_len + take] = chunk[:take]
+            self._partial_len += take
+            chunk = chunk[take:]
+            if self._partial_len < self.frame_len:
+                return
+            self._add_frames(self._partial[None, :])
+            self._partial_len = 0
+        whole = len(chunk) - len(chunk) % self.frame_len
+        if whole:
+            self._add_frames(chunk[:whole].reshape(-1, self.frame_len))
+        rest = len(chunk) - whole
+        self._partial[:rest] = chunk[whole:]
+        self._partial_len = rest
+
+    def _add_frames(self, frames: np.ndarray) -> None:
+        energies = np.sqrt(np.einsum("ij,ij->i", frames, frames) / frames.shape[1])
+        self._n_frames += len(energies)
+        self._histogram += np.bincount(self._bins(energies), minlength=len(self._histogram))
+        if self._energies is not None:
+            self._energies.append(energies)
+            if self._n_frames > self.max_exact_frames:
+                self._energies = None
+
+    def _bins(self, energies: np.ndarray) -> np.ndarray:
+        db = 20.0 * np.log10(np.maximum(energies, 1e-30))
+        index = np.floor((db - HIST_DB_MIN) / HIST_DB_STEP).astype(np.int64)
+        return np.clip(index, 0, len(self._histogram) - 1)
+
+    def _frame_energies(self) -> np.ndarray | None:
+        if self._n_frames == 0:
+            # Shorter than one frame: the whole signal counts as a single frame.
+            partial = self._partial[:self._partial_len]
+            return np.array([np.sqrt(np.mean(partial ** 2))])
+        if self._energies is None:
+            return None
+        return np.concatenate(self._energies)
+
+    def _histogram_percentile(self, q: float) -> float:
+        # Linear interpolation between closest ranks, as np.percentile does, on bin centres.
+        rank = q / 100.0 * (self._n_frames - 1)
+        lower = int(np.floor(rank))
+        cumulative = np.cumsum(self._histogram)
+        index = np.searchsorted(cumulative, [lower + 1, min(lower + 2, self._n_frames)])
+        values = 10.0 ** ((HIST_DB_MIN + (index + 0.5) * HIST_DB_STEP) / 20.0)
+        return float(values[0] + (rank - lower) * (values[1] - values[0]))
+
+    def _energy_stats(self, exact: bool) -> tuple[float, float]:
+        energies = self._frame_energies() if exact or self._n_frames == 0 else None
+        if energies is not None:
+            silence_thresh = max(0.02, 0.5 * np.median(energies))
+            return float(np.mean(energies < silence_thresh)), np.percentile(energies, 10)
+        silence_thresh = max(0.02, 0.5 * self._histogram_percentile(50))
+        below = self._histogram[: self._bins(np.array([silence_thresh]))[0]].sum()
+        return float(below / self._n_frames), self._histogram_percentile(10)
+
+    def result(self, exact: bool = True) -> QualityResult:
+        # exact=False reads the quantiles from the histogram, a cost independent of the audio seen so far,
+        # for scores reported repeatedly while a stream grows.
+        if self.n_samples == 0:
+            return QualityResult(0, 0.0, 100.0, 100.0, True, ["No audio detected."])
+        clipping_pct = self.clipped / self.n_samples
+        rms = float(np.sqrt(self.sum_squares / self.n_samples))
+        silence_pct, noise_floor = self._energy_stats(exact)
+        return _score(rms, clipping_pct, silence_pct, noise_floor)
+
+
 def compute_quality(samples: np.ndarray, sample_rate: int) -> QualityResult:
-    if len(samples) == 0:
-        return QualityResult(0, 0.0, 100.0, 100.0, True, ["No audio detected."])
-
-    abs_samples = np.abs(samples)
-    clipping_pct = float(np.mean(abs_samples > 0.99))
-    rms = float(np.sqrt(np.mean(samples ** 2)))
-
-    frame_len = int(0.1 * sample_rate)
-    if frame_len <= 0:
-        frame_len = 1
-    frames = samples[: len(samples) - (len(samples) % frame_len)]
-    if len(frames) == 0:
-        frames = samples
-    frame_energies = np.sqrt(np.mean(frames.reshape(-1, frame_len) ** 2, axis=1))
-    silence_thresh = max(0.02, 0.5 * np.median(frame_energies))
-    silence_pct = float(np.mean(frame_energies < silence_thresh))
-
-    noise_floor = np.percentile(frame_energies, 10)
+    accumulator = QualityAccumulator(sample_rate)
+    accumulator.update(samples)
+    return accumulator.result()
+
+
+def _score(rms: float, clipping_pct: float, silence_pct: float, noise_floor: float) -> QualityResult:
     noise_floor = max(noise_floor, 1e-6)
     snr_db = 20 * np.log10((rms + 1e-6) / noise_floor)
 
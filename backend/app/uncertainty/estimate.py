@@ -1,17 +1,67 @@
 import numpy as np
-import torch
 
+from app.ml.engine import sigmoid
 
-def mc_dropout_uncertainty(model: torch.nn.Module, features: torch.Tensor, passes: int = 20) -> tuple[float, float]:
-    model.train()
+MC_DROPOUT_MODES = {"sequential", "batched", "adaptive"}
+MAX_MC_PASSES = 200
+
+
+def _sequential_probs(model, features: np.ndarray, passes: int) -> np.ndarray:
     probs = []
-    with torch.no_grad():
-        for _ in range(passes):
-            logits = model(features)
-            murmur_prob = torch.sigmoid(logits[0]).item()
-            probs.append(murmur_prob)
-    model.eval()
-    probs_arr = np.array(probs, dtype=np.float32)
+    for _ in range(passes):
+        logits = model(features)
+        probs.append(float(sigmoid(logits[0])))
+    return np.array(probs, dtype=np.float32)
+
+
+def _batched_probs(model, features: np.ndarray, passes: int) -> np.ndarray:
+    # Dropout draws an independent mask per row, so each repeated row is one MC sample.
+    logits = model(np.broadcast_to(features, (passes, features.shape[-1])))
+    return sigmoid(logits[:, 0])
+
+
+def _adaptive_probs(
+    model, features: np.ndarray, passes: int, tolerance: float, chunk_size: int
+) -> np.ndarray:
+    chunks = []
+    drawn = 0
+    previous_variance = None
+    while drawn < passes:
+        size = min(chunk_size, passes - drawn)
+        chunks.append(_batched_probs(model, features, size))
+        drawn += size
+        if drawn < 2 * chunk_size:
+            continue
+        variance = float(np.var(np.concatenate(chunks)))
+        if previous_variance is not None and abs(variance - previous_variance) <= tolerance:
+            break
+        previous_variance = variance
+    return np.concatenate(chunks)
+
+
+def mc_dropout_uncertainty(
+    model,
+    features: np.ndarray,
+    passes: int = 20,
+    mode: str = "batched",
+    tolerance: float = 1e-4,
+    chunk_size: int = 5,
+) -> tuple[float, float]:
+    if mode not in MC_DROPOUT_MODES:
+        raise ValueError(f"Unknown MC-dropout mode: {mode}")
+    if not 1 <= passes <= MAX_MC_PASSES:
+        raise ValueError(f"MC-dropout passes must be between 1 and {MAX_MC_PASSES}.")
+
+    model.train()
+    try:
+        if mode == "sequential":
+            probs_arr = _sequential_probs(model, features, passes)
+        elif mode == "batched":
+            probs_arr = _batched_probs(model, features, passes)
+        else:
+            probs_arr = _adaptive_probs(model, features, passes, tolerance, chunk_size)
+    finally:
+        model.eval()
     mean_prob = float(np.mean(probs_arr))
     variance = float(np.var(probs_arr))
     uncertainty_score = min(1.0, variance * 10.0)
@@ -0,0 +1,39 @@
+import numpy as np
+
+from app.utils.render import WIDTH, minmax_decimate
+
+ARTIFACT_MODES = {"inline", "lazy", "none"}
+ARTIFACT_NAMES = ("waveform", "spectrogram", "timeline", "explainability")
+WAVEFORM_POINTS = 4 * WIDTH
+
+
+def artifact_links(request_id: str) -> dict:
+    return {f"{name}_png_url": f"/api/history/{request_id}/artifacts/{name}.png" for name in ARTIFACT_NAMES}
+
+
+def waveform_envelope(samples: np.ndarray, points: int = WAVEFORM_POINTS) -> np.ndarray:
+    # Interleaved per-column (min, max) pairs keep every extreme the plot can show.
+    if len(samples) <= 2 * points:
+        return np.array(samples, dtype=np.float32)
+    lows, highs = minmax_decimate(samples, points)
+    return np.stack([lows, highs], axis=1).reshape(-1).astype(np.float32)
+
+
+def render_artifact(
+    name: str,
+    waveform: np.ndarray,
+    duration_s: float,
+    mel_db: np.ndarray,
+    segments: list[dict],
+) -> bytes:
+    from app.explainability.saliency import saliency_heatmap
+    from app.ml.pipeline import get_engine
+    from app.utils.plots import explainability_png, spectrogram_png, timeline_png, waveform_png
+
+    if name == "waveform":
+        return waveform_png(waveform, max(1, round(len(waveform) / duration_s)))
+    if name == "spectrogram":
+        return spectrogram_png(mel_db)
+    if name == "timeline":
+        return timeline_png(segments)
+    return explainability_png(mel_db, saliency_heatmap(get_engine(), mel_db))
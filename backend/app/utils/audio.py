@@ -1,10 +1,26 @@
 import io
-import wave
+import struct
+import tempfile
+from collections.abc import Callable
 from dataclasses import dataclass
+from functools import lru_cache
+from math import gcd
+from typing import BinaryIO
 
 import numpy as np
 
 MIN_DURATION_S = 1.0
+CHUNK_BYTES = 1 << 20
+MEMMAP_THRESHOLD_BYTES = 256 << 20
+_PCM_FORMATS = {0x0001, 0xFFFE}
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg", ".oga", ".aif", ".aiff")
+_INT16_SCALE = np.float32(1.0 / 32768.0)
+RESAMPLE_TAPS_PER_PHASE = 6
+RESAMPLE_KAISER_BETA = 5.0
+
+
+class UploadTooLargeError(ValueError):
+    pass
 
 
 @dataclass
@@ -12,28 +28,208 @@ class AudioData:
     samples: np.ndarray
     sample_rate: int
     duration_s: float
+    original_sample_rate: int | None = None
 
 
-def load_wav(file_bytes: bytes) -> AudioData:
-    try:
-        with wave.open(io.BytesIO(file_bytes), "rb") as wf:
-            if wf.getnchannels() != 1:
-                raise ValueError("Only mono WAV files are supported.")
-            sample_rate = wf.getframerate()
-            frames = wf.getnframes()
-            if frames == 0 or sample_rate == 0:
-                raise ValueError("WAV file contains no audio data.")
-            raw = wf.readframes(frames)
-            samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
-            duration_s = frames / float(sample_rate)
-    except wave.Error as exc:
-        raise ValueError("Invalid WAV file.") from exc
+@dataclass
+class WavHeader:
+    format_tag: int
+    channels: int
+    sample_rate: int
+    bits_per_sample: int
+    data_bytes: int
+
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("Invalid WAV file.")
+    return data
+
+
+def read_wav_header(stream: BinaryIO) -> WavHeader:
+    riff = stream.read(12)
+    if len(riff) != 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+        raise ValueError("Invalid WAV file.")
+    fmt = None
+    while True:
+        chunk_header = stream.read(8)
+        if len(chunk_header) < 8:
+            raise ValueError("Invalid WAV file.")
+        chunk_id, chunk_size = chunk_header[:4], struct.unpack("<I", chunk_header[4:])[0]
+        if chunk_id == b"fmt ":
+            body = _read_exact(stream, chunk_size + (chunk_size & 1))
+            if chunk_size < 16:
+                raise ValueError("Invalid WAV file.")
+            fmt = struct.unpack("<HHIIHH", body[:16])
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("Invalid WAV file.")
+            format_tag, channels, sample_rate, _, _, bits = fmt
+            return WavHeader(
+                format_tag=format_tag,
+                channels=channels,
+                sample_rate=sample_rate,
+                bits_per_sample=bits,
+                data_bytes=chunk_size,
+            )
+        else:
+            _read_exact(stream, chunk_size + (chunk_size & 1))
+
+
+def _allocate(frames: int) -> np.ndarray:
+    if frames * 4 <= MEMMAP_THRESHOLD_BYTES:
+        return np.empty(frames, dtype=np.float32)
+    return np.memmap(tempfile.TemporaryFile(), dtype=np.float32, mode="w+", shape=(frames,))
+
+
+def sniff_format(head: bytes) -> str | None:
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"FORM" and head[8:12] in {b"AIFF", b"AIFC"}:
+        return "aiff"
+    return None
+
+
+def _check_size(frames: int, sample_rate: int, pcm_bytes: int, max_bytes: int | None) -> None:
+    if frames == 0 or sample_rate == 0:
+        raise ValueError("Recording contains no audio data.")
+    if max_bytes is not None and pcm_bytes > max_bytes:
+        raise UploadTooLargeError(f"Recording exceeds the {max_bytes // (1 << 20)} MB upload limit.")
+    if frames / float(sample_rate) < MIN_DURATION_S:
+        raise ValueError("Recording is too short for analysis.")
+
 
+def _finish(samples: np.ndarray, filled: int, sample_rate: int) -> AudioData:
+    if filled == 0:
+        raise ValueError("Recording contains no audio data.")
+    duration_s = filled / float(sample_rate)
     if duration_s < MIN_DURATION_S:
         raise ValueError("Recording is too short for analysis.")
+    return AudioData(samples=samples[:filled], sample_rate=sample_rate, duration_s=duration_s)
 
-    return AudioData(samples=samples, sample_rate=sample_rate, duration_s=duration_s)
+
+def _decode_pcm16(
+    stream: BinaryIO,
+    header: WavHeader,
+    max_bytes: int | None,
+    chunk_bytes: int,
+    on_samples: Callable[[np.ndarray, int], None] | None,
+) -> AudioData:
+    frames = header.data_bytes // 2
+    _check_size(frames, header.sample_rate, header.data_bytes, max_bytes)
+
+    samples = _allocate(frames)
+    buffer = bytearray(chunk_bytes - chunk_bytes % 2)
+    view = memoryview(buffer)
+    filled = 0
+    while filled < frames:
+        wanted = min(len(buffer), (frames - filled) * 2)
+        read = stream.readinto(view[:wanted])
+        if not read:
+            break
+        usable = read - read % 2
+        count = usable // 2
+        pcm = np.frombuffer(buffer, dtype="<i2", count=count)
+        np.multiply(pcm, _INT16_SCALE, out=samples[filled:filled + count], casting="unsafe")
+        if on_samples is not None:
+            on_samples(samples[filled:filled + count], header.sample_rate)
+        filled += count
+        if usable != read:
+            break
+    return _finish(samples, filled, header.sample_rate)
+
+
+def _decode_soundfile(
+    stream: BinaryIO,
+    max_bytes: int | None,
+    chunk_bytes: int,
+    on_samples: Callable[[np.ndarray, int], None] | None,
+) -> AudioData:
+    # Everything other than mono 16-bit PCM WAV (FLAC, OGG/Vorbis, AIFF, 8/24/32-bit and float WAV,
+    # multichannel input) goes through libsndfile. Channels are averaged block by block, and the
+    # size limit applies to the audio as 16-bit PCM so a small compressed file cannot expand without bound.
+    import soundfile
+
+    try:
+        with soundfile.SoundFile(stream) as source:
+            frames, sample_rate, channels = source.frames, source.samplerate, source.channels
+            _check_size(frames, sample_rate, frames * channels * 2, max_bytes)
+            samples = _allocate(frames)
+            block = max(1, chunk_bytes // (4 * channels))
+            filled = 0
+            while filled < frames:
+                data = source.read(min(block, frames - filled), dtype="float32", always_2d=True)
+                count = len(data)
+                if not count:
+                    break
+                out = samples[filled:filled + count]
+                if channels == 1:
+                    out[:] = data[:, 0]
+                else:
+                    np.mean(data, axis=1, out=out)
+                if on_samples is not None:
+                    on_samples(out, sample_rate)
+                filled += count
+    except soundfile.LibsndfileError as exc:
+        raise ValueError("Unsupported or corrupt audio file.") from exc
+    return _finish(samples, filled, sample_rate)
+
+
+def decode_audio_stream(
+    stream: BinaryIO,
+    max_bytes: int | None = None,
+    chunk_bytes: int = CHUNK_BYTES,
+    on_samples: Callable[[np.ndarray, int], None] | None = None,
+) -> AudioData:
+    container = sniff_format(stream.read(12))
+    stream.seek(0)
+    if container is None:
+        raise ValueError("Unsupported audio format; upload WAV, FLAC, OGG or AIFF.")
+    if container == "wav":
+        header = read_wav_header(stream)
+        if header.format_tag in _PCM_FORMATS and header.bits_per_sample == 16 and header.channels == 1:
+            return _decode_pcm16(stream, header, max_bytes, chunk_bytes, on_samples)
+        stream.seek(0)
+    return _decode_soundfile(stream, max_bytes, chunk_bytes, on_samples)
+
+
+@lru_cache(maxsize=32)
+def decimation_filter(up: int, down: int) -> np.ndarray:
+    # Kaiser-windowed low-pass at the output Nyquist rate, about 60 dB down by 1.5x that frequency,
+    # so nothing folds into the band the features use.
+    from scipy.signal import firwin
+
+    ratio = max(up, down)
+    taps = firwin(2 * RESAMPLE_TAPS_PER_PHASE * ratio + 1, 1.0 / ratio, window=("kaiser", RESAMPLE_KAISER_BETA))
+    taps = taps.astype(np.float32)
+    taps.flags.writeable = False
+    return taps
+
+
+def resample_audio(audio: AudioData, target_rate: int) -> AudioData:
+    if not target_rate or audio.sample_rate <= target_rate:
+        return audio
+    from scipy.signal import resample_poly
+
+    divisor = gcd(audio.sample_rate, target_rate)
+    up, down = target_rate // divisor, audio.sample_rate // divisor
+    samples = resample_poly(audio.samples, up, down, window=decimation_filter(up, down))
+    return AudioData(
+        samples=samples.astype(np.float32, copy=False),
+        sample_rate=target_rate,
+        duration_s=len(samples) / float(target_rate),
+        original_sample_rate=audio.original_sample_rate or audio.sample_rate,
+    )
+
+
+def load_wav(file_bytes: bytes) -> AudioData:
+    return decode_audio_stream(io.BytesIO(file_bytes))
 
 
-def is_wav_filename(filename: str) -> bool:
-    return filename.lower().endswith(".wav")
+def is_audio_filename(filename: str) -> bool:
+    return filename.lower().endswith(AUDIO_EXTENSIONS)
@@ -0,0 +1,96 @@
+import contextlib
+import json
+import posixpath
+import zipfile
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import BinaryIO
+
+METADATA_MEMBER = "metadata.json"
+METADATA_FIELDS = ("auscultation_site", "patient_id", "visit_label")
+
+
+@dataclass
+class BatchEntry:
+    index: int
+    filename: str
+    open: Callable[[], contextlib.AbstractContextManager[BinaryIO]]
+    size: int | None
+    metadata: dict = field(default_factory=dict)
+
+
+def parse_metadata(raw: str | bytes | None) -> dict | list:
+    if not raw:
+        return {}
+    try:
+        metadata = json.loads(raw)
+    except json.JSONDecodeError as exc:
+        raise ValueError("metadata must be valid JSON.") from exc
+    if not isinstance(metadata, (dict, list)):
+        raise ValueError("metadata must be a JSON object keyed by filename or a list in upload order.")
+    return metadata
+
+
+def _lookup(metadata: dict | list, index: int, filename: str) -> dict:
+    if isinstance(metadata, list):
+        entry = metadata[index] if index < len(metadata) else {}
+    else:
+        entry = metadata.get(filename) or metadata.get(posixpath.basename(filename)) or {}
+    if not isinstance(entry, dict):
+        raise ValueError(f"metadata for {filename} must be an object.")
+    return {key: entry[key] for key in METADATA_FIELDS if key in entry}
+
+
+def expand_uploads(uploads: list[tuple[str, BinaryIO]], metadata: dict | list) -> list[BatchEntry]:
+    # Zip uploads contribute one entry per member, left to the decoder's content sniffing to accept
+    # or reject; an optional metadata.json inside the archive is merged under the request-level metadata.
+    entries: list[BatchEntry] = []
+    for filename, stream in uploads:
+        if filename.lower().endswith(".zip") or zipfile.is_zipfile(stream):
+            stream.seek(0)
+            try:
+                archive = zipfile.ZipFile(stream)
+            except zipfile.BadZipFile as exc:
+                raise ValueError(f"{filename} is not a valid zip archive.") from exc
+            members = [info for info in archive.infolist() if not info.is_dir()]
+            archive_metadata = {}
+            for info in members:
+                if posixpath.basename(info.filename) == METADATA_MEMBER:
+                    archive_metadata = parse_metadata(archive.read(info))
+            members = [
+                info
+                for info in members
+                if posixpath.basename(info.filename) != METADATA_MEMBER and not info.filename.startswith("__MACOSX/")
+            ]
+            for position, info in enumerate(members):
+                entries.append(
+                    BatchEntry(
+                        index=len(entries),
+                        filename=info.filename,
+                        open=lambda archive=archive, info=info: archive.open(info),
+                        size=info.file_size,
+                        metadata=_lookup(archive_metadata, position, info.filename),
+                    )
+                )
+        else:
+            stream.seek(0)
+            entries.append(
+                BatchEntry(
+                    index=len(entries),
+                    filename=filename,
+                    open=lambda stream=stream: contextlib.nullcontext(stream),
+                    size=None,
+                )
+            )
+    for entry in entries:
+        entry.metadata.update(_lookup(metadata, entry.index, entry.filename))
+    return entries
+
+
+def entry_fields(entry: BatchEntry, defaults: dict, sites: set[str]) -> dict:
+    fields = {**defaults, **{key: value for key, value in entry.metadata.items() if value is not None}}
+    if not fields.get("patient_id"):
+        raise ValueError("patient_id is required.")
+    if fields.get("auscultation_site") not in sites:
+        raise ValueError("Invalid auscultation site.")
+    return fields
@@ -1,22 +1,47 @@
 import base64
 import io
+import os
 
-import matplotlib
-
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
 import numpy as np
 
+from app.utils import render
+
+PLOT_RENDERERS = {"fast", "matplotlib"}
+
+
+def plot_renderer() -> str:
+    return os.getenv("PLOT_RENDERER", "fast")
+
+
+def _use_matplotlib() -> bool:
+    return plot_renderer() == "matplotlib"
+
+
+def _pyplot():
+    import matplotlib
 
-def _fig_to_base64(fig: plt.Figure) -> str:
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
+def _fig_to_png(fig) -> bytes:
+    plt = _pyplot()
     buf = io.BytesIO()
     fig.savefig(buf, format="png", bbox_inches="tight", dpi=150)
     plt.close(fig)
-    buf.seek(0)
-    return base64.b64encode(buf.read()).decode("utf-8")
+    return buf.getvalue()
 
 
-def plot_waveform(samples: np.ndarray, sample_rate: int) -> str:
+def _to_base64(png: bytes) -> str:
+    return base64.b64encode(png).decode("utf-8")
+
+
+def waveform_png(samples: np.ndarray, sample_rate: int) -> bytes:
+    if not _use_matplotlib():
+        return render.waveform_png(samples, sample_rate)
+    plt = _pyplot()
     times = np.arange(len(samples)) / sample_rate
     fig, ax = plt.subplots(figsize=(6, 2))
     ax.plot(times, samples, color="#2563eb")
@@ -24,20 +49,26 @@ def plot_waveform(samples: np.ndarray, sample_rate: int) -> str:
     ax.set_xlabel("Time (s)")
     ax.set_ylabel("Amplitude")
     ax.grid(True, alpha=0.3)
-    return _fig_to_base64(fig)
+    return _fig_to_png(fig)
 
 
-def plot_spectrogram(mel_db: np.ndarray) -> str:
+def spectrogram_png(mel_db: np.ndarray) -> bytes:
+    if not _use_matplotlib():
+        return render.spectrogram_png(mel_db)
+    plt = _pyplot()
     fig, ax = plt.subplots(figsize=(6, 3))
     img = ax.imshow(mel_db, aspect="auto", origin="lower", cmap="magma")
     ax.set_title("Mel-Spectrogram")
     ax.set_xlabel("Frames")
     ax.set_ylabel("Mel bins")
     fig.colorbar(img, ax=ax, format="%+2.0f dB")
-    return _fig_to_base64(fig)
+    return _fig_to_png(fig)
 
 
-def plot_timeline(segments: list[dict]) -> str:
+def timeline_png(segments: list[dict]) -> bytes:
+    if not _use_matplotlib():
+        return render.timeline_png(segments)
+    plt = _pyplot()
     times = [(seg["t0"] + seg["t1"]) / 2 for seg in segments]
     probs = [seg["murmur_prob"] for seg in segments]
     fig, ax = plt.subplots(figsize=(6, 2))
@@ -47,14 +78,33 @@ def plot_timeline(segments: list[dict]) -> str:
     ax.set_xlabel("Time (s)")
     ax.set_ylabel("Probability")
     ax.grid(True, alpha=0.3)
-    return _fig_to_base64(fig)
+    return _fig_to_png(fig)
 
 
-def plot_explainability(mel_db: np.ndarray, heatmap: np.ndarray) -> str:
+def explainability_png(mel_db: np.ndarray, heatmap: np.ndarray) -> bytes:
+    if not _use_matplotlib():
+        return render.explainability_png(mel_db, heatmap)
+    plt = _pyplot()
     fig, ax = plt.subplots(figsize=(6, 3))
     ax.imshow(mel_db, aspect="auto", origin="lower", cmap="magma")
     ax.imshow(heatmap, aspect="auto", origin="lower", cmap="cool", alpha=0.5)
     ax.set_title("Explainability Overlay")
     ax.set_xlabel("Frames")
     ax.set_ylabel("Mel bins")
-    return _fig_to_base64(fig)
+    return _fig_to_png(fig)
+
+
+def plot_waveform(samples: np.ndarray, sample_rate: int) -> str:
+    return _to_base64(waveform_png(samples, sample_rate))
+
+
+def plot_spectrogram(mel_db: np.ndarray) -> str:
+    return _to_base64(spectrogram_png(mel_db))
+
+
+def plot_timeline(segments: list[dict]) -> str:
+    return _to_base64(timeline_png(segments))
+
+
+def plot_explainability(mel_db: np.ndarray, heatmap: np.ndarray) -> str:
+    return _to_base64(explainability_png(mel_db, heatmap))
@@ -0,0 +1,134 @@
+import struct
+import zlib
+
+import numpy as np
+
+WIDTH = 900
+SHORT_HEIGHT = 300
+TALL_HEIGHT = 450
+
+_MAGMA_ANCHORS = np.array(
+    [
+        (0, 0, 4), (10, 8, 34), (29, 17, 71), (54, 16, 107), (81, 18, 124), (106, 28, 129),
+        (131, 38, 129), (156, 46, 127), (183, 55, 121), (207, 64, 112), (229, 80, 100),
+        (244, 105, 92), (251, 135, 97), (254, 165, 113), (254, 194, 135), (253, 224, 161),
+        (252, 253, 191),
+    ],
+    dtype=np.float64,
+)
+
+
+def _lut_from_anchors(anchors: np.ndarray) -> np.ndarray:
+    positions = np.linspace(0, 255, len(anchors))
+    channels = [np.interp(np.arange(256), positions, anchors[:, c]) for c in range(3)]
+    return np.stack(channels, axis=1).round().astype(np.uint8)
+
+
+MAGMA_LUT = _lut_from_anchors(_MAGMA_ANCHORS)
+COOL_LUT = _lut_from_anchors(np.array([(0, 255, 255), (255, 0, 255)], dtype=np.float64))
+
+WHITE = np.array([255, 255, 255], dtype=np.uint8)
+GRID = np.array([226, 232, 240], dtype=np.uint8)
+BLUE = np.array([37, 99, 235], dtype=np.uint8)
+RED = np.array([239, 68, 68], dtype=np.uint8)
+
+
+def encode_png(rgb: np.ndarray) -> bytes:
+    height, width, _ = rgb.shape
+    raw = np.empty((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 0] = 0
+    raw[:, 1:] = rgb.reshape(height, width * 3)
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+def _normalize(values: np.ndarray) -> np.ndarray:
+    low, high = float(np.min(values)), float(np.max(values))
+    scale = 255.0 / (high - low) if high > low else 0.0
+    return ((values - low) * scale).astype(np.uint8)
+
+
+def _resize_indices(source: int, target: int) -> np.ndarray:
+    return np.minimum((np.arange(target) * source) // target, source - 1)
+
+
+def _image(values: np.ndarray, lut: np.ndarray, height: int, width: int) -> np.ndarray:
+    # origin="lower": the first mel bin is the bottom row.
+    rows = _resize_indices(values.shape[0], height)[::-1]
+    cols = _resize_indices(values.shape[1], width)
+    return lut[_normalize(values)[np.ix_(rows, cols)]]
+
+
+def _canvas(height: int, width: int, horizontal_lines: int) -> np.ndarray:
+    canvas = np.empty((height, width, 3), dtype=np.uint8)
+    canvas[:] = WHITE
+    for level in np.linspace(0, height - 1, horizontal_lines + 1)[1:-1]:
+        canvas[int(level)] = GRID
+    return canvas
+
+
+def _draw_columns(canvas: np.ndarray, top: np.ndarray, bottom: np.ndarray, color: np.ndarray) -> None:
+    rows = np.arange(canvas.shape[0])[:, None]
+    mask = (rows >= top[None, :]) & (rows <= bottom[None, :])
+    canvas[mask] = color
+
+
+def _to_rows(values: np.ndarray, low: float, high: float, height: int) -> np.ndarray:
+    span = high - low if high > low else 1.0
+    scaled = (high - np.clip(values, low, high)) / span
+    return np.rint(scaled * (height - 1)).astype(np.int64)
+
+
+def minmax_decimate(samples: np.ndarray, width: int) -> tuple[np.ndarray, np.ndarray]:
+    if len(samples) == 0:
+        zeros = np.zeros(width, dtype=np.float32)
+        return zeros, zeros
+    edges = (np.arange(width) * len(samples)) // width
+    return np.minimum.reduceat(samples, edges), np.maximum.reduceat(samples, edges)
+
+
+def waveform_png(samples: np.ndarray, sample_rate: int) -> bytes:
+    width = min(WIDTH, max(len(samples), 1))
+    lows, highs = minmax_decimate(samples, width)
+    peak = max(float(np.max(np.abs(highs))), float(np.max(np.abs(lows))), 1e-6)
+    canvas = _canvas(SHORT_HEIGHT, width, 4)
+    _draw_columns(canvas, _to_rows(highs, -peak, peak, SHORT_HEIGHT), _to_rows(lows, -peak, peak, SHORT_HEIGHT), BLUE)
+    return encode_png(canvas)
+
+
+def spectrogram_png(mel_db: np.ndarray) -> bytes:
+    return encode_png(_image(mel_db, MAGMA_LUT, TALL_HEIGHT, WIDTH))
+
+
+def explainability_png(mel_db: np.ndarray, heatmap: np.ndarray) -> bytes:
+    base = _image(mel_db, MAGMA_LUT, TALL_HEIGHT, WIDTH).astype(np.uint16)
+    overlay = _image(heatmap, COOL_LUT, TALL_HEIGHT, WIDTH).astype(np.uint16)
+    return encode_png(((base + overlay) // 2).astype(np.uint8))
+
+
+def timeline_png(segments: list[dict]) -> bytes:
+    canvas = _canvas(SHORT_HEIGHT, WIDTH, 4)
+    if segments:
+        times = np.array([(seg["t0"] + seg["t1"]) / 2 for seg in segments], dtype=np.float64)
+        probs = np.array([seg["murmur_prob"] for seg in segments], dtype=np.float64)
+        start, end = float(times[0]), float(times[-1])
+        span = end - start if end > start else 1.0
+        columns = np.arange(WIDTH)
+        curve = np.interp(start + columns * span / (WIDTH - 1), times, probs)
+        rows = _to_rows(curve, 0.0, 1.0, SHORT_HEIGHT)
+        previous = np.concatenate([rows[:1], rows[:-1]])
+        _draw_columns(canvas, np.minimum(rows, previous) - 1, np.maximum(rows, previous) + 1, RED)
+        marker_cols = np.rint((times - start) / span * (WIDTH - 1)).astype(np.int64)
+        marker_rows = _to_rows(probs, 0.0, 1.0, SHORT_HEIGHT)
+        for col, row in zip(marker_cols.tolist(), marker_rows.tolist()):
+            canvas[max(row - 3, 0):row + 4, max(col - 3, 0):col + 4] = RED
+    return encode_png(canvas)
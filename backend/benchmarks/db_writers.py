@@ -0,0 +1,133 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from app.config import Settings
+from app.db.crud import create_analysis, list_history
+from app.db.init_db import init_db
+from app.db.models import Analysis, AnalysisBlob
+from app.db.session import get_engine, get_session_maker
+
+# The rollback-journal configuration is what an engine without the pragmas got: pysqlite's 5 s busy timeout
+# and SQLite's defaults.
+CONFIGS = {
+    "rollback": {"sqlite_journal_mode": "DELETE", "sqlite_synchronous": "FULL", "sqlite_busy_timeout_ms": 5000},
+    "wal": {},
+}
+PAYLOAD_KB = 64
+
+
+def _record(patient_id: str) -> tuple[Analysis, list[AnalysisBlob]]:
+    request_id = str(uuid.uuid4())
+    analysis = Analysis(
+        request_id=request_id,
+        created_at=datetime.now(timezone.utc).replace(tzinfo=None),
+        patient_id=patient_id,
+        auscultation_site="Aortic",
+        summary="{}",
+        response_json={"request_id": request_id, "segments": "x" * (PAYLOAD_KB << 10)},
+        artifacts_mode="lazy",
+    )
+    blobs = [
+        AnalysisBlob(
+            request_id=request_id, name=name, blob_key="0" * 64, content_type="application/x-npy", size_bytes=0
+        )
+        for name in ("waveform.npy", "mel_db.npy")
+    ]
+    return analysis, blobs
+
+
+def stress(db_url: str, settings: Settings, writers: int, readers: int, writes: int, read_interval_s: float) -> dict:
+    SessionLocal = get_session_maker(db_url, settings)
+    init_db(db_url)
+    errors: list[str] = []
+    latencies: list[float] = []
+    reads = [0]
+    done = threading.Event()
+
+    def write(worker: int) -> None:
+        for _ in range(writes):
+            started = time.perf_counter()
+            try:
+                with SessionLocal() as db:
+                    create_analysis(db, *_record(f"patient-{worker}"))
+            except Exception as exc:
+                errors.append(type(exc).__name__ + ": " + str(exc).splitlines()[0])
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    def read(worker: int) -> None:
+        while not done.is_set():
+            with SessionLocal() as db:
+                list_history(db, f"patient-{worker % writers}", 50)
+            reads[0] += 1
+            done.wait(read_interval_s)
+
+    threads = [threading.Thread(target=write, args=(index,)) for index in range(writers)]
+    background = [threading.Thread(target=read, args=(index,)) for index in range(readers)]
+    started = time.perf_counter()
+    for thread in background + threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    for thread in background:
+        thread.join()
+
+    with get_engine(db_url).connect() as conn:
+        journal_mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+    latencies.sort()
+    return {
+        "journal_mode": journal_mode,
+        "writes_ok": len(latencies),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "writes_per_s": len(latencies) / elapsed,
+        "reads_per_s": reads[0] / elapsed,
+        "write_p50_ms": statistics.median(latencies) * 1000.0 if latencies else None,
+        "write_p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000.0 if latencies else None,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent history writers against SQLite, rollback journal vs WAL.")
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writes", type=int, default=50, help="Inserts per writer thread.")
+    parser.add_argument("--read-interval-ms", type=float, default=10.0, help="Pause between a reader's history pages.")
+    parser.add_argument("--output", help="Write the results as JSON.")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, overrides in CONFIGS.items():
+            db_url = f"sqlite:///{os.path.join(tmpdir, f'{name}.db')}"
+            settings = Settings(**overrides)
+            result = stress(db_url, settings, args.writers, args.readers, args.writes, args.read_interval_ms / 1000.0)
+            get_engine(db_url).dispose()
+            results[name] = result
+            print(
+                f"{name:<9} journal={result['journal_mode']:<7} {result['writes_per_s']:8.1f} writes/s"
+                f"  {result['reads_per_s']:8.1f} reads/s  p50 {result['write_p50_ms'] or 0:7.1f} ms"
+                f"  p99 {result['write_p99_ms'] or 0:7.1f} ms  errors {result['errors']}"
+            )
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(
+                {"writers": args.writers, "readers": args.readers, "writes": args.writes, **results}, handle, indent=2
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+import gc
+import os
+import resource
+import statistics
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        # ru_maxrss is the lifetime peak (KiB on Linux), the best available without /proc.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RssSampler:
+    def __init__(self, interval_s: float = 0.002):
+        self.interval_s = interval_s
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss_bytes())
+            self._stop.wait(self.interval_s)
+
+    def __enter__(self) -> "RssSampler":
+        self.peak = current_rss_bytes()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_bytes())
+
+
+@dataclass
+class StageResult:
+    stage: str
+    sample_rate: int
+    duration_s: float
+    repeat: int
+    wall_ms_median: float
+    wall_ms_min: float
+    wall_ms_max: float
+    alloc_peak_mb: float
+    alloc_count: int
+    rss_start_mb: float
+    rss_peak_mb: float
+
+    @property
+    def case(self) -> str:
+        return f"{self.stage}@{self.sample_rate}Hz/{self.duration_s:g}s"
+
+    def to_dict(self) -> dict:
+        return {"case": self.case, **asdict(self)}
+
+
+def measure(stage: str, sample_rate: int, duration_s: float, fn: Callable[[], object], repeat: int = 3) -> StageResult:
+    fn()
+    timings = []
+    rss_start = current_rss_bytes()
+    with RssSampler() as sampler:
+        for _ in range(repeat):
+            gc.collect()
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000.0)
+
+    # Allocations are measured on a separate run so tracemalloc overhead never skews wall time.
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        fn()
+        _, alloc_peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    alloc_count = sum(max(stat.count_diff, 0) for stat in after.compare_to(before, "filename"))
+
+    return StageResult(
+        stage=stage,
+        sample_rate=sample_rate,
+        duration_s=duration_s,
+        repeat=repeat,
+        wall_ms_median=statistics.median(timings),
+        wall_ms_min=min(timings),
+        wall_ms_max=max(timings),
+        alloc_peak_mb=alloc_peak / 2**20,
+        alloc_count=alloc_count,
+        rss_start_mb=rss_start / 2**20,
+        rss_peak_mb=sampler.peak / 2**20,
+    )
+
+
+def compare(results: list[dict], baseline: list[dict], threshold: float, min_delta_ms: float) -> list[dict]:
+    reference = {entry["case"]: entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        previous = reference.get(entry["case"])
+        if previous is None:
+            continue
+        before, now = previous["wall_ms_median"], entry["wall_ms_median"]
+        if now > before * (1.0 + threshold) and now - before > min_delta_ms:
+            regressions.append({"case": entry["case"], "baseline_ms": before, "current_ms": now, "ratio": now / before})
+    return regressions
@@ -0,0 +1,196 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.config import Settings
+from app.db.crud import create_analysis
+from app.db.init_db import init_db
+from app.db.models import Analysis, AnalysisBlob
+from app.db.session import get_session_maker
+from app.explainability.saliency import saliency_heatmap
+from app.ml.features import compute_mel_spectrogram, compute_spectrogram
+from app.ml.pipeline import get_engine, run_model, sliding_window_segments
+from app.uncertainty.estimate import mc_dropout_uncertainty
+from app.utils.audio import load_wav
+from app.utils.plots import explainability_png, spectrogram_png, timeline_png, waveform_png
+from benchmarks.harness import compare, measure
+from benchmarks.synthetic import heart_sound, wav_bytes
+
+SAMPLE_RATES = (2000, 4000, 44100)
+DURATIONS_S = (5.0, 60.0, 600.0)
+STAGES = (
+    "load_wav",
+    "compute_mel_spectrogram",
+    "run_model",
+    "sliding_window_segments",
+    "mc_dropout_uncertainty",
+    "saliency_heatmap",
+    "waveform_png",
+    "spectrogram_png",
+    "timeline_png",
+    "explainability_png",
+    "create_analysis",
+    "predict",
+)
+
+
+def _parse_list(value: str, cast):
+    return tuple(cast(item) for item in value.split(",") if item)
+
+
+def _predict_client(tmpdir: str):
+    from fastapi.testclient import TestClient
+
+    from app.main import create_app
+
+    settings = Settings(
+        executor="inline", result_cache=False, blob_dir=os.path.join(tmpdir, "blobs"), max_upload_mb=1024
+    )
+    return TestClient(create_app(f"sqlite:///{os.path.join(tmpdir, 'predict.db')}", settings))
+
+
+def build_stages(samples: np.ndarray, sample_rate: int, tmpdir: str) -> dict:
+    data = wav_bytes(samples, sample_rate)
+    audio = load_wav(data)
+    spectrogram = compute_spectrogram(audio.samples, sample_rate)
+    mel = spectrogram.mel_db
+    model_result = run_model(audio.samples, sample_rate, spectrogram)
+    segments = sliding_window_segments(audio.samples, sample_rate, spectrogram)
+    heatmap = saliency_heatmap(get_engine(), mel)
+
+    db_url = f"sqlite:///{os.path.join(tmpdir, f'bench-{sample_rate}-{len(samples)}.db')}"
+    init_db(db_url)
+    SessionLocal = get_session_maker(db_url)
+    payload = {"segments": segments, "artifacts": None}
+
+    def store():
+        request_id = str(uuid.uuid4())
+        with SessionLocal() as db:
+            create_analysis(
+                db,
+                Analysis(
+                    request_id=request_id,
+                    created_at=datetime.now(timezone.utc).replace(tzinfo=None),
+                    patient_id="bench",
+                    auscultation_site="Aortic",
+                    summary="{}",
+                    response_json={**payload, "request_id": request_id},
+                    artifacts_mode="inline",
+                ),
+                [
+                    AnalysisBlob(
+                        request_id=request_id,
+                        name=f"{name}.png",
+                        blob_key="0" * 64,
+                        content_type="image/png",
+                        size_bytes=0,
+                    )
+                    for name in ("waveform", "spectrogram", "timeline", "explainability")
+                ],
+            )
+
+    client = None
+    counter = itertools.count()
+
+    def predict():
+        nonlocal client
+        if client is None:
+            client = _predict_client(tmpdir)
+        # Perturb the final sample so every call misses the result cache and runs the full pipeline.
+        body = bytearray(data)
+        body[-2:] = (next(counter) % 32768).to_bytes(2, "little")
+        response = client.post(
+            "/api/predict",
+            files={"file": ("bench.wav", bytes(body), "audio/wav")},
+            data={"auscultation_site": "Aortic", "patient_id": "bench"},
+        )
+        response.raise_for_status()
+
+    return {
+        "load_wav": lambda: load_wav(data),
+        "compute_mel_spectrogram": lambda: compute_mel_spectrogram(audio.samples, sample_rate),
+        "run_model": lambda: run_model(audio.samples, sample_rate, spectrogram),
+        "sliding_window_segments": lambda: sliding_window_segments(audio.samples, sample_rate, spectrogram),
+        "mc_dropout_uncertainty": lambda: mc_dropout_uncertainty(
+            get_engine().handle(), model_result["features"], passes=20
+        ),
+        "saliency_heatmap": lambda: saliency_heatmap(get_engine(), mel),
+        "waveform_png": lambda: waveform_png(audio.samples, sample_rate),
+        "spectrogram_png": lambda: spectrogram_png(mel),
+        "timeline_png": lambda: timeline_png(segments),
+        "explainability_png": lambda: explainability_png(mel, heatmap),
+        "create_analysis": store,
+        "predict": predict,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark every /api/predict stage on synthetic recordings.")
+    parser.add_argument("--rates", default=",".join(str(rate) for rate in SAMPLE_RATES))
+    parser.add_argument("--durations", default=",".join(f"{d:g}" for d in DURATIONS_S))
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--quick", action="store_true", help="Only 5 s recordings at 2 and 4 kHz.")
+    parser.add_argument("--output", default="benchmarks/results/latest.json")
+    parser.add_argument("--baseline", help="Compare against a previous results file and flag regressions.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown that counts as a regression.")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="Ignore slowdowns smaller than this.")
+    args = parser.parse_args(argv)
+
+    rates = (2000, 4000) if args.quick else _parse_list(args.rates, int)
+    durations = (5.0,) if args.quick else _parse_list(args.durations, float)
+    stages = _parse_list(args.stages, str)
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for sample_rate, duration_s in itertools.product(rates, durations):
+            runners = build_stages(heart_sound(duration_s, sample_rate), sample_rate, tmpdir)
+            for stage in stages:
+                result = measure(stage, sample_rate, duration_s, runners[stage], repeat=args.repeat)
+                results.append(result.to_dict())
+                print(
+                    f"{result.case:<48} {result.wall_ms_median:>10.2f} ms  "
+                    f"alloc {result.alloc_peak_mb:>8.2f} MB  rss {result.rss_peak_mb:>8.1f} MB",
+                    flush=True,
+                )
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)["results"]
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        for entry in regressions:
+            print(
+                f"REGRESSION {entry['case']}: {entry['baseline_ms']:.2f} ms -> {entry['current_ms']:.2f} ms "
+                f"({entry['ratio']:.2f}x)"
+            )
+        if regressions:
+            return 1
+        print("no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.synthetic import heart_sound, wav_bytes
+
+READY_TIMEOUT_S = 120.0
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _predict(client: httpx.Client, seed: int) -> float:
+    audio = wav_bytes(heart_sound(10.0, 4000, seed=seed), 4000)
+    started = time.perf_counter()
+    response = client.post(
+        "/api/predict",
+        files={"file": ("bench.wav", audio, "audio/wav")},
+        data={"auscultation_site": "Aortic", "patient_id": "startup-bench", "artifacts": "inline"},
+    )
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+def measure_startup(warmup: bool, executor: str, workers: int) -> dict:
+    # Cold start is timed from spawning the server process until /api/ready answers 200.
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{os.path.join(tmpdir, 'bench.db')}",
+            "BLOB_STORE_DIR": os.path.join(tmpdir, "blobs"),
+            "WARMUP": "1" if warmup else "0",
+            "ANALYSIS_EXECUTOR": executor,
+            "ANALYSIS_WORKERS": str(workers),
+            "RESULT_CACHE": "0",
+        }
+        command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"]
+        started = time.perf_counter()
+        server = subprocess.Popen(command, env=env)
+        try:
+            with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=60.0) as client:
+                ready = None
+                while ready is None or ready.status_code != 200:
+                    if time.perf_counter() - started > READY_TIMEOUT_S or server.poll() is not None:
+                        raise RuntimeError("server did not become ready")
+                    time.sleep(0.02)
+                    try:
+                        ready = client.get("/api/ready")
+                    except httpx.TransportError:
+                        ready = None
+                cold_start_s = time.perf_counter() - started
+                first_request_s = _predict(client, seed=1)
+                second_request_s = _predict(client, seed=2)
+                body = ready.json()
+        finally:
+            server.terminate()
+            server.wait()
+    return {
+        "warmup": warmup,
+        "cold_start_to_ready_s": cold_start_s,
+        "first_request_s": first_request_s,
+        "second_request_s": second_request_s,
+        "server_preload_s": body.get("preload_s"),
+        "server_warmup_s": body.get("warmup_s"),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure cold-start-to-ready and first-request latency.")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--executor", default="process", choices=("process", "thread", "inline"))
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--output", help="Write the per-run results as JSON.")
+    args = parser.parse_args(argv)
+
+    runs = []
+    for warmup in (False, True):
+        for _ in range(args.runs):
+            runs.append(measure_startup(warmup, args.executor, args.workers))
+    for warmup in (False, True):
+        selected = [run for run in runs if run["warmup"] is warmup]
+        summary = {
+            key: statistics.median(run[key] for run in selected)
+            for key in ("cold_start_to_ready_s", "first_request_s", "second_request_s")
+        }
+        print(
+            f"warmup={'on ' if warmup else 'off'}  ready {summary['cold_start_to_ready_s'] * 1000:8.1f} ms"
+            f"  first request {summary['first_request_s'] * 1000:8.1f} ms"
+            f"  second request {summary['second_request_s'] * 1000:8.1f} ms"
+        )
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump({"executor": args.executor, "workers": args.workers, "runs": runs}, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+import io
+import wave
+
+import numpy as np
+
+
+def heart_sound(
+    duration_s: float, sample_rate: int, bpm: float = 72.0, murmur: bool = True, seed: int = 0
+) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    n = int(duration_s * sample_rate)
+    t = np.arange(n, dtype=np.float64) / sample_rate
+    beat = 60.0 / bpm
+    phase = np.mod(t, beat)
+
+    def burst(center: float, width: float, freq: float) -> np.ndarray:
+        envelope = np.exp(-0.5 * ((phase - center) / width) ** 2)
+        return envelope * np.sin(2 * np.pi * freq * t)
+
+    signal = 0.6 * burst(0.05, 0.015, 60.0) + 0.4 * burst(0.35, 0.012, 90.0)
+    if murmur:
+        systole = (phase > 0.08) & (phase < 0.32)
+        signal += 0.08 * systole * np.sin(2 * np.pi * 180.0 * t + rng.uniform(0, 2 * np.pi))
+    signal += 0.02 * rng.standard_normal(n)
+    return np.clip(signal, -1.0, 1.0).astype(np.float32)
+
+
+def wav_bytes(samples: np.ndarray, sample_rate: int) -> bytes:
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm.tobytes())
+    return buf.getvalue()
@@ -1,17 +1,33 @@
+import io
 import os
 import tempfile
+import wave
 
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
 
+from app.config import Settings
 from app.main import create_app
 
 
+def make_wav_bytes(duration_s: float = 2.0, sr: int = 2000, freq: float = 120.0) -> bytes:
+    t = np.linspace(0, duration_s, int(sr * duration_s), endpoint=False)
+    samples = (0.2 * np.sin(2 * np.pi * freq * t) * 32767).astype(np.int16)
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sr)
+        wf.writeframes(samples.tobytes())
+    return buf.getvalue()
+
+
 @pytest.fixture()
 def client():
     with tempfile.TemporaryDirectory() as tmpdir:
         db_path = os.path.join(tmpdir, "test.db")
         db_url = f"sqlite:///{db_path}"
-        app = create_app(db_url)
+        app = create_app(db_url, Settings(blob_dir=os.path.join(tmpdir, "blobs")))
         with TestClient(app) as test_client:
             yield test_client
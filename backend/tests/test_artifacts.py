@@ -0,0 +1,90 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app import main
+from app.db.blobs import BlobStore
+from app.db.crud import get_blob_refs
+from app.db.models import AnalysisBlob
+
+from conftest import make_wav_bytes
+
+
+def predict(client, artifacts: str):
+    files = {"file": ("test.wav", make_wav_bytes(), "audio/wav")}
+    data = {"auscultation_site": "Pulmonic", "patient_id": "patient-4", "artifacts": artifacts}
+    response = client.post("/api/predict", files=files, data=data)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_lazy_artifacts_render_on_first_fetch(client):
+    payload = predict(client, "lazy")
+    links = payload["artifacts"]
+    assert set(links) == {
+        "waveform_png_url",
+        "spectrogram_png_url",
+        "timeline_png_url",
+        "explainability_png_url",
+    }
+    for url in links.values():
+        first = client.get(url)
+        assert first.status_code == 200
+        assert first.headers["content-type"] == "image/png"
+        assert first.content.startswith(b"\x89PNG")
+        assert client.get(url).content == first.content
+
+    detail = client.get(f"/api/history/{payload['request_id']}").json()
+    assert detail["artifacts"] == links
+
+
+@pytest.mark.parametrize("mode, status", [("inline", 200), ("none", 404)])
+def test_artifact_endpoint_for_other_modes(client, mode, status):
+    payload = predict(client, mode)
+    assert (payload["artifacts"] is None) == (mode == "none")
+    response = client.get(f"/api/history/{payload['request_id']}/artifacts/spectrogram.png")
+    assert response.status_code == status
+
+
+def test_invalid_artifacts_mode_rejected(client):
+    files = {"file": ("test.wav", make_wav_bytes(), "audio/wav")}
+    data = {"auscultation_site": "Aortic", "patient_id": "patient-4", "artifacts": "sometimes"}
+    assert client.post("/api/predict", files=files, data=data).status_code == 400
+
+
+def test_inline_detail_reports_images_it_cannot_inline(client):
+    request_id = predict(client, "inline")["request_id"]
+    with client.app.state.session_maker() as db:
+        refs = get_blob_refs(db, request_id)
+        BlobStore(client.app.state.settings.blob_dir).path(refs["waveform.png"].blob_key).unlink()
+        db.query(AnalysisBlob).filter_by(request_id=request_id, name="timeline.png").delete()
+        db.commit()
+
+    detail = client.get(f"/api/history/{request_id}")
+    assert detail.status_code == 200
+    artifacts = detail.json()["artifacts"]
+    assert artifacts["spectrogram_png_base64"]
+    for name in ("waveform", "timeline"):
+        # Inline analyses keep no arrays to render from, so there is nothing to link to either.
+        assert artifacts[f"{name}_png_base64"] is None
+        assert artifacts[f"{name}_png_url"] is None
+        assert client.get(f"/api/history/{request_id}/artifacts/{name}.png").status_code == 404
+
+
+def test_concurrent_first_fetches_share_the_rendered_artifact(client, monkeypatch):
+    request_id = predict(client, "lazy")["request_id"]
+    add_blob_ref = main.add_blob_ref
+
+    def lose_the_race(db, blob):
+        # The other fetch commits its reference between this one's lookup and insert.
+        with client.app.state.session_maker() as other:
+            add_blob_ref(other, AnalysisBlob(**{column: getattr(blob, column) for column in (
+                "request_id", "name", "blob_key", "content_type", "size_bytes"
+            )}))
+        raise IntegrityError("INSERT INTO analysis_blobs", {}, Exception("UNIQUE constraint failed"))
+
+    monkeypatch.setattr(main, "add_blob_ref", lose_the_race)
+    url = f"/api/history/{request_id}/artifacts/timeline.png"
+    first = client.get(url)
+    assert first.status_code == 200
+    monkeypatch.undo()
+    assert client.get(url).content == first.content
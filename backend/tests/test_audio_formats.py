@@ -0,0 +1,88 @@
+import io
+
+import numpy as np
+import pytest
+import soundfile
+
+from app.utils.audio import UploadTooLargeError, decode_audio_stream, load_wav, sniff_format
+
+from conftest import make_wav_bytes
+
+
+def encode(samples: np.ndarray, sr: int, container: str, subtype: str | None = None) -> bytes:
+    buf = io.BytesIO()
+    soundfile.write(buf, samples, sr, format=container, subtype=subtype)
+    return buf.getvalue()
+
+
+def reference_samples(duration_s: float = 3.0, sr: int = 2000) -> np.ndarray:
+    t = np.arange(int(sr * duration_s)) / sr
+    return (0.3 * np.sin(2 * np.pi * 100 * t)).astype(np.float32)
+
+
+@pytest.mark.parametrize(
+    "container,subtype,atol",
+    [
+        ("WAV", "PCM_24", 1e-6),
+        ("WAV", "PCM_32", 1e-6),
+        ("WAV", "FLOAT", 0),
+        ("FLAC", "PCM_16", 5e-5),
+        ("AIFF", "PCM_16", 5e-5),
+        ("AIFF", "PCM_24", 1e-6),
+    ],
+)
+def test_decode_lossless_formats(container, subtype, atol):
+    expected = reference_samples()
+    audio = decode_audio_stream(io.BytesIO(encode(expected, 2000, container, subtype)), chunk_bytes=1001)
+    assert audio.sample_rate == 2000
+    assert audio.duration_s == 3.0
+    np.testing.assert_allclose(audio.samples, expected, atol=atol)
+
+
+def test_decode_ogg_vorbis():
+    expected = reference_samples(sr=8000)
+    audio = load_wav(encode(expected, 8000, "OGG", "VORBIS"))
+    assert audio.sample_rate == 8000
+    assert abs(len(audio.samples) - len(expected)) <= 8000 * 0.01
+    assert np.corrcoef(audio.samples[:4000], expected[:4000])[0, 1] > 0.99
+
+
+def test_multichannel_input_is_downmixed_while_decoding():
+    left = reference_samples()
+    stereo = np.stack([left, 0.5 * left], axis=1)
+    seen = []
+    audio = decode_audio_stream(
+        io.BytesIO(encode(stereo, 2000, "WAV", "PCM_16")),
+        chunk_bytes=4096,
+        on_samples=lambda samples, sr: seen.append(len(samples)),
+    )
+    np.testing.assert_allclose(audio.samples, 0.75 * left, atol=1e-4)
+    assert len(seen) > 1 and sum(seen) == len(left)
+
+
+def test_format_is_sniffed_from_content_not_filename():
+    assert sniff_format(make_wav_bytes(2.0)[:12]) == "wav"
+    assert sniff_format(encode(reference_samples(), 2000, "FLAC")[:12]) == "flac"
+    assert sniff_format(encode(reference_samples(), 2000, "OGG", "VORBIS")[:12]) == "ogg"
+    assert sniff_format(encode(reference_samples(), 2000, "AIFF")[:12]) == "aiff"
+    assert sniff_format(b"ID3\x04\x00\x00\x00\x00\x00\x00\x00\x00") is None
+    with pytest.raises(ValueError, match="Unsupported audio format"):
+        load_wav(b"ID3\x04" + bytes(4000))
+
+
+def test_compressed_uploads_are_limited_by_decoded_size():
+    data = encode(np.zeros(2000 * 60, dtype=np.float32), 2000, "FLAC")
+    assert len(data) < 100_000
+    with pytest.raises(UploadTooLargeError):
+        decode_audio_stream(io.BytesIO(data), max_bytes=100_000)
+
+
+def test_predict_accepts_flac_uploads(client):
+    data = encode(reference_samples(), 2000, "FLAC")
+    files = {"file": ("recording.flac", data, "audio/flac")}
+    response = client.post("/api/predict", files=files, data={"auscultation_site": "Aortic", "patient_id": "p-8"})
+    assert response.status_code == 200
+    assert response.json()["input"]["duration_s"] == 3.0
+    files = {"file": ("recording.wav", b"not audio at all", "audio/wav")}
+    response = client.post("/api/predict", files=files, data={"auscultation_site": "Aortic", "patient_id": "p-8"})
+    assert response.status_code == 400
@@ -4,19 +4,16 @@ import wave
 import numpy as np
 import pytest
 
-from app.utils.audio import load_wav
+from app.utils.audio import (
+    AudioData,
+    UploadTooLargeError,
+    decimation_filter,
+    decode_audio_stream,
+    load_wav,
+    resample_audio,
+)
 
-
-def make_wav_bytes(duration_s: float, sr: int = 2000) -> bytes:
-    t = np.linspace(0, duration_s, int(sr * duration_s), endpoint=False)
-    samples = (0.3 * np.sin(2 * np.pi * 100 * t) * 32767).astype(np.int16)
-    buf = io.BytesIO()
-    with wave.open(buf, "wb") as wf:
-        wf.setnchannels(1)
-        wf.setsampwidth(2)
-        wf.setframerate(sr)
-        wf.writeframes(samples.tobytes())
-    return buf.getvalue()
+from conftest import make_wav_bytes
 
 
 def test_load_wav_valid():
@@ -35,3 +32,68 @@ def test_load_wav_too_short():
 def test_load_wav_invalid():
     with pytest.raises(ValueError):
         load_wav(b"not a wav file")
+
+
+def test_streaming_decode_matches_reference_conversion():
+    data = make_wav_bytes(3.0)
+    with wave.open(io.BytesIO(data), "rb") as wf:
+        expected = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16).astype(np.float32) / 32768.0
+    audio = decode_audio_stream(io.BytesIO(data), chunk_bytes=1001)
+    np.testing.assert_array_equal(audio.samples, expected)
+    assert audio.duration_s == 3.0
+
+
+def test_streaming_decode_rejects_oversized_body_from_header():
+    data = make_wav_bytes(3.0)
+    stream = io.BytesIO(data)
+    with pytest.raises(UploadTooLargeError):
+        decode_audio_stream(stream, max_bytes=1000)
+    assert stream.tell() == 44
+
+
+def test_predict_enforces_upload_limit(client):
+    client.app.state.settings.max_upload_mb = 0
+    files = {"file": ("test.wav", make_wav_bytes(2.0), "audio/wav")}
+    data = {"auscultation_site": "Aortic", "patient_id": "patient-6"}
+    assert client.post("/api/predict", files=files, data=data).status_code == 413
+
+
+def _tone_level_db(samples: np.ndarray, sr: int, freq: float) -> float:
+    spectrum = np.abs(np.fft.rfft(samples * np.hanning(len(samples))))
+    return 20 * np.log10(spectrum[int(round(freq * len(samples) / sr))] + 1e-12)
+
+
+@pytest.mark.parametrize("sr", [8000, 44100, 48000])
+def test_resample_keeps_the_feature_band_and_rejects_aliases(sr):
+    t = np.arange(sr * 4) / sr
+    passband = (0.3 * np.sin(2 * np.pi * 100 * t)).astype(np.float32)
+    # 3.1 kHz folds onto 900 Hz at 4 kHz, inside the mel band.
+    alias = (0.3 * np.sin(2 * np.pi * 3100 * t)).astype(np.float32)
+    kept = resample_audio(AudioData(passband, sr, 4.0), 4000)
+    folded = resample_audio(AudioData(alias, sr, 4.0), 4000)
+    assert kept.sample_rate == folded.sample_rate == 4000
+    assert kept.original_sample_rate == sr
+    assert kept.samples.dtype == np.float32
+    assert abs(kept.duration_s - 4.0) < 1e-3
+    level = _tone_level_db(kept.samples, 4000, 100)
+    assert abs(level - _tone_level_db(passband, sr, 100) + 20 * np.log10(sr / 4000)) < 0.1
+    assert _tone_level_db(folded.samples, 4000, 900) < level - 50
+
+
+def test_resample_reuses_filters_and_leaves_low_rates_alone():
+    audio = AudioData(np.zeros(2000 * 2, dtype=np.float32), 2000, 2.0)
+    assert resample_audio(audio, 4000) is audio
+    assert resample_audio(audio, 0) is audio
+    assert decimation_filter(40, 441) is decimation_filter(40, 441)
+    assert not decimation_filter(40, 441).flags.writeable
+
+
+def test_predict_analyses_high_rate_uploads_at_the_canonical_rate(client):
+    files = {"file": ("test.wav", make_wav_bytes(3.0, sr=44100), "audio/wav")}
+    data = {"auscultation_site": "Aortic", "patient_id": "patient-7", "artifacts": "none"}
+    response = client.post("/api/predict", files=files, data=data)
+    assert response.status_code == 200
+    info = response.json()["input"]
+    assert info["sample_rate"] == 4000
+    assert info["original_sample_rate"] == 44100
+    assert abs(info["duration_s"] - 3.0) < 1e-3
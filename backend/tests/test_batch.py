@@ -0,0 +1,151 @@
+import io
+import json
+import os
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.execution.pool import AnalysisExecutor, QueueFullError
+from app.main import create_app
+from app.utils.batch import expand_uploads, parse_metadata
+
+from conftest import make_wav_bytes
+
+
+def read_lines(response) -> list[dict]:
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_batch_streams_results_and_stores_history(client):
+    files = [
+        ("files", ("a.wav", make_wav_bytes(freq=100.0), "audio/wav")),
+        ("files", ("b.wav", make_wav_bytes(freq=140.0), "audio/wav")),
+        ("files", ("c.wav", make_wav_bytes(freq=180.0), "audio/wav")),
+        ("files", ("notes.txt", b"hello", "text/plain")),
+    ]
+    metadata = {"b.wav": {"patient_id": "patient-b", "auscultation_site": "Mitral"}}
+    data = {
+        "auscultation_site": "Aortic",
+        "patient_id": "patient-a",
+        "metadata": json.dumps(metadata),
+        "group_size": "2",
+        "artifacts": "none",
+    }
+    response = client.post("/api/predict/batch", files=files, data=data)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = read_lines(response)
+    summary = lines[-1]["summary"]
+    assert summary == {"total": 4, "ok": 3, "failed": 1, "stored": 3}
+    results = {line["filename"]: line for line in lines[:-1]}
+    assert results["notes.txt"]["status"] == "error"
+    assert results["b.wav"]["result"]["input"]["patient_id"] == "patient-b"
+    assert results["b.wav"]["result"]["input"]["auscultation_site"] == "Mitral"
+    assert results["a.wav"]["result"]["input"]["patient_id"] == "patient-a"
+
+    history = client.get("/api/history").json()
+    assert {entry["patient_id"] for entry in history} == {"patient-a", "patient-b"}
+    assert len(history) == 3
+
+    single = client.post(
+        "/api/predict",
+        files={"file": ("a.wav", make_wav_bytes(freq=100.0), "audio/wav")},
+        data={"auscultation_site": "Aortic", "patient_id": "patient-a", "artifacts": "none"},
+    )
+    assert single.json()["murmur"] == results["a.wav"]["result"]["murmur"]
+
+
+def test_batch_recordings_go_through_the_result_cache(tmp_path, monkeypatch):
+    db_url = f"sqlite:///{os.path.join(tmp_path, 'batch.db')}"
+    settings = Settings(blob_dir=os.path.join(tmp_path, "blobs"), executor="inline")
+    files = [
+        ("files", ("a.wav", make_wav_bytes(freq=100.0), "audio/wav")),
+        ("files", ("copy-of-a.wav", make_wav_bytes(freq=100.0), "audio/wav")),
+        ("files", ("b.wav", make_wav_bytes(freq=140.0), "audio/wav")),
+    ]
+    data = {"auscultation_site": "Aortic", "patient_id": "patient-c", "artifacts": "none", "group_size": "4"}
+    analysed = []
+    run_many = AnalysisExecutor.run_many
+
+    async def counting(self, recordings, **options):
+        analysed.append(len(recordings))
+        return await run_many(self, recordings, **options)
+
+    monkeypatch.setattr(AnalysisExecutor, "run_many", counting)
+    with TestClient(create_app(db_url, settings)) as client:
+        single = client.post("/api/predict", files={"file": files[2][1]}, data=data)
+        assert single.status_code == 200
+        lines = read_lines(client.post("/api/predict/batch", files=files, data=data))
+        assert {line["filename"]: line["cache"] for line in lines[:-1]} == {
+            "a.wav": "computed",
+            "copy-of-a.wav": "shared",
+            "b.wav": "memory",
+        }
+    assert analysed == [1]
+    with TestClient(create_app(db_url, settings)) as client:
+        lines = read_lines(client.post("/api/predict/batch", files=files[:1], data=data))
+        assert lines[0]["cache"] == "history"
+        assert lines[-1]["summary"]["stored"] == 1
+    assert analysed == [1]
+
+
+def test_batch_accepts_zip_with_metadata(client):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("campaign/one.wav", make_wav_bytes(freq=110.0))
+        zf.writestr("campaign/two.wav", make_wav_bytes(freq=150.0))
+        zf.writestr("metadata.json", json.dumps({"one.wav": {"patient_id": "p1"}, "two.wav": {"patient_id": "p2"}}))
+    response = client.post(
+        "/api/predict/batch",
+        files=[("files", ("campaign.zip", archive.getvalue(), "application/zip"))],
+        data={"auscultation_site": "Pulmonic", "artifacts": "lazy"},
+    )
+    lines = read_lines(response)
+    assert lines[-1]["summary"]["stored"] == 2
+    patients = {line["filename"]: line["result"]["input"]["patient_id"] for line in lines[:-1]}
+    assert patients == {"campaign/one.wav": "p1", "campaign/two.wav": "p2"}
+    link = lines[0]["result"]["artifacts"]["timeline_png_url"]
+    assert client.get(link).status_code == 200
+
+
+def test_batch_rejects_invalid_metadata(client):
+    response = client.post(
+        "/api/predict/batch",
+        files=[("files", ("a.wav", make_wav_bytes(), "audio/wav"))],
+        data={"metadata": "{not json"},
+    )
+    assert response.status_code == 400
+
+
+def test_batch_reports_failed_lines_when_queue_stays_full(client, monkeypatch):
+    async def saturated(self, recordings, **options):
+        raise QueueFullError("Analysis queue is full.")
+
+    monkeypatch.setattr(AnalysisExecutor, "run_many", saturated)
+    client.app.state.settings.batch_queue_wait_s = 0.2
+    files = [
+        ("files", (f"{name}.wav", make_wav_bytes(freq=freq), "audio/wav")) for name, freq in (("a", 100), ("b", 150))
+    ]
+    data = {"auscultation_site": "Aortic", "patient_id": "patient-q", "artifacts": "none"}
+    response = client.post("/api/predict/batch", files=files, data=data)
+    lines = read_lines(response)
+    assert lines[-1]["summary"] == {"total": 2, "ok": 0, "failed": 2, "stored": 0}
+    assert all("queue is full" in line["error"] for line in lines[:-1])
+
+
+def test_expand_uploads_metadata_list_order():
+    entries = expand_uploads(
+        [("a.wav", io.BytesIO(b"a")), ("b.wav", io.BytesIO(b"b"))],
+        parse_metadata('[{"patient_id": "p1"}, {"patient_id": "p2", "ignored": 1}]'),
+    )
+    assert [entry.metadata for entry in entries] == [{"patient_id": "p1"}, {"patient_id": "p2"}]
+    with entries[1].open() as stream:
+        assert stream.read() == b"b"
+
+
+def test_parse_metadata_rejects_scalars():
+    with pytest.raises(ValueError):
+        parse_metadata("3")
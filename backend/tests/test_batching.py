@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.ml.batching import BatchedModel, InferenceBatcher
+from app.ml.engine import load_engine
+from app.uncertainty.estimate import mc_dropout_uncertainty
+
+
+def test_concurrent_requests_share_forward_passes():
+    model = load_engine()
+    batcher = InferenceBatcher(model, max_batch_size=64, max_wait_ms=20.0)
+    inputs = [np.random.default_rng(i).normal(size=(3, 128)).astype(np.float32) for i in range(16)]
+    try:
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            outputs = list(pool.map(batcher.infer, inputs))
+    finally:
+        batcher.stop()
+
+    for features, logits in zip(inputs, outputs):
+        expected = model(features)
+        np.testing.assert_allclose(logits, expected, rtol=1e-5, atol=1e-6)
+
+    stats = batcher.stats()
+    assert stats["wait_ms"]["count"] == 16
+    assert stats["batch_size"]["count"] < 16
+    assert stats["batch_size"]["sum"] == 48
+
+
+def test_batched_model_applies_dropout_only_when_training():
+    model = load_engine()
+    batcher = InferenceBatcher(model, max_batch_size=8, max_wait_ms=0.0)
+    handle = BatchedModel(batcher)
+    features = np.random.default_rng(0).standard_normal(128).astype(np.float32)
+    try:
+        handle.eval()
+        assert np.array_equal(handle(features), handle(features))
+        _, uncertainty = mc_dropout_uncertainty(handle, features, passes=50)
+    finally:
+        batcher.stop()
+    assert uncertainty > 0.0
+    assert not handle.training
@@ -0,0 +1,98 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from app.db.blobs import BlobCollector, BlobStore
+from app.db.crud import get_blob_refs
+from app.db.models import Analysis
+
+from conftest import make_wav_bytes
+
+
+def test_blob_store_is_content_addressed(tmp_path):
+    store = BlobStore(tmp_path)
+    key = store.put(b"payload")
+    assert store.put(b"payload") == key
+    assert store.get(key) == b"payload"
+    array = np.arange(12, dtype=np.float32).reshape(3, 4)
+    np.testing.assert_array_equal(store.get_array(store.put_array(array)), array)
+    store.delete(key)
+    assert store.get(key) is None
+    with pytest.raises(ValueError):
+        store.path("../../etc/passwd")
+
+
+def test_inline_artifacts_live_in_blob_store(client):
+    files = {"file": ("test.wav", make_wav_bytes(), "audio/wav")}
+    data = {"auscultation_site": "Tricuspid", "patient_id": "patient-5", "artifacts": "inline"}
+    payload = client.post("/api/predict", files=files, data=data).json()
+    request_id = payload["request_id"]
+
+    with client.app.state.session_maker() as db:
+        row = db.get(Analysis, request_id)
+        assert row.response_json["artifacts"] is None
+        keys = [ref.blob_key for ref in get_blob_refs(db, request_id).values()]
+    assert len(keys) == 4
+
+    detail = client.get(f"/api/history/{request_id}").json()
+    assert detail["artifacts"] == payload["artifacts"]
+    image = client.get(f"/api/history/{request_id}/artifacts/waveform.png")
+    assert image.status_code == 200
+    assert image.content.startswith(b"\x89PNG")
+
+    store = BlobStore(client.app.state.settings.blob_dir)
+    assert all(store.path(key).exists() for key in keys)
+    assert client.delete(f"/api/history/{request_id}").status_code == 200
+    # Collected only after the grace period, in case another request is about to reference the same content.
+    assert all(store.path(key).exists() for key in keys)
+    collector = client.app.state.blob_collector
+    expired = time.time() - collector.grace_s - 1
+    for key in keys:
+        os.utime(store.path(key), (expired, expired))
+    collector.sweep(now=time.monotonic() + collector.grace_s)
+    assert not any(store.path(key).exists() for key in keys)
+    assert len(collector) == 0
+
+
+def test_collect_keeps_blobs_stored_again_or_referenced(tmp_path):
+    store = BlobStore(tmp_path)
+    stale, renewed, referenced = store.put(b"stale"), store.put(b"renewed"), store.put(b"referenced")
+    expired = time.time() - 120
+    for key in (stale, renewed, referenced):
+        os.utime(store.path(key), (expired, expired))
+    references = {referenced}
+
+    def unreferenced(keys):
+        # A concurrent request stores identical bytes and commits a reference while the collection runs.
+        store.put(b"renewed")
+        references.add(referenced)
+        return [key for key in keys if key not in references]
+
+    collector = BlobCollector(store, unreferenced, grace_s=60.0)
+    references.discard(referenced)
+    collector.schedule([stale, renewed, referenced])
+    collector.sweep(now=time.monotonic() + 60.0)
+    assert store.get(stale) is None
+    assert store.get(renewed) == b"renewed"
+    assert store.get(referenced) == b"referenced"
+    assert len(collector) == 1
+
+
+def test_scan_finds_blobs_left_unreferenced_before_a_restart(tmp_path):
+    store = BlobStore(tmp_path)
+    orphan, interrupted, referenced = store.put(b"orphan"), store.put(b"interrupted"), store.put(b"referenced")
+    expired = time.time() - 120
+    for key in (orphan, interrupted, referenced):
+        os.utime(store.path(key), (expired, expired))
+    os.rename(store.path(interrupted), store.path(interrupted).with_name(f"{interrupted}.collect"))
+    (tmp_path / "upload.tmp").write_bytes(b"partial")
+
+    collector = BlobCollector(store, lambda keys: [key for key in keys if key != referenced], grace_s=60.0)
+    assert collector.scan() == 2
+    collector.sweep()
+    assert store.get(orphan) is None
+    assert store.get(interrupted) is None
+    assert store.get(referenced) == b"referenced"
+    assert len(collector) == 0
@@ -0,0 +1,120 @@
+import asyncio
+import os
+import shutil
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.execution.cache import CachedAnalysis, ResultCache, analysis_cache_key
+from app.main import create_app
+from app.ml.engine import DEMO_WEIGHTS, export_weights
+from app.ml.model import build_demo_model
+from app.ml.pipeline import configure_engine
+
+from conftest import make_wav_bytes
+
+
+def post(client, patient_id: str):
+    files = {"file": ("test.wav", make_wav_bytes(), "audio/wav")}
+    data = {"auscultation_site": "Mitral", "patient_id": patient_id}
+    response = client.post("/api/predict", files=files, data=data)
+    assert response.status_code == 200
+    return response
+
+
+def test_repeat_upload_is_served_from_cache(client):
+    first = post(client, "patient-7")
+    second = post(client, "patient-8")
+    assert first.headers["X-Analysis-Cache"] == "computed"
+    assert second.headers["X-Analysis-Cache"] == "memory"
+    assert first.json()["request_id"] != second.json()["request_id"]
+    assert second.json()["input"]["patient_id"] == "patient-8"
+    assert first.json()["murmur"] == second.json()["murmur"]
+    assert first.json()["artifacts"] == second.json()["artifacts"]
+
+    assert client.delete(f"/api/history/{first.json()['request_id']}").status_code == 200
+    detail = client.get(f"/api/history/{second.json()['request_id']}").json()
+    assert detail["artifacts"] == second.json()["artifacts"]
+
+
+def test_history_is_the_second_cache_tier(tmp_path):
+    db_url = f"sqlite:///{os.path.join(tmp_path, 'cache.db')}"
+    settings = Settings(blob_dir=os.path.join(tmp_path, "blobs"), executor="inline")
+    with TestClient(create_app(db_url, settings)) as client:
+        assert post(client, "patient-9").headers["X-Analysis-Cache"] == "computed"
+    with TestClient(create_app(db_url, settings)) as client:
+        assert post(client, "patient-9").headers["X-Analysis-Cache"] == "history"
+
+
+def test_cache_key_covers_audio_and_options():
+    samples = np.zeros(2000, dtype=np.float32)
+    key = analysis_cache_key(samples, 2000, {"artifacts": "inline"})
+    assert key == analysis_cache_key(samples.copy(), 2000, {"artifacts": "inline"})
+    assert key != analysis_cache_key(samples, 4000, {"artifacts": "inline"})
+    assert key != analysis_cache_key(samples, 2000, {"artifacts": "none"})
+    samples[10] = 0.5
+    assert key != analysis_cache_key(samples, 2000, {"artifacts": "inline"})
+
+
+def test_cache_key_follows_weights_content(tmp_path):
+    samples = np.zeros(2000, dtype=np.float32)
+    demo_key = analysis_cache_key(samples, 2000, {})
+    copied = os.path.join(tmp_path, "copy.npz")
+    retrained = os.path.join(tmp_path, "retrained.npz")
+    shutil.copyfile(DEMO_WEIGHTS, copied)
+    export_weights(build_demo_model(seed=7), retrained)
+    try:
+        configure_engine("numpy", copied)
+        assert analysis_cache_key(samples, 2000, {}) == demo_key
+        configure_engine("numpy", retrained)
+        assert analysis_cache_key(samples, 2000, {}) != demo_key
+    finally:
+        configure_engine()
+
+
+def test_concurrent_identical_requests_compute_once():
+    cache = ResultCache(max_entries=2)
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return CachedAnalysis({"murmur": {}}, {}), "computed"
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert calls == 1
+    assert sorted(source for _, source in results) == ["computed"] + ["shared"] * 4
+    assert len({id(value) for value, _ in results}) == 1
+
+
+def test_group_lookup_computes_only_what_no_one_else_has():
+    cache = ResultCache()
+    cache.put("memory", CachedAnalysis({"murmur": {}}, {}))
+    computed = []
+
+    async def compute_one():
+        await asyncio.sleep(0.05)
+        return CachedAnalysis({"murmur": {}}, {}), "computed"
+
+    async def compute_many(keys):
+        computed.append(keys)
+        return [(CachedAnalysis({"murmur": {}}, {}), "computed"), ValueError("undecodable")]
+
+    async def scenario():
+        elsewhere = asyncio.ensure_future(cache.get_or_compute("in-flight", compute_one))
+        await asyncio.sleep(0)
+        group = await cache.get_or_compute_many(["new", "in-flight", "memory", "new", "broken"], compute_many)
+        await elsewhere
+        return group
+
+    results = asyncio.run(scenario())
+    assert computed == [["new", "broken"]]
+    assert [source for _, source in results[:4]] == ["computed", "shared", "memory", "shared"]
+    assert isinstance(results[4], ValueError)
+    assert cache.get("new") is results[0][0]
+    assert cache.get("broken") is None
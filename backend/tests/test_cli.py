@@ -0,0 +1,119 @@
+import csv
+import json
+import os
+import shutil
+
+from app.cli import main
+from app.ml.engine import DEMO_WEIGHTS, export_weights
+from app.ml.model import build_demo_model
+
+from conftest import make_wav_bytes
+
+
+def write(path, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as handle:
+        handle.write(data)
+
+
+def test_score_directory_to_csv_and_resume(tmp_path):
+    root = tmp_path / "archive"
+    write(str(root / "a.wav"), make_wav_bytes(freq=100.0))
+    write(str(root / "nested" / "b.wav"), make_wav_bytes(freq=150.0))
+    write(str(root / "nested" / "broken.wav"), b"not a wav")
+    write(str(root / "notes.txt"), b"ignored")
+    output = tmp_path / "scores.csv"
+
+    assert main(["score", str(root), "-o", str(output), "--workers", "2", "--mc-dropout-passes", "5"]) == 0
+    with open(output, newline="") as handle:
+        rows = {row["path"]: row for row in csv.DictReader(handle)}
+    assert set(rows) == {"a.wav", os.path.join("nested", "b.wav"), os.path.join("nested", "broken.wav")}
+    assert rows["a.wav"]["status"] == "ok"
+    assert rows["a.wav"]["murmur_label"] in {"murmur", "normal"}
+    assert float(rows["a.wav"]["mel_ms"]) >= 0.0
+    assert float(rows["a.wav"]["total_ms"]) > 0.0
+    assert rows[os.path.join("nested", "broken.wav")]["status"] == "error"
+
+    checkpoint = f"{output}.checkpoint.ndjson"
+    with open(checkpoint) as handle:
+        assert len(handle.readlines()) == 3
+
+    write(str(root / "c.wav"), make_wav_bytes(freq=180.0))
+    assert main(["score", str(root), "-o", str(output), "--workers", "1", "--mc-dropout-passes", "5"]) == 0
+    with open(checkpoint) as handle:
+        scored = [json.loads(line)["path"] for line in handle]
+    assert scored[3:] == ["c.wav"]
+    with open(output, newline="") as handle:
+        assert len(list(csv.DictReader(handle))) == 4
+
+
+def test_score_ndjson_retry_failed(tmp_path):
+    root = tmp_path / "archive"
+    path = str(root / "broken.wav")
+    valid = make_wav_bytes()
+    write(path, b"JUNK" + valid[4:])
+    stat = os.stat(path)
+    output = tmp_path / "scores.ndjson"
+    assert main(["score", str(root), "-o", str(output), "--workers", "1"]) == 0
+
+    # Repaired in place with the same size and mtime, so only --retry-failed rescores it.
+    write(path, valid)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert main(["score", str(root), "-o", str(output), "--workers", "1"]) == 0
+    with open(output) as handle:
+        assert [json.loads(line)["status"] for line in handle] == ["error"]
+
+    assert main(["score", str(root), "-o", str(output), "--workers", "1", "--retry-failed"]) == 0
+    with open(output) as handle:
+        rows = [json.loads(line) for line in handle]
+    assert [row["status"] for row in rows] == ["ok"]
+
+
+def test_rows_scored_with_other_options_or_weights_are_rescored(tmp_path):
+    root = tmp_path / "archive"
+    write(str(root / "a.wav"), make_wav_bytes())
+    output = tmp_path / "scores.ndjson"
+    checkpoint = f"{output}.checkpoint.ndjson"
+    command = ["score", str(root), "-o", str(output), "--workers", "1", "--mc-dropout-passes", "5"]
+
+    def scored() -> list[dict]:
+        with open(checkpoint) as handle:
+            return [json.loads(line)["scoring"] for line in handle]
+
+    assert main(command) == 0
+    assert main(command) == 0
+    weights = tmp_path / "weights.npz"
+    shutil.copyfile(DEMO_WEIGHTS, weights)
+    # Identical weights under another name keep the rows.
+    assert main(command + ["--weights", str(weights)]) == 0
+    assert len(scored()) == 1
+    assert "scoring" not in json.loads((tmp_path / "scores.ndjson").read_text())
+
+    assert main(command[:-1] + ["6"]) == 0
+    assert main(command + ["--sample-rate", "2000"]) == 0
+    assert main(command + ["--mc-dropout-mode", "sequential"]) == 0
+    export_weights(build_demo_model(seed=7), str(weights))
+    assert main(command + ["--mc-dropout-mode", "sequential", "--weights", str(weights)]) == 0
+
+    runs = scored()
+    assert [run["mc_dropout_passes"] for run in runs] == [5, 6, 5, 5, 5]
+    assert [run["sample_rate"] for run in runs] == [4000, 4000, 2000, 4000, 4000]
+    assert runs[3]["mc_dropout_mode"] == "sequential"
+    assert runs[0]["model_version"] != runs[4]["model_version"]
+
+
+def test_checkpoint_survives_partial_trailing_line(tmp_path):
+    root = tmp_path / "archive"
+    write(str(root / "a.wav"), make_wav_bytes())
+    write(str(root / "b.wav"), make_wav_bytes(freq=150.0))
+    output = tmp_path / "scores.ndjson"
+    checkpoint = tmp_path / "progress.ndjson"
+    assert main(["score", str(root), "-o", str(output), "--workers", "1", "--checkpoint", str(checkpoint)]) == 0
+
+    with open(checkpoint) as handle:
+        first = handle.readline()
+    with open(checkpoint, "w") as handle:
+        handle.write(first + first[: len(first) // 2])
+    assert main(["score", str(root), "-o", str(output), "--workers", "1", "--checkpoint", str(checkpoint)]) == 0
+    with open(output) as handle:
+        assert [json.loads(line)["path"] for line in handle] == ["a.wav", "b.wav"]
@@ -1,19 +1,20 @@
-import io
-import wave
+import json
+import os
+import tempfile
+import threading
+import warnings
+from datetime import datetime, timedelta, timezone
 
-import numpy as np
+import pytest
+from sqlalchemy import event, text
 
+from app.config import Settings
+from app.db.crud import create_analysis, list_history
+from app.db.init_db import init_db
+from app.db.models import Analysis, AnalysisBlob
+from app.db.session import get_engine, get_session_maker
 
-def make_wav_bytes(duration_s: float = 2.0, sr: int = 2000) -> bytes:
-    t = np.linspace(0, duration_s, int(sr * duration_s), endpoint=False)
-    samples = (0.2 * np.sin(2 * np.pi * 120 * t) * 32767).astype(np.int16)
-    buf = io.BytesIO()
-    with wave.open(buf, "wb") as wf:
-        wf.setnchannels(1)
-        wf.setsampwidth(2)
-        wf.setframerate(sr)
-        wf.writeframes(samples.tobytes())
-    return buf.getvalue()
+from conftest import make_wav_bytes
 
 
 def test_history_flow(client):
@@ -33,3 +34,166 @@ def test_history_flow(client):
     detail = client.get(f"/api/history/{request_id}")
     assert detail.status_code == 200
     assert detail.json()["request_id"] == request_id
+
+
+def add_history_rows(client, count: int, patient_id: str) -> None:
+    session = client.app.state.session_maker()
+    created_at = datetime(2024, 1, 1)
+    try:
+        session.add_all(
+            Analysis(
+                request_id=f"{patient_id}-{index:04d}",
+                # Pairs of rows share a timestamp so the request_id tie-break is exercised.
+                created_at=created_at + timedelta(minutes=index // 2),
+                patient_id=patient_id,
+                auscultation_site="Aortic",
+                summary=json.dumps({"murmur_label": "normal", "concern_level": "low", "quality_score": 90}),
+                response_json={"padding": "x" * 1000},
+            )
+            for index in range(count)
+        )
+        session.commit()
+    finally:
+        session.close()
+
+
+def test_history_pages_with_a_keyset_cursor(client):
+    add_history_rows(client, 23, "patient-many")
+    add_history_rows(client, 5, "patient-other")
+    seen, cursor = [], None
+    while True:
+        params = {"patient_id": "patient-many", "limit": 5, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/history", params=params)
+        assert response.status_code == 200
+        seen += [entry["request_id"] for entry in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert seen == [f"patient-many-{index:04d}" for index in reversed(range(23))]
+    assert len(client.get("/api/history", params={"limit": 100}).json()) == 28
+    assert client.get("/api/history", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/api/history", params={"limit": 0}).status_code == 400
+
+
+def test_history_listing_reads_only_list_columns_through_the_composite_index(client):
+    add_history_rows(client, 10, "patient-plan")
+    session = client.app.state.session_maker()
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        rows = list_history(session, "patient-plan", 3, (datetime(2024, 1, 1, 0, 4), "patient-plan-0009"))
+        # The job runner polls on the same engine from another thread; pick this session's query.
+        statement, parameters = next(item for item in reversed(statements) if "FROM analyses" in item[0])
+        explained = session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        plan = " ".join(str(row) for row in explained)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+        session.close()
+    assert [row.request_id for row in rows] == ["patient-plan-0008", "patient-plan-0007", "patient-plan-0006"]
+    assert "response_json" not in statement
+    assert "ix_analyses_patient_created" in plan
+
+
+def test_app_shares_one_engine_with_wal_and_pragmas(client):
+    engine = client.app.state.session_maker.kw["bind"]
+    url = engine.url.render_as_string(hide_password=False)
+    assert get_engine(url) is engine
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 15000
+
+
+def test_engine_warns_when_later_settings_differ(tmp_path):
+    db_url = f"sqlite:///{os.path.join(tmp_path, 'settings.db')}"
+    engine = get_engine(db_url, Settings(db_pool_size=3))
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert get_engine(db_url, Settings(db_pool_size=3)) is engine
+        assert get_engine(db_url) is engine
+    with pytest.warns(RuntimeWarning, match="settings are ignored"):
+        assert get_engine(db_url, Settings(sqlite_journal_mode="DELETE")) is engine
+    engine.dispose()
+
+
+def test_concurrent_writers_and_readers_all_succeed():
+    writers, writes = 8, 20
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_url = f"sqlite:///{os.path.join(tmpdir, 'stress.db')}"
+        SessionLocal = get_session_maker(db_url, Settings(db_pool_size=4, db_max_overflow=8))
+        init_db(db_url)
+        errors = []
+        done = threading.Event()
+
+        def write(worker: int) -> None:
+            for index in range(writes):
+                request_id = f"w{worker}-{index}"
+                try:
+                    with SessionLocal() as db:
+                        create_analysis(
+                            db,
+                            Analysis(
+                                request_id=request_id,
+                                created_at=datetime.now(timezone.utc).replace(tzinfo=None),
+                                patient_id=f"patient-{worker}",
+                                auscultation_site="Aortic",
+                                summary="{}",
+                                response_json={"padding": "x" * 20000},
+                            ),
+                            [
+                                AnalysisBlob(
+                                    request_id=request_id, name="a", blob_key="0" * 64, content_type="x", size_bytes=0
+                                )
+                            ],
+                        )
+                except Exception as exc:
+                    errors.append(exc)
+
+        def read() -> None:
+            while not done.is_set():
+                with SessionLocal() as db:
+                    list_history(db, "patient-0", 20)
+
+        readers = [threading.Thread(target=read) for _ in range(2)]
+        threads = [threading.Thread(target=write, args=(worker,)) for worker in range(writers)]
+        for thread in readers + threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        done.set()
+        for thread in readers:
+            thread.join()
+
+        with SessionLocal() as db:
+            assert db.query(Analysis).count() == writers * writes
+        get_engine(db_url).dispose()
+    assert errors == []
+
+
+def test_forked_children_do_not_reuse_pooled_connections():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_url = f"sqlite:///{os.path.join(tmpdir, 'fork.db')}"
+        init_db(db_url)
+        engine = get_engine(db_url)
+        assert engine.pool.checkedin() > 0
+        read, write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                fresh = engine.pool.checkedin() == 0
+                with engine.connect() as conn:
+                    fresh = fresh and conn.execute(text("SELECT 1")).scalar() == 1
+                os.write(write, b"1" if fresh else b"0")
+            finally:
+                os._exit(0)
+        os.close(write)
+        os.waitpid(pid, 0)
+        assert os.read(read, 1) == b"1"
+        os.close(read)
+        assert engine.pool.checkedin() > 0
+        engine.dispose()
@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import torch
+
+from app.ml.engine import NumpyMurmurNet, TorchEngine, export_weights, load_engine
+from app.ml.model import build_demo_model
+
+
+def test_shipped_weights_match_demo_model():
+    model = build_demo_model()
+    model.eval()
+    engine = load_engine("numpy")
+    features = np.random.default_rng(0).normal(0, 10, size=(32, 128)).astype(np.float32)
+    with torch.no_grad():
+        expected = model(torch.from_numpy(features)).numpy()
+    np.testing.assert_allclose(engine(features), expected, rtol=1e-5, atol=1e-5)
+    np.testing.assert_allclose(TorchEngine(model)(features), expected, rtol=1e-6, atol=1e-6)
+
+
+def test_export_round_trip_and_dropout_semantics():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "weights.npz")
+        export_weights(build_demo_model(seed=7), path)
+        engine = NumpyMurmurNet.load(path)
+    assert engine.dropout_p == np.float32(0.3)
+
+    engine.rng = np.random.default_rng(0)
+    features = np.ones((4000, 128), dtype=np.float32)
+    hidden = np.maximum(features @ engine.w1.T + engine.b1, 0.0)
+    rows = np.arange(4000) % 2 == 0
+    logits = engine.forward(features, rows)
+    np.testing.assert_allclose(logits[~rows], hidden[~rows] @ engine.w2.T + engine.b2, rtol=1e-5, atol=1e-5)
+    # Inverted dropout keeps the expected logits unchanged.
+    np.testing.assert_allclose(logits[rows].mean(axis=0), logits[~rows][0], atol=0.05)
+
+
+def test_predict_path_does_not_import_torch():
+    code = (
+        "import sys, numpy as np, app.main; from app.ml.analysis import analyze_recording; "
+        "analyze_recording(np.zeros(4000, dtype=np.float32), 2000, artifacts='inline'); "
+        "print('torch' in sys.modules)"
+    )
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", code], cwd=backend, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "False"
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import signal
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pytest
+
+from app.execution import pool
+from app.execution.pool import AnalysisExecutor, QueueFullError
+
+from conftest import make_wav_bytes
+
+
+def test_executor_rejects_when_queue_is_full(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(pool, "analyze_recording", lambda samples, sample_rate, **options: release.wait(5))
+    executor = AnalysisExecutor(mode="thread", workers=1, queue_size=1)
+    samples = np.zeros(2000, dtype=np.float32)
+    try:
+        first = executor.submit(samples, 2000)
+        second = executor.submit(samples, 2000)
+        with pytest.raises(QueueFullError):
+            executor.submit(samples, 2000)
+        assert executor.in_flight == 2
+        release.set()
+        first.result(timeout=5)
+        second.result(timeout=5)
+        assert executor.in_flight == 0
+        executor.submit(samples, 2000).result(timeout=5)
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_predict_returns_503_with_retry_after_when_saturated(client, monkeypatch):
+    def saturated(self, samples, sample_rate, **options):
+        raise QueueFullError("Analysis queue is full.")
+
+    monkeypatch.setattr(AnalysisExecutor, "submit", saturated)
+    files = {"file": ("test.wav", make_wav_bytes(), "audio/wav")}
+    data = {"auscultation_site": "Aortic", "patient_id": "patient-3"}
+    response = client.post("/api/predict", files=files, data=data)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"].isdigit()
+
+
+def test_process_warm_up_warms_every_worker():
+    executor = AnalysisExecutor(mode="process", workers=2, warmup=True)
+    try:
+        asyncio.run(executor.warm_up(np.zeros(2000, dtype=np.float32), 2000))
+        assert len(executor._pool._processes) == 2
+        assert not executor._warmed.acquire(False)
+    finally:
+        executor.shutdown()
+
+
+def test_process_pool_is_rebuilt_after_a_worker_dies():
+    executor = AnalysisExecutor(mode="process", workers=1, warmup=True)
+    samples = np.zeros(4000, dtype=np.float32)
+    try:
+        asyncio.run(executor.warm_up(samples, 2000))
+        (pid,) = executor._pool._processes
+        os.kill(pid, signal.SIGKILL)
+        # The call the dead worker breaks may fail; the one after it runs on a fresh pool.
+        try:
+            executor.submit(samples, 2000).result(timeout=60)
+        except BrokenProcessPool:
+            pass
+        result = executor.submit(samples, 2000).result(timeout=60)
+        assert "murmur" in result
+        assert executor.restarts == 1
+        deadline = time.monotonic() + 60
+        while not executor.ready and time.monotonic() < deadline:
+            time.sleep(0.1)
+        assert executor.ready
+    finally:
+        executor.shutdown()
+
+
+def test_attaching_shared_audio_leaves_the_parents_tracking_alone(monkeypatch):
+    unregistered = []
+    monkeypatch.setattr(resource_tracker, "unregister", lambda name, rtype: unregistered.append(name))
+    shm = SharedMemory(create=True, size=64)
+    try:
+        pool._attach_shared(shm.name).close()
+        assert unregistered == []
+    finally:
+        monkeypatch.undo()
+        shm.close()
+        shm.unlink()
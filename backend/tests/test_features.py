@@ -0,0 +1,86 @@
+import warnings
+
+import librosa
+import numpy as np
+import pytest
+
+from app.ml.features import FRAME_BLOCK, compute_spectrogram, frames_log_power, hann_window, mel_filterbank
+from app.ml.pipeline import _window_bounds, extract_window_features, get_engine, infer_murmur_probs
+from app.ml.warmup import synthetic_recording
+
+
+def make_signal(duration_s: float = 6.0, sr: int = 4000) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    t = np.arange(int(sr * duration_s)) / sr
+    signal = 0.3 * np.sin(2 * np.pi * 120 * t) * (1 + np.sin(2 * np.pi * 1.2 * t))
+    return (signal + 0.02 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def reference_mel_db(samples: np.ndarray, sr: int) -> np.ndarray:
+    mel = librosa.feature.melspectrogram(
+        y=samples, sr=sr, n_fft=512, hop_length=256, n_mels=64, fmin=20, fmax=min(1000, sr // 2), power=2.0
+    )
+    return librosa.power_to_db(mel, ref=np.max)
+
+
+def test_spectrogram_matches_librosa():
+    samples = make_signal()
+    spectrogram = compute_spectrogram(samples, 4000)
+    np.testing.assert_allclose(spectrogram.mel_db, reference_mel_db(samples, 4000), atol=1e-4)
+
+
+@pytest.mark.parametrize("sr", [1000, 2000, 4000, 8000, 22050, 44100])
+def test_stft_engine_matches_librosa_across_rates(sr):
+    samples = make_signal(duration_s=3.0, sr=sr)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        expected_basis = librosa.filters.mel(sr=sr, n_fft=512, n_mels=64, fmin=20, fmax=min(1000, sr // 2))
+        expected = reference_mel_db(samples, sr)
+    np.testing.assert_allclose(mel_filterbank(sr, 512, 64, 20, min(1000, sr // 2)), expected_basis, atol=1e-7)
+    np.testing.assert_allclose(hann_window(512), librosa.filters.get_window("hann", 512, fftbins=True), atol=1e-7)
+    np.testing.assert_allclose(compute_spectrogram(samples, sr).mel_db, expected, atol=1e-3)
+
+
+def test_blocked_frames_match_a_single_transform():
+    sr = 4000
+    samples = make_signal(duration_s=(FRAME_BLOCK * 256 + 3000) / sr, sr=sr)
+    spectrogram = compute_spectrogram(samples, sr)
+    padded = np.pad(samples, 256)
+    frames = np.lib.stride_tricks.sliding_window_view(padded, 512)[::256]
+    assert spectrogram.n_frames == len(frames) > FRAME_BLOCK
+    np.testing.assert_allclose(spectrogram.log_power, frames_log_power(frames, sr), atol=1e-4)
+
+
+def test_window_slice_matches_window_mel_away_from_edges():
+    # Exact only for starts on the hop grid; see the off-grid test below.
+    samples = make_signal()
+    spectrogram = compute_spectrogram(samples, 4000)
+    start, length = 256 * 20, 8000
+    window = spectrogram.window_db(start, length)
+    expected = reference_mel_db(samples[start:start + length], 4000)
+    assert window.shape == expected.shape
+    np.testing.assert_allclose(window[:, 2:-2], expected[:, 2:-2], atol=1e-3)
+
+
+@pytest.mark.parametrize("sr", [1000, 2000, 4000])
+@pytest.mark.parametrize("duration_s", [5.0, 10.0, 30.0])
+def test_sliced_windows_stay_close_to_standalone_windows(sr, duration_s):
+    # Most 0.5 s window starts fall off the 256-sample hop grid; see Spectrogram.windows_db for the bound.
+    samples = synthetic_recording(sr, duration_s)
+    starts, _, length = _window_bounds(len(samples), sr)
+    assert any(start % 256 for start in starts)
+    sliced = compute_spectrogram(samples, sr).windows_db(starts, length)
+    standalone = np.stack([reference_mel_db(samples[start:start + length], sr) for start in starts])
+    model = get_engine().handle()
+    probs = infer_murmur_probs(extract_window_features(np.concatenate([sliced, standalone])), model)
+    moved = np.abs(probs[:len(starts)] - probs[len(starts):])
+    assert moved.max() < 0.05
+    assert np.median(moved) < 0.01
+
+
+def test_window_past_end_is_padded():
+    samples = make_signal(duration_s=1.5)
+    spectrogram = compute_spectrogram(samples, 4000)
+    window = spectrogram.window_db(0, 8000)
+    assert window.shape == (64, spectrogram.frames_for(8000))
+    assert window.min() >= -80.0
@@ -0,0 +1,228 @@
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+
+from app.config import Settings
+from app.db.blobs import BlobStore
+from app.db.crud import claim_next_job, complete_job, create_job, get_analysis, get_job, update_job
+from app.db.init_db import init_db
+from app.db.models import Analysis, AnalysisJob
+from app.db.session import get_session_maker
+from app.execution import jobs
+from app.execution.jobs import JobRunner
+from app.main import create_app
+
+from conftest import make_wav_bytes
+
+
+def wait_for_job(client, job_id: str, timeout_s: float = 30.0) -> dict:
+    deadline = time.monotonic() + timeout_s
+    while True:
+        body = client.get(f"/api/jobs/{job_id}").json()
+        if body["status"] in {"done", "failed"} or time.monotonic() > deadline:
+            return body
+        time.sleep(0.05)
+
+
+def queued_job(job_id: str, audio_key: str, **fields) -> AnalysisJob:
+    return AnalysisJob(
+        job_id=job_id,
+        status="queued",
+        attempts=0,
+        filename="test.wav",
+        patient_id="patient-1",
+        auscultation_site="Aortic",
+        options={"mc_dropout_passes": 5, "mc_dropout_mode": "batched", "artifacts": "none"},
+        audio_blob_key=audio_key,
+        **fields,
+    )
+
+
+def test_job_lifecycle(client):
+    response = client.post(
+        "/api/jobs",
+        files={"file": ("test.wav", make_wav_bytes(), "audio/wav")},
+        data={"auscultation_site": "Aortic", "patient_id": "patient-1", "artifacts": "lazy"},
+    )
+    assert response.status_code == 202
+    submitted = response.json()
+    assert submitted["status"] == "queued"
+    assert submitted["partial"]["input"]["duration_s"] == 2.0
+
+    body = wait_for_job(client, submitted["job_id"])
+    assert body["status"] == "done", body
+    assert body["attempts"] == 1
+    assert body["partial"]["quality"]["quality_score_0_100"] == body["result"]["quality"]["quality_score_0_100"]
+    assert body["result"]["request_id"] == body["request_id"]
+    assert client.get(f"/api/history/{body['request_id']}").status_code == 200
+    assert client.get("/api/jobs/missing").status_code == 404
+
+
+def test_job_rejects_invalid_upload(client):
+    response = client.post(
+        "/api/jobs",
+        files={"file": ("test.wav", b"RIFFnope", "audio/wav")},
+        data={"auscultation_site": "Aortic", "patient_id": "patient-1"},
+    )
+    assert response.status_code == 400
+
+
+def test_queued_and_orphaned_jobs_survive_restart():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_url = f"sqlite:///{os.path.join(tmpdir, 'jobs.db')}"
+        blob_dir = os.path.join(tmpdir, "blobs")
+        init_db(db_url)
+        SessionLocal = get_session_maker(db_url)
+        audio_key = BlobStore(blob_dir).put(make_wav_bytes())
+        with SessionLocal() as db:
+            create_job(db, queued_job("queued-before-restart", audio_key))
+            create_job(db, queued_job("orphaned", audio_key))
+            expired = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=1)
+            update_job(db, "orphaned", status="running", attempts=1, lease_expires_at=expired)
+
+        settings = Settings(executor="inline", blob_dir=blob_dir, job_poll_interval_s=0.05, blob_gc_grace_s=0)
+        app = create_app(db_url, settings)
+        with TestClient(app) as client:
+            assert wait_for_job(client, "queued-before-restart")["status"] == "done"
+            orphaned = wait_for_job(client, "orphaned")
+            assert orphaned["status"] == "done"
+            assert orphaned["attempts"] == 2
+        assert not BlobStore(blob_dir).path(audio_key).exists()
+
+
+def test_claim_next_job_is_exclusive_and_honours_leases():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_url = f"sqlite:///{os.path.join(tmpdir, 'jobs.db')}"
+        init_db(db_url)
+        SessionLocal = get_session_maker(db_url)
+        with SessionLocal() as db:
+            create_job(db, queued_job("only", "0" * 64))
+            claimed = claim_next_job(db, lease_s=60.0)
+            assert claimed.job_id == "only"
+            assert claimed.status == "running"
+            assert claimed.attempts == 1
+            assert claim_next_job(db, lease_s=60.0) is None
+
+            expired = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=1)
+            update_job(db, "only", lease_expires_at=expired)
+            reclaimed = claim_next_job(db, lease_s=60.0)
+            assert reclaimed.attempts == 2
+            assert get_job(db, "only").status == "running"
+
+
+def test_complete_job_stores_analysis_and_marks_done_together():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_url = f"sqlite:///{os.path.join(tmpdir, 'jobs.db')}"
+        init_db(db_url)
+        SessionLocal = get_session_maker(db_url)
+        with SessionLocal() as db:
+            create_job(db, queued_job("job", "0" * 64))
+            claim_next_job(db, lease_s=60.0)
+            analysis = Analysis(
+                request_id="req-1",
+                created_at=datetime.now(timezone.utc).replace(tzinfo=None),
+                patient_id="patient-1",
+                auscultation_site="Aortic",
+                summary="{}",
+                response_json={"request_id": "req-1"},
+            )
+            complete_job(db, "job", analysis)
+        with SessionLocal() as db:
+            job = get_job(db, "job")
+            assert (job.status, job.request_id, job.lease_expires_at) == ("done", "req-1", None)
+            assert get_analysis(db, "req-1") is not None
+
+
+def test_failed_job_releases_its_audio():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_url = f"sqlite:///{os.path.join(tmpdir, 'jobs.db')}"
+        blob_dir = os.path.join(tmpdir, "blobs")
+        init_db(db_url)
+        SessionLocal = get_session_maker(db_url)
+        audio_key = BlobStore(blob_dir).put(make_wav_bytes())
+        with SessionLocal() as db:
+            create_job(db, queued_job("exhausted", audio_key))
+            update_job(db, "exhausted", attempts=3)
+
+        settings = Settings(executor="inline", blob_dir=blob_dir, job_poll_interval_s=0.05, blob_gc_grace_s=0)
+        app = create_app(db_url, settings)
+        with TestClient(app) as client:
+            body = wait_for_job(client, "exhausted")
+            assert body["status"] == "failed"
+            assert body["error"] == "Gave up after 3 attempts."
+            deadline = time.monotonic() + 5.0
+            while BlobStore(blob_dir).path(audio_key).exists() and time.monotonic() < deadline:
+                time.sleep(0.05)
+        assert not BlobStore(blob_dir).path(audio_key).exists()
+
+
+def test_stopping_the_runner_requeues_the_running_job():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_url = f"sqlite:///{os.path.join(tmpdir, 'jobs.db')}"
+        init_db(db_url)
+        SessionLocal = get_session_maker(db_url)
+        with SessionLocal() as db:
+            create_job(db, queued_job("interrupted", "0" * 64))
+
+        async def scenario():
+            started = asyncio.Event()
+
+            async def handler(job):
+                started.set()
+                await asyncio.sleep(60)
+
+            runner = JobRunner(SessionLocal, handler, poll_interval_s=0.05)
+            runner.start()
+            await asyncio.wait_for(started.wait(), 5.0)
+            await runner.stop()
+
+        asyncio.run(scenario())
+        with SessionLocal() as db:
+            job = get_job(db, "interrupted")
+            assert (job.status, job.attempts, job.lease_expires_at) == ("queued", 0, None)
+
+
+def test_worker_survives_a_failed_claim(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_url = f"sqlite:///{os.path.join(tmpdir, 'jobs.db')}"
+        init_db(db_url)
+        SessionLocal = get_session_maker(db_url)
+        with SessionLocal() as db:
+            create_job(db, queued_job("after-lock", "0" * 64))
+        calls = []
+
+        def flaky_claim(db, lease_s):
+            calls.append(lease_s)
+            if len(calls) == 1:
+                raise OperationalError("claim", {}, Exception("database is locked"))
+            return claim_next_job(db, lease_s)
+
+        monkeypatch.setattr(jobs, "claim_next_job", flaky_claim)
+
+        async def scenario():
+            def finish(job):
+                with SessionLocal() as db:
+                    update_job(db, job.job_id, status="done", lease_expires_at=None)
+
+            async def handler(job):
+                await asyncio.to_thread(finish, job)
+
+            runner = JobRunner(SessionLocal, handler, poll_interval_s=0.05)
+            runner.start()
+            deadline = time.monotonic() + 5.0
+            while time.monotonic() < deadline:
+                with SessionLocal() as db:
+                    if get_job(db, "after-lock").status == "done":
+                        break
+                await asyncio.sleep(0.05)
+            await runner.stop()
+
+        asyncio.run(scenario())
+        assert len(calls) >= 2
+        with SessionLocal() as db:
+            assert get_job(db, "after-lock").status == "done"
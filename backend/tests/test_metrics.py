@@ -0,0 +1,58 @@
+from app.metrics import Histogram, PredictMetrics, StageTimer
+
+from conftest import make_wav_bytes
+
+
+def test_stage_timer_accumulates_and_formats():
+    timer = StageTimer()
+    with timer.stage("decode"):
+        pass
+    timer.add({"mel": 0.0125, "decode": 0.001})
+    header = timer.server_timing()
+    assert header.startswith("decode;dur=")
+    assert "mel;dur=12.50" in header
+
+
+def test_prometheus_rendering():
+    metrics = PredictMetrics()
+    metrics.observe_stages({"mel": 0.003})
+    metrics.requests.inc("ok")
+    metrics.audio_seconds.inc(amount=2.5)
+    text = metrics.render(queue_in_flight=0)
+    assert 'murmur_predict_stage_seconds_bucket{stage="mel",le="0.0025"} 0' in text
+    assert 'murmur_predict_stage_seconds_bucket{stage="mel",le="0.005"} 1' in text
+    assert 'murmur_predict_stage_seconds_count{stage="mel"} 1' in text
+    assert 'murmur_predict_requests_total{outcome="ok"} 1' in text
+    assert "murmur_audio_seconds_total 2.5" in text
+    assert "murmur_analysis_in_flight 0" in text
+    assert "murmur_inference_batch_size" not in text
+
+
+def test_histogram_lines_are_cumulative():
+    histogram = Histogram((1, 2))
+    for value in (0.5, 1.5, 3):
+        histogram.observe(value)
+    assert histogram.snapshot()["buckets"] == {"1": 1, "2": 2, "+Inf": 3}
+
+
+def test_predict_server_timing_and_metrics_endpoint(client):
+    data = {"auscultation_site": "Aortic", "patient_id": "patient-1"}
+    response = client.post("/api/predict", files={"file": ("test.wav", make_wav_bytes(), "audio/wav")}, data=data)
+    assert response.status_code == 200
+    stages = [entry.split(";")[0] for entry in response.headers["Server-Timing"].split(", ")]
+    for stage in ("decode", "hash", "analysis", "mel", "mc_dropout", "plots", "db"):
+        assert stage in stages
+
+    rejected = client.post("/api/predict", files={"file": ("test.mp3", b"nope", "audio/mpeg")}, data=data)
+    assert rejected.status_code == 400
+
+    metrics = client.get("/api/metrics")
+    assert metrics.status_code == 200
+    assert metrics.headers["content-type"].startswith("text/plain")
+    text = metrics.text
+    assert 'murmur_predict_requests_total{outcome="ok"} 1' in text
+    assert 'murmur_predict_requests_total{outcome="invalid"} 1' in text
+    assert 'murmur_predict_stage_seconds_count{stage="analysis"} 1' in text
+    assert "murmur_predict_in_flight 0" in text
+    assert "murmur_audio_seconds_total 2" in text
+    assert "murmur_predict_response_bytes_count 2" in text
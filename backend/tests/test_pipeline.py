@@ -0,0 +1,19 @@
+import numpy as np
+
+from app.ml.features import compute_spectrogram
+from app.ml.pipeline import extract_features, get_engine, infer_murmur_and_timing, sliding_window_segments
+
+
+def test_batched_windows_match_single_window_inference():
+    sr = 2000
+    samples = np.random.default_rng(1).normal(0, 0.1, sr * 12).astype(np.float32)
+    spectrogram = compute_spectrogram(samples, sr)
+    segments = sliding_window_segments(samples, sr, spectrogram)
+    assert len(segments) == 21
+
+    model = get_engine().handle()
+    for segment in segments:
+        start = int(round(segment["t0"] * sr))
+        features = extract_features(spectrogram.window_db(start, 2 * sr))
+        expected, _, _ = infer_murmur_and_timing(features, model)
+        assert abs(segment["murmur_prob"] - expected) < 1e-5
@@ -1,6 +1,6 @@
 import numpy as np
 
-from app.quality.metrics import compute_quality
+from app.quality.metrics import QualityAccumulator, compute_quality
 
 
 def test_quality_metrics_bounds():
@@ -9,3 +9,39 @@ def test_quality_metrics_bounds():
     assert 0 <= result.quality_score_0_100 <= 100
     assert 0 <= result.clipping_pct <= 100
     assert 0 <= result.silence_pct <= 100
+
+
+def test_quality_accumulator_matches_whole_signal():
+    rng = np.random.default_rng(0)
+    t = np.arange(6 * 2000) / 2000
+    samples = (0.3 * np.sin(2 * np.pi * 2 * t) ** 8 + rng.normal(0, 0.01, t.size)).astype(np.float32)
+    samples[100:130] = 1.0
+    expected = compute_quality(samples, 2000)
+
+    accumulator = QualityAccumulator(2000)
+    position = 0
+    while position < len(samples):
+        size = int(rng.integers(1, 700))
+        accumulator.update(samples[position:position + size])
+        position += size
+    result = accumulator.result()
+    assert result.quality_score_0_100 == expected.quality_score_0_100
+    assert result.silence_pct == expected.silence_pct
+    assert result.clipping_pct == expected.clipping_pct
+    assert abs(result.snr_db - expected.snr_db) < 1e-4
+
+    # Past the exact-frame budget the quantiles come from the histogram.
+    bounded = QualityAccumulator(2000, max_exact_frames=0)
+    bounded.update(samples)
+    approx = bounded.result()
+    assert abs(approx.snr_db - expected.snr_db) < 0.1
+    assert abs(approx.silence_pct - expected.silence_pct) <= 100 / 60
+    # Running scores can ask for the histogram estimate while the exact energies are still kept.
+    running = accumulator.result(exact=False)
+    assert abs(running.snr_db - approx.snr_db) < 1e-4
+    assert running.silence_pct == approx.silence_pct
+
+
+def test_quality_of_signal_shorter_than_one_frame():
+    result = compute_quality(np.full(50, 0.1, dtype=np.float32), 2000)
+    assert result.silence_pct == 0.0
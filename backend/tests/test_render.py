@@ -0,0 +1,45 @@
+import struct
+import zlib
+
+import matplotlib
+import numpy as np
+
+from app.utils import render
+
+
+def decode_png(png: bytes) -> np.ndarray:
+    assert png.startswith(b"\x89PNG\r\n\x1a\n")
+    width, height = struct.unpack(">II", png[16:24])
+    idat_len = struct.unpack(">I", png[33:37])[0]
+    raw = zlib.decompress(png[41:41 + idat_len])
+    rows = np.frombuffer(raw, dtype=np.uint8).reshape(height, width * 3 + 1)
+    return rows[:, 1:].reshape(height, width, 3)
+
+
+def test_encode_png_round_trip():
+    rgb = np.random.default_rng(0).integers(0, 256, size=(7, 5, 3), dtype=np.uint8)
+    np.testing.assert_array_equal(decode_png(render.encode_png(rgb)), rgb)
+
+
+def test_magma_lut_tracks_matplotlib():
+    reference = (matplotlib.colormaps["magma"](np.linspace(0, 1, 256))[:, :3] * 255).round()
+    assert np.abs(render.MAGMA_LUT.astype(np.float64) - reference).max() <= 3
+
+
+def test_minmax_decimation_keeps_every_extreme():
+    samples = np.random.default_rng(1).normal(size=10_007).astype(np.float32)
+    lows, highs = render.minmax_decimate(samples, 100)
+    assert lows.min() == samples.min()
+    assert highs.max() == samples.max()
+    edges = (np.arange(100) * len(samples)) // 100
+    chunks = np.split(samples, edges[1:])
+    np.testing.assert_array_equal(highs, [chunk.max() for chunk in chunks])
+
+
+def test_renderers_produce_expected_sizes():
+    mel = np.random.default_rng(2).normal(size=(64, 40))
+    segments = [{"t0": 0.5 * i, "t1": 0.5 * i + 2, "murmur_prob": 0.1 * i} for i in range(6)]
+    assert decode_png(render.spectrogram_png(mel)).shape == (render.TALL_HEIGHT, render.WIDTH, 3)
+    assert decode_png(render.explainability_png(mel, np.abs(mel))).shape == (render.TALL_HEIGHT, render.WIDTH, 3)
+    assert decode_png(render.timeline_png(segments)).shape == (render.SHORT_HEIGHT, render.WIDTH, 3)
+    assert decode_png(render.waveform_png(np.zeros(4000, dtype=np.float32), 2000)).shape[0] == render.SHORT_HEIGHT
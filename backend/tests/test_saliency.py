@@ -0,0 +1,34 @@
+import numpy as np
+import torch
+
+from app.explainability.saliency import saliency_heatmap
+from app.ml.engine import TorchEngine, load_engine
+from app.ml.model import build_demo_model
+
+
+def autograd_heatmap(model: torch.nn.Module, mel_db: np.ndarray) -> np.ndarray:
+    model.eval()
+    mel_tensor = torch.tensor(mel_db, dtype=torch.float32, requires_grad=True)
+    features = torch.cat([mel_tensor.mean(dim=1), mel_tensor.std(dim=1)], dim=0)
+    model(features)[0].backward()
+    grads = mel_tensor.grad.detach().abs().numpy()
+    return grads / (np.max(grads) + 1e-6)
+
+
+def test_closed_form_matches_autograd():
+    model = build_demo_model()
+    rng = np.random.default_rng(0)
+    for frames in (2, 17, 400):
+        mel_db = np.clip(rng.normal(-40, 15, size=(64, frames)), -80, 0).astype(np.float32)
+        expected = autograd_heatmap(model, mel_db)
+        np.testing.assert_allclose(saliency_heatmap(load_engine(), mel_db), expected, atol=1e-5)
+        np.testing.assert_allclose(saliency_heatmap(TorchEngine(model), mel_db), expected, atol=1e-5)
+
+
+def test_chunked_heatmap_matches_single_pass():
+    mel_db = np.random.default_rng(1).uniform(-80, 0, size=(64, 1000)).astype(np.float32)
+    mel_db[3] = -80.0
+    engine = load_engine()
+    whole = saliency_heatmap(engine, mel_db, chunk_frames=1000)
+    np.testing.assert_allclose(saliency_heatmap(engine, mel_db, chunk_frames=64), whole, atol=1e-7)
+    assert np.isfinite(whole).all()
@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.main import create_app
+
+
+def wait_until_ready(client, timeout_s: float = 60.0):
+    deadline = time.monotonic() + timeout_s
+    while True:
+        response = client.get("/api/ready")
+        if response.status_code == 200 or time.monotonic() > deadline:
+            return response
+        time.sleep(0.05)
+
+
+def test_ready_after_warmup():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        settings = Settings(blob_dir=os.path.join(tmpdir, "blobs"), executor="inline", warmup=True)
+        app = create_app(f"sqlite:///{os.path.join(tmpdir, 'test.db')}", settings)
+        with TestClient(app) as client:
+            assert client.get("/api/health").status_code == 200
+            response = wait_until_ready(client)
+            assert response.status_code == 200
+            body = response.json()
+            assert body["ready"] and body["error"] is None
+            assert body["warmup_s"] > 0 and body["ready_after_s"] >= body["warmup_s"]
+            assert "murmur_ready 1" in client.get("/api/metrics").text
+            assert client.get("/api/history").json() == []
+
+
+def test_ready_immediately_without_warmup():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        settings = Settings(blob_dir=os.path.join(tmpdir, "blobs"), executor="inline", warmup=False)
+        app = create_app(f"sqlite:///{os.path.join(tmpdir, 'test.db')}", settings)
+        with TestClient(app) as client:
+            body = client.get("/api/ready").json()
+    assert body["ready"] and body["warmup_s"] is None
+
+
+def test_preload_defaults_to_fork_pools_only(monkeypatch):
+    monkeypatch.delenv("PRELOAD_MODEL", raising=False)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for mp_context, preloaded in (("spawn", False), ("fork", True)):
+            settings = Settings(
+                blob_dir=os.path.join(tmpdir, "blobs"), executor="inline", warmup=False, mp_context=mp_context
+            )
+            app = create_app(f"sqlite:///{os.path.join(tmpdir, f'{mp_context}.db')}", settings)
+            with TestClient(app) as client:
+                assert (client.get("/api/ready").json()["preload_s"] is not None) == preloaded
+
+
+def test_batching_with_process_executor_warns_at_startup(tmp_path):
+    settings = Settings(blob_dir=os.path.join(tmp_path, "blobs"), executor="process", inference_batching=True)
+    with pytest.warns(RuntimeWarning, match="INFERENCE_BATCHING has no effect"):
+        create_app(f"sqlite:///{os.path.join(tmp_path, 'process.db')}", settings)
+    settings = Settings(blob_dir=os.path.join(tmp_path, "blobs"), executor="thread", inference_batching=True)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        create_app(f"sqlite:///{os.path.join(tmp_path, 'thread.db')}", settings)
+
+
+def test_importing_the_app_defers_dsp_and_plotting_modules():
+    code = "import sys, app.main; print(sorted({'librosa', 'matplotlib', 'torch'} & set(sys.modules)))"
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "PRELOAD_MODEL": "0"}
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=backend, env=env, capture_output=True, text=True, check=True
+    )
+    assert output.stdout.strip() == "[]"
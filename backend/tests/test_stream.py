@@ -0,0 +1,123 @@
+import os
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.main import create_app
+from app.ml.pipeline import sliding_window_segments
+from app.ml.streaming import RingBuffer, StreamingAnalyzer
+
+
+def make_samples(duration_s: float = 6.0, sr: int = 2000) -> np.ndarray:
+    t = np.linspace(0, duration_s, int(sr * duration_s), endpoint=False)
+    rng = np.random.default_rng(0)
+    return (0.2 * np.sin(2 * np.pi * 120 * t) + 0.05 * rng.standard_normal(t.size)).astype(np.float32)
+
+
+def test_ring_buffer_reads_by_absolute_position():
+    ring = RingBuffer(5)
+    ring.write(np.arange(4, dtype=np.float32))
+    ring.write(np.arange(4, 7, dtype=np.float32))
+    assert ring.start == 2 and ring.end == 7
+    assert ring.read(2, 7).tolist() == [2, 3, 4, 5, 6]
+
+
+def test_streamed_segments_match_offline_windows():
+    sr = 4000
+    samples = make_samples(8.0, sr)
+    offline = sliding_window_segments(samples, sr)
+
+    analyzer = StreamingAnalyzer(sr)
+    streamed = []
+    rng = np.random.default_rng(1)
+    position = 0
+    while position < len(samples):
+        size = int(rng.integers(1, 1500))
+        segments = analyzer.push(samples[position:position + size])
+        position += size
+        for segment in segments:
+            # A window is reported within one hop of the audio that completes it.
+            assert position / sr - segment["t1"] < 0.5
+        streamed.extend(segments)
+
+    # The offline pass zero-pads the final frames, so its last window is only comparable once finalized.
+    assert len(streamed) == len(offline) - 1
+    for live, reference in zip(streamed, offline):
+        assert live["t0"] == reference["t0"] and live["t1"] == reference["t1"]
+        assert abs(live["murmur_prob"] - reference["murmur_prob"]) < 1e-5
+
+
+def test_stream_websocket_finalize_stores_history(client):
+    sr = 2000
+    pcm = (make_samples(4.0, sr) * 32767).astype("<i2").tobytes()
+    with client.websocket_connect("/api/stream") as websocket:
+        websocket.send_json(
+            {
+                "type": "start",
+                "sample_rate": sr,
+                "encoding": "pcm_s16le",
+                "patient_id": "patient-1",
+                "auscultation_site": "Mitral",
+                "mc_dropout_passes": 5,
+                "artifacts": "none",
+            }
+        )
+        assert websocket.receive_json()["type"] == "ready"
+        segments = []
+        for offset in range(0, len(pcm), 1001):
+            websocket.send_bytes(pcm[offset:offset + 1001])
+        websocket.send_json({"type": "finalize"})
+        while True:
+            message = websocket.receive_json()
+            if message["type"] != "segment":
+                break
+            segments.append(message)
+
+    assert message["type"] == "final"
+    assert [segment["t0"] for segment in segments] == [0.0, 0.5, 1.0, 1.5]
+    result = message["result"]
+    assert result["input"]["duration_s"] == 4.0
+    history = client.get("/api/history", params={"patient_id": "patient-1"}).json()
+    assert [entry["request_id"] for entry in history] == [result["request_id"]]
+
+
+def test_stream_websocket_rejects_bad_start(client):
+    with client.websocket_connect("/api/stream") as websocket:
+        websocket.send_json({"type": "start", "sample_rate": 2000, "patient_id": "p", "auscultation_site": "Nowhere"})
+        message = websocket.receive_json()
+    assert message == {"type": "error", "detail": "Invalid auscultation site."}
+
+
+def test_stream_websocket_limits_float_streams_by_their_byte_size(client):
+    client.app.state.settings.max_upload_mb = 1
+    samples = np.zeros((1 << 20) // 4 + 1, dtype="<f4")
+    with client.websocket_connect("/api/stream") as websocket:
+        websocket.send_json(
+            {
+                "type": "start",
+                "sample_rate": 192000,
+                "encoding": "f32le",
+                "patient_id": "patient-1",
+                "auscultation_site": "Mitral",
+            }
+        )
+        assert websocket.receive_json()["type"] == "ready"
+        websocket.send_bytes(samples.tobytes())
+        message = websocket.receive_json()
+    assert message == {"type": "error", "detail": "Recording exceeds the 1 MB upload limit."}
+
+
+def test_stream_websocket_limits_concurrent_sessions(tmp_path):
+    settings = Settings(blob_dir=os.path.join(tmp_path, "blobs"), executor="inline", stream_max_sessions=1)
+    client = TestClient(create_app(f"sqlite:///{os.path.join(tmp_path, 'stream.db')}", settings))
+    start = {"type": "start", "sample_rate": 2000, "patient_id": "p", "auscultation_site": "Mitral"}
+    with client.websocket_connect("/api/stream") as first:
+        first.send_json(start)
+        assert first.receive_json()["type"] == "ready"
+        with client.websocket_connect("/api/stream") as second:
+            second.send_json(start)
+            assert second.receive_json() == {"type": "error", "detail": "Too many live streams; retry shortly."}
+    with client.websocket_connect("/api/stream") as third:
+        third.send_json(start)
+        assert third.receive_json()["type"] == "ready"
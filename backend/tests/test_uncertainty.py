@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from app.ml.engine import load_engine
+from app.uncertainty.estimate import mc_dropout_uncertainty
+
+
+@pytest.mark.parametrize("engine", ["numpy", "torch"])
+@pytest.mark.parametrize("mode", ["sequential", "batched", "adaptive"])
+def test_mc_dropout_modes_are_bounded(engine, mode):
+    model = load_engine(engine)
+    features = np.random.default_rng(0).standard_normal(128).astype(np.float32)
+    mean_prob, uncertainty = mc_dropout_uncertainty(model, features, passes=40, mode=mode)
+    assert 0.0 <= mean_prob <= 1.0
+    assert 0.0 <= uncertainty <= 1.0
+    assert not model.training
+
+
+def test_batched_mode_uses_one_dropout_mask_per_pass():
+    model = load_engine()
+    features = np.random.default_rng(0).standard_normal(128).astype(np.float32)
+    model.rng = np.random.default_rng(0)
+    _, batched = mc_dropout_uncertainty(model, features, passes=200, mode="batched")
+    model.rng = np.random.default_rng(0)
+    _, sequential = mc_dropout_uncertainty(model, features, passes=200, mode="sequential")
+    assert batched > 0.0
+    assert abs(batched - sequential) < 0.05
+
+
+def test_invalid_mode_rejected():
+    with pytest.raises(ValueError):
+        mc_dropout_uncertainty(load_engine(), np.zeros(128, dtype=np.float32), mode="unknown")
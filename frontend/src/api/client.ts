@@ -13,8 +13,8 @@ export const predictMurmur = (formData: FormData) =>
     headers: { 'Content-Type': 'multipart/form-data' }
   });
 
-export const fetchHistory = (patientId?: string) =>
-  api.get('/api/history', { params: { patient_id: patientId } });
+export const fetchHistory = (patientId?: string, cursor?: string) =>
+  api.get('/api/history', { params: { patient_id: patientId, cursor } });
 
 export const fetchHistoryDetail = (requestId: string) => api.get(`/api/history/${requestId}`);
 
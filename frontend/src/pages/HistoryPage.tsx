@@ -21,12 +21,14 @@ export default function HistoryPage() {
   const [patientId, setPatientId] = useState('');
   const [loading, setLoading] = useState(false);
   const [deleteId, setDeleteId] = useState<string | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
 
-  const loadHistory = async () => {
+  const loadHistory = async (cursor?: string) => {
     setLoading(true);
     try {
-      const response = await fetchHistory(patientId || undefined);
-      setEntries(response.data);
+      const response = await fetchHistory(patientId || undefined, cursor);
+      setEntries((previous) => (cursor ? [...previous, ...response.data] : response.data));
+      setNextCursor(response.headers['x-next-cursor'] ?? null);
     } finally {
       setLoading(false);
     }
@@ -55,7 +57,7 @@ export default function HistoryPage() {
             className="rounded-lg bg-slate-800 border border-slate-700 p-2"
             placeholder="Patient ID"
           />
-          <button className="neo-button" onClick={loadHistory}>
+          <button className="neo-button" onClick={() => loadHistory()}>
             {loading ? 'Loading...' : 'Search'}
           </button>
         </div>
@@ -108,6 +110,11 @@ export default function HistoryPage() {
             )}
           </tbody>
         </table>
+        {nextCursor && (
+          <button className="neo-button mt-4" onClick={() => loadHistory(nextCursor)} disabled={loading}>
+            {loading ? 'Loading...' : 'Load more'}
+          </button>
+        )}
       </div>
 
       <ConfirmModal
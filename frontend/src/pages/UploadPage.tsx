@@ -3,6 +3,7 @@ import { useNavigate } from 'react-router-dom';
 import { predictMurmur } from '../api/client';
 
 const AUSCULTATION_SITES = ['Aortic', 'Pulmonic', 'Tricuspid', 'Mitral', 'Unknown'];
+const AUDIO_EXTENSIONS = ['.wav', '.flac', '.ogg', '.oga', '.aif', '.aiff'];
 
 export default function UploadPage() {
   const [file, setFile] = useState<File | null>(null);
@@ -15,8 +16,8 @@ export default function UploadPage() {
   const navigate = useNavigate();
 
   const handleFile = async (selected: File) => {
-    if (!selected.name.toLowerCase().endsWith('.wav')) {
-      setError('Please upload a WAV file.');
+    if (!AUDIO_EXTENSIONS.some((extension) => selected.name.toLowerCase().endsWith(extension))) {
+      setError('Please upload a WAV, FLAC or OGG file.');
       return;
     }
     setError('');
@@ -42,7 +43,7 @@ export default function UploadPage() {
 
   const handleSubmit = async () => {
     if (!file) {
-      setError('Upload a WAV file to continue.');
+      setError('Upload a recording to continue.');
       return;
     }
     if (!patientId.trim()) {
@@ -75,21 +76,21 @@ export default function UploadPage() {
     <div className="space-y-8">
       <div className="neo-card">
         <h2 className="text-2xl font-semibold text-emerald-200">Upload Heart Sound</h2>
-        <p className="text-slate-300 mt-2">Only WAV files are supported. Please record in a quiet space.</p>
+        <p className="text-slate-300 mt-2">WAV, FLAC and OGG recordings are supported (stereo is mixed down). Please record in a quiet space.</p>
 
         <div
           onDrop={handleDrop}
           onDragOver={(event) => event.preventDefault()}
           className="mt-6 border-2 border-dashed border-slate-700 rounded-2xl p-8 text-center"
         >
-          <p className="text-slate-300">Drag & drop your WAV file here</p>
+          <p className="text-slate-300">Drag & drop your recording here</p>
           <p className="text-slate-500 text-sm mt-1">or</p>
           <label className="neo-button inline-block mt-4 cursor-pointer">
             Browse File
             <input
               type="file"
               className="hidden"
-              accept=".wav"
+              accept={AUDIO_EXTENSIONS.join(',')}
               onChange={(event) => event.target.files && handleFile(event.target.files[0])}
             />
           </label>